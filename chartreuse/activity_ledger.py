@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from .models import ProcessedActivity
+
+# Default number of recently processed activities each process remembers
+DEFAULT_MAX_ENTRIES = 10000
+
+# Default number of seconds a processed activity is remembered, peers retry a failed delivery within this window
+DEFAULT_TTL = 86400
+
+LedgerKey = namedtuple('LedgerKey', ['activity_type', 'activity_id', 'payload_hash'])
+
+def activity_hash(data):
+    '''
+    Purpose: Digest of an inbox activity that does not depend on the key order the peer serialized it with.
+
+    Parameters:
+    data: the parsed json activity
+
+    Returns:
+    hex sha256 of the canonical json of the activity
+    '''
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def activity_key(data):
+    '''
+    Purpose: The key an activity is remembered under: its type and the id the peer gave it, with the hash of its
+    payload to tell a retry of the latest delivery from a new version of the same object.
+
+    Parameters:
+    data: the parsed json activity
+
+    Returns:
+    LedgerKey, or None for activities without an id such as follows, which are never skipped
+    '''
+    identifier = data.get('id')
+    if not identifier:
+        return None
+    return LedgerKey(str(data.get('type'))[:20], str(identifier)[:500], activity_hash(data))
+
+class ActivityLedger:
+    '''
+    Purpose: Remember which inbox activities were already applied so retried deliveries can be skipped.
+
+    The ProcessedActivity table holds one row per activity type and id with the hash of the latest payload applied
+    for it. A delivery is a retry when that row exists, has the same hash and is younger than the TTL, so an object
+    edited A -> B -> A is applied all three times. Activities without an id are never skipped. Rows past the TTL are
+    deleted by the prune_activity_ledger command, and the most recent keys are also kept in memory so rapid repeats
+    to the same process never reach the database.
+    '''
+
+    def __init__(self, max_entries=None, ttl=None):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, 'INBOX_LEDGER_MEMORY_SIZE', DEFAULT_MAX_ENTRIES)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'INBOX_LEDGER_TTL', DEFAULT_TTL)
+
+    def seen(self, key):
+        '''
+        Purpose: Check whether an activity is a retry of the latest delivery applied for its type and id.
+
+        Arguments:
+        key: the activity_key of the activity, None is never seen
+        '''
+        if key is None:
+            return False
+
+        identity = (key.activity_type, key.activity_id)
+        with self._lock:
+            cached = self._recent.get(identity)
+            if cached is not None and cached[0] > time.monotonic():
+                self._recent.move_to_end(identity)
+                return cached[1] == key.payload_hash
+
+        processed = ProcessedActivity.objects.filter(
+            activity_type=key.activity_type, activity_id=key.activity_id,
+            processed_at__gte=timezone.now() - timedelta(seconds=self.ttl)
+        ).values_list('payload_hash', flat=True).first()
+        if processed is None:
+            return False
+        self._remember(key._replace(payload_hash=processed))
+        return processed == key.payload_hash
+
+    def record(self, key):
+        '''
+        Purpose: Mark an activity as the latest one processed for its type and id.
+
+        Arguments:
+        key: the activity_key of the activity, None is not recorded
+        '''
+        if key is None:
+            return
+        # a concurrent delivery of the same activity may have recorded it first
+        ProcessedActivity.objects.update_or_create(
+            activity_type=key.activity_type, activity_id=key.activity_id,
+            defaults={'payload_hash': key.payload_hash, 'processed_at': timezone.now()}
+        )
+        self._remember(key)
+
+    def prune(self):
+        '''
+        Purpose: Delete the processed activities older than the TTL, peers no longer retry them.
+
+        Returns:
+        the number of rows deleted
+        '''
+        deleted, _ = ProcessedActivity.objects.filter(processed_at__lt=timezone.now() - timedelta(seconds=self.ttl)).delete()
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+
+    def in_transaction(self):
+        '''
+        Purpose: Whether the ledger is used inside a transaction. Its rows may still be rolled back, so they are not
+        shared with other requests yet.
+        '''
+        return connection.in_atomic_block
+
+    def _remember(self, key):
+        if self.in_transaction():
+            return
+        identity = (key.activity_type, key.activity_id)
+        with self._lock:
+            self._recent[identity] = (time.monotonic() + self.ttl, key.payload_hash)
+            self._recent.move_to_end(identity)
+            while len(self._recent) > self.max_entries:
+                self._recent.popitem(last=False)
+
+activity_ledger = ActivityLedger()
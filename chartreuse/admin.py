@@ -3,6 +3,9 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User as AuthUser
 
 from . import models
+from .node_client import reset_circuit
+from .delivery import replay_dead_letters
+from django.utils import timezone
 
 
 # Define an inline admin descriptor for the custom User model
@@ -27,8 +30,56 @@ admin.site.register(models.Comment)
 admin.site.register(models.Post)
 
 admin.site.register(models.Follow)
+admin.site.register(models.Friendship)
 admin.site.register(models.FollowRequest)
+admin.site.register(models.InboxActivity)
+admin.site.register(models.ProcessedActivity)
 admin.site.register(models.GithubPolling)
 
-admin.site.register(models.Node)
-admin.site.register(models.Settings)
\ No newline at end of file
+@admin.register(models.Node)
+class NodeAdmin(admin.ModelAdmin):
+    list_display = ('host', 'username', 'follow_status', 'status', 'compress_requests', 'circuit_state', 'consecutive_failures', 'latency_ewma_ms', 'circuit_opened_at')
+    list_filter = ('follow_status', 'status', 'circuit_state')
+    readonly_fields = ('consecutive_failures', 'latency_ewma_ms', 'circuit_state', 'circuit_opened_at')
+    actions = ['reset_circuits']
+
+    @admin.action(description="Reset the circuit breaker of the selected nodes")
+    def reset_circuits(self, request, queryset):
+        for node in queryset:
+            reset_circuit(node)
+
+admin.site.register(models.Settings)
+
+
+@admin.register(models.FailedDelivery)
+class FailedDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('url', 'node', 'attempts', 'next_attempt_at', 'last_error', 'created_at')
+    list_filter = ('node',)
+    actions = ['retry_now']
+
+    @admin.action(description="Retry the selected deliveries now")
+    def retry_now(self, request, queryset):
+        queryset.update(next_attempt_at=timezone.now())
+
+
+@admin.register(models.DeadLetterDelivery)
+class DeadLetterDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('url', 'node', 'attempts', 'last_error', 'created_at', 'dead_at')
+    list_filter = ('node',)
+    actions = ['replay']
+
+    @admin.action(description="Replay the selected deliveries")
+    def replay(self, request, queryset):
+        count = replay_dead_letters(queryset)
+        self.message_user(request, f"Replaying {count} deliveries.")
+
+@admin.register(models.BackfillJob)
+class BackfillJobAdmin(admin.ModelAdmin):
+    list_display = ('author', 'follower', 'status', 'progress', 'sent_posts', 'failed_posts', 'total_posts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('total_posts', 'sent_posts', 'failed_posts', 'last_post_id', 'error', 'started_at', 'finished_at')
+    actions = ['requeue']
+
+    @admin.action(description="Requeue the selected jobs, carrying on from the last post sent")
+    def requeue(self, request, queryset):
+        queryset.exclude(status='RUNNING').update(status='PENDING', error='', finished_at=None)
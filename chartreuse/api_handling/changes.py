@@ -0,0 +1,236 @@
+from datetime import datetime, timezone as dt_timezone
+from ..fast_json import FastJsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from ..models import User, Post, Comment, Like
+from ..pagination import decode_cursor, encode_cursor
+from rest_framework import serializers, viewsets
+from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, inline_serializer
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
+from rest_framework.authentication import SessionAuthentication
+from ..views import checkIfRequestAuthenticated
+from .id_functions import create_user_url_id
+
+def parse_since(request):
+    '''
+    Reads the ?since= (or ?updated_after=) filter of a request.
+
+    Parameters:
+        request: HttpRequest object containing the query parameters.
+
+    Returns:
+        aware datetime of the filter, or None when the request has no filter.
+
+    Raises:
+        ValueError when the value is neither an ISO 8601 timestamp nor unix seconds.
+    '''
+    value = request.GET.get('since') or request.GET.get('updated_after')
+    if not value:
+        return None
+    value = value.strip()
+
+    try:
+        return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except (ValueError, OverflowError):
+        pass
+
+    # an unencoded + of the utc offset arrives as a space
+    if 'T' in value:
+        value = value.replace(' ', '+')
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f"Invalid timestamp {value}")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+def invalid_since_response():
+    return FastJsonResponse({"error": "Invalid since timestamp."}, status=400)
+
+# the change feed is ordered by (updated_at, type, id), the type keeps apart the ids of the three tables
+CHANGE_TYPES = ("post", "comment", "like")
+
+def parse_change_cursor(cursor):
+    '''
+    Reads the ?cursor= of the change feed, the next of a previous response.
+
+    Parameters:
+        cursor: the cursor string
+
+    Returns:
+        (updated_at, type, id) tuple of the last change listed before.
+
+    Raises:
+        ValueError when the cursor was not made by change_cursor.
+    '''
+    values = decode_cursor(cursor)
+    if len(values) != 3 or values[1] not in CHANGE_TYPES or not isinstance(values[2], int) or not isinstance(values[0], str):
+        raise ValueError(f"Invalid cursor {cursor}")
+    updated_at = parse_datetime(values[0])
+    if updated_at is None or timezone.is_naive(updated_at):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return updated_at, values[1], values[2]
+
+def change_cursor(updated_at, change_type, pk):
+    # isoformat keeps the microseconds the json encoder would cut off
+    return encode_cursor([updated_at.isoformat(), change_type, pk])
+
+def changes_after(queryset, change_type, cursor):
+    '''
+    Filters the rows of one table of the change feed to the ones that come after a cursor.
+
+    Parameters:
+        queryset: the posts, comments or likes of the author
+        change_type: the type the rows are listed with
+        cursor: (updated_at, type, id) tuple of the last change listed before
+
+    Returns:
+        the filtered queryset.
+    '''
+    updated_at, cursor_type, pk = cursor
+    if CHANGE_TYPES.index(change_type) < CHANGE_TYPES.index(cursor_type):
+        return queryset.filter(updated_at__gt=updated_at)
+    if CHANGE_TYPES.index(change_type) > CHANGE_TYPES.index(cursor_type):
+        return queryset.filter(updated_at__gte=updated_at)
+    return queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+
+class ChangeSerializer(serializers.Serializer):
+    type = serializers.CharField()
+    id = serializers.URLField()
+    updated_at = serializers.DateTimeField()
+
+class ChangesSerializer(serializers.Serializer):
+    type = serializers.CharField(default="changes")
+    since = serializers.DateTimeField()
+    next_since = serializers.DateTimeField()
+    next = serializers.CharField(allow_null=True)
+    size = serializers.IntegerField()
+    src = ChangeSerializer(many=True)
+
+class ChangeFeedViewSet(viewsets.ViewSet):
+    permission_classes = [AllowAny]
+    serializer_class = ChangesSerializer
+    authentication_classes = [SessionAuthentication]
+
+    @extend_schema(
+        summary="Get what an author changed since a point in time",
+        description=(
+            "Lists the posts, comments and likes of an author that were created or changed after `since`, oldest change first."
+            "\n\n**When to use:** Use this endpoint to keep a copy of an author's content in sync without re-fetching all their posts."
+            "\n\n**How to use:** Send a GET request with the `user_id`, then pass the `next` of each response as `cursor`, repeating until `src` is empty. Keep the last `next` to ask for later changes."
+            "\n\n**Why to use:** Only the objects that changed are listed, deleted posts are listed with the DELETED visibility."
+            "\n\n**Why not to use:** Removed likes and comments are not listed, and the entries only identify the objects that changed."
+        ),
+        parameters=[
+            OpenApiParameter(name="since", description="ISO 8601 timestamp or unix seconds, changes at or before it are skipped.", required=False, type=str),
+            OpenApiParameter(name="updated_after", description="Alias of since.", required=False, type=str),
+            OpenApiParameter(name="cursor", description="The next of a previous response, changes up to it are skipped. Takes the place of since.", required=False, type=str),
+            OpenApiParameter(name="size", description="Maximum number of changes returned.", required=False, type=int),
+        ],
+        responses={
+            200: OpenApiResponse(description="Successfully retrieved the changes.", response=ChangesSerializer),
+            400: OpenApiResponse(
+                description="Invalid since timestamp or cursor.",
+                response=inline_serializer(
+                    name="InvalidSinceResponse",
+                    fields={"error": serializers.CharField(default="Invalid since timestamp.")}
+                )
+            ),
+            404: OpenApiResponse(description="Author not found."),
+        }
+    )
+    @action(detail=False, methods=["GET"])
+    def get_changes(self, request, user_id):
+        """
+        Gets the change feed of an author.
+
+        Parameters:
+            request: rest_framework object containing the request and query parameters.
+            user_id: The id of the author whose changes are listed.
+
+        Returns:
+            JsonResponse containing the changed objects.
+        """
+        checkIfRequestAuthenticated(request)
+        try:
+            since = parse_since(request)
+            size = max(1, min(int(request.GET.get('size', 100)), 500))
+        except ValueError:
+            return invalid_since_response()
+        if since is None:
+            since = datetime.fromtimestamp(0, tz=dt_timezone.utc)
+
+        cursor = request.GET.get('cursor')
+        try:
+            position = parse_change_cursor(cursor) if cursor else None
+        except ValueError:
+            return FastJsonResponse({"error": "Invalid cursor."}, status=400)
+
+        author = get_object_or_404(User, url_id=create_user_url_id(request, user_id))
+
+        # deleted posts stay in the feed so peers learn about the deletion
+        visibilities = ["PUBLIC", "DELETED"]
+        if request.user.is_authenticated:
+            visibilities += ["FRIENDS", "UNLISTED"]
+
+        posts = Post.objects.filter(user=author, visibility__in=visibilities)
+        comments = Comment.objects.filter(user=author, post__visibility__in=visibilities).select_related('post')
+        likes = Like.objects.filter(user=author).select_related('post', 'comment')
+        if position is not None:
+            # rows changed at the same moment as the last one listed are told apart by their id, so none are skipped
+            posts = changes_after(posts, "post", position)
+            comments = changes_after(comments, "comment", position)
+            likes = changes_after(likes, "like", position)
+        else:
+            posts = posts.filter(updated_at__gt=since)
+            comments = comments.filter(updated_at__gt=since)
+            likes = likes.filter(updated_at__gt=since)
+
+        changes = [{
+            "type": "post",
+            "id": post.url_id,
+            "visibility": post.visibility,
+            "updated_at": post.updated_at,
+            "pk": post.pk,
+        } for post in posts.order_by('updated_at', 'id')[:size]]
+        changes += [{
+            "type": "comment",
+            "id": comment.url_id or f"{author.url_id}/commented/{comment.id}",
+            "post": comment.post.url_id,
+            "updated_at": comment.updated_at,
+            "pk": comment.pk,
+        } for comment in comments.order_by('updated_at', 'id')[:size]]
+        changes += [{
+            "type": "like",
+            "id": like.url_id or f"{author.url_id}/liked/{like.id}",
+            "object": like.post.url_id if like.post is not None else like.comment.url_id,
+            "updated_at": like.updated_at,
+            "pk": like.pk,
+        } for like in likes.order_by('updated_at', 'id')[:size] if like.post is not None or like.comment is not None]
+
+        changes.sort(key=lambda change: (change["updated_at"], CHANGE_TYPES.index(change["type"]), change["pk"]))
+        changes = changes[:size]
+        if changes:
+            last = changes[-1]
+            next_since = last["updated_at"]
+            next_cursor = change_cursor(last["updated_at"], last["type"], last["pk"])
+        else:
+            next_since = position[0] if position is not None else since
+            next_cursor = cursor
+
+        # isoformat keeps the microseconds the json encoder would cut off, so next_since does not list the last change again
+        for change in changes:
+            change["updated_at"] = change["updated_at"].isoformat()
+            del change["pk"]
+
+        return FastJsonResponse({
+            "type": "changes",
+            "since": since.isoformat(),
+            "next_since": next_since.isoformat(),
+            "next": next_cursor,
+            "size": size,
+            "src": changes,
+        }, status=200)
@@ -1,7 +1,7 @@
-import json
 
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from .. import fast_json
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
 from rest_framework import serializers
@@ -10,11 +10,12 @@ from rest_framework.decorators import action, api_view
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
 from ..models import User, Like, Post, Follow, Comment
-from .users import UserSerializer, UserViewSet
-from .likes import LikeSerializer, LikesSerializer, LikeViewSet
-from .friends import FriendsViewSet
+from .users import UserSerializer, UserViewSet, author_document
+from .likes import LikeSerializer, LikesSerializer, LikeViewSet, EMBEDDED_LIKES_SIZE, like_document, likes_count, embedded_likes
+from ..view.follow_utils import are_friends
 from urllib.parse import unquote
 from ..views import checkIfRequestAuthenticated
+from .changes import parse_since, invalid_since_response
 from rest_framework.permissions import AllowAny
 
 def create_user_url_id(request, id):
@@ -27,7 +28,52 @@ def create_user_url_id(request, id):
         scheme = request.scheme
         url = f"{scheme}://{host}/chartreuse/api/authors/{id}"
         return url
-    
+
+def with_comment_documents(comments):
+    '''
+    Loads what comment_document needs with the comments: their author and post in the same query,
+    their like count as an annotation and their first likes in one more query.
+
+    Parameters:
+        comments: queryset of Comment objects.
+
+    Returns:
+        the queryset ready for comment_document.
+    '''
+    # only the url id of the post is written, its text is left unloaded
+    comments = comments.select_related("user", "post").defer("post__description", "post__content")
+    return comments.annotate(likes_count=likes_count("comment")).prefetch_related(embedded_likes())
+
+def comment_document(comment):
+    '''
+    Builds the json document of a comment loaded with with_comment_documents.
+
+    Parameters:
+        comment: the Comment object.
+
+    Returns:
+        dict of the comment document.
+    '''
+    comment_id = comment.url_id or f"{comment.user.url_id}/commented/{comment.id}"
+    return {
+        "type": "comment",
+        "author": author_document(comment.user),
+        "comment": comment.comment,
+        "contentType": comment.contentType,
+        "published": comment.dateCreated,
+        "id": comment_id,
+        "post": comment.post.url_id,
+        "likes": {
+            "type": "likes",
+            "page": comment.post.url_id,
+            "id": comment_id + "/likes/",
+            "page_number": 1,
+            "size": EMBEDDED_LIKES_SIZE,
+            "count": comment.likes_count,
+            "src": [like_document(like, comment_id) for like in comment.embedded_likes],
+        }
+    }
+
 class CommentSerializer(serializers.Serializer):
     type = serializers.CharField(default="comment")
     author = UserSerializer
@@ -123,7 +169,7 @@ class CommentViewSet(viewsets.ViewSet):
             # Get the post URL from the request body
             post_id = request.POST.get('id')
             if not post_id:
-                return JsonResponse({"error": "Post URL is required"}, status=400)
+                return FastJsonResponse({"error": "Post URL is required"}, status=400)
         
         decoded_post_url = unquote(post_id)
         
@@ -134,9 +180,13 @@ class CommentViewSet(viewsets.ViewSet):
         post = get_object_or_404(Post, url_id=decoded_post_url, user=decoded_author_id)
         post_visibility = post.visibility
 
-        # check post visibillity permission
-        if post_visibility != "PUBLIC" and post_visibility != "UNLISTED" or (post_visibility == "FRIENDS" and FriendsViewSet().check_friendship(request, user_id, request.user.user.id).status_code != 200):
-            return JsonResponse({"error": "User does not have permission to comment on this post"}, status=401)
+        # check post visibillity permission (friends only posts can be commented on by the author and their friends)
+        if post_visibility == "FRIENDS":
+            can_comment = post.user == user_commenting or are_friends(user_commenting, post.user)
+        else:
+            can_comment = post_visibility == "PUBLIC" or post_visibility == "UNLISTED"
+        if not can_comment:
+            return FastJsonResponse({"error": "User does not have permission to comment on this post"}, status=401)
 
         comment_text = request.POST.get('comment', '')
         content_type = request.POST.get('contentType', 'text/markdown')
@@ -156,9 +206,9 @@ class CommentViewSet(viewsets.ViewSet):
         user_response = user_viewset.retrieve(request, pk=decoded_commenter)
 
         if user_response.status_code != 200:
-            return JsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
+            return FastJsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
         
-        user_data = json.loads(user_response.content)
+        user_data = fast_json.loads(user_response.content)
 
         # construct the comment (no likes are included for now since the comment was just created)
         comment_object = {
@@ -179,7 +229,7 @@ class CommentViewSet(viewsets.ViewSet):
             "post": post.url_id,
         }
 
-        return JsonResponse(comment_object, status=201)
+        return FastJsonResponse(comment_object, status=201)
     
 
 
@@ -236,7 +286,7 @@ class CommentViewSet(viewsets.ViewSet):
         # Get the comment   
         comment = Comment.objects.filter(url_id = unquote(comment_id)).first()
         if not comment:
-            return JsonResponse({"error": "Comment not found."}, status=404)
+            return FastJsonResponse({"error": "Comment not found."}, status=404)
     
         # get the comment authors details
         request.method = "GET"
@@ -244,13 +294,13 @@ class CommentViewSet(viewsets.ViewSet):
         user_response = user_viewset.retrieve(request, pk=comment.user.url_id)
 
         if user_response.status_code != 200:
-            return JsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
+            return FastJsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
         
-        user_data = json.loads(user_response.content)
+        user_data = fast_json.loads(user_response.content)
 
         like_viewset = LikeViewSet()
         response = like_viewset.get_comment_likes(request, comment.user.url_id, comment.post.url_id, comment_id)
-        like_data = json.loads(response.content)
+        like_data = fast_json.loads(response.content)
 
         # construct the comment (no likes are included for now since the comment was just created)
         comment_object = {
@@ -283,7 +333,7 @@ class CommentViewSet(viewsets.ViewSet):
         # Delete the comment
         comment.delete()
 
-        return JsonResponse(comment_object, status=200)
+        return FastJsonResponse(comment_object, status=200)
         
 
     @extend_schema(
@@ -298,6 +348,7 @@ class CommentViewSet(viewsets.ViewSet):
         parameters=[
             OpenApiParameter(name="size", description="the size of the comments paginator", required=False, type=str),
             OpenApiParameter(name="page", description="the page number of the comments paginator", required=False, type=str),
+            OpenApiParameter(name="since", description="only comments changed after this ISO 8601 timestamp or unix seconds (alias updated_after)", required=False, type=str),
         ],
         responses={
             200: OpenApiResponse(description="List of comments retrieved successfully.", response=CommentsSerializer),
@@ -347,52 +398,23 @@ class CommentViewSet(viewsets.ViewSet):
             user_id = post.user.url_id
 
 
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
+
         # Get all comments related to the post
         page_number = request.GET.get('page', 1)     # defualt value 1
         size = request.GET.get('size', 5)       # default value 5
         comments = Comment.objects.filter(post=post)
-        paginator = Paginator(comments, size)  # Pagination
+        changed_comments = comments.order_by('dateCreated', 'id')
+        if since is not None:
+            # count stays the total, only the listed comments are limited to the changed ones
+            changed_comments = comments.filter(updated_at__gt=since).order_by('updated_at', 'id')
+        paginator = Paginator(with_comment_documents(changed_comments), size)  # Pagination
         page_comments = paginator.get_page(page_number)
 
-        filtered_comment_attributes =[]
-
-        for comment in page_comments:
-            user_viewset = UserViewSet()
-            response = user_viewset.retrieve(request, pk=comment.user.url_id)
-            author_data = json.loads(response.content)
-
-            like_viewset = LikeViewSet()
-            response = like_viewset.get_comment_likes(request, user_id, post_id, comment.url_id)
-            like_data = json.loads(response.content)
-
-            comment_object = {
-                "type": "comment",
-                "author": {
-                    "type": "author",
-                    "id": author_data["id"],
-                    "page": author_data["page"],
-                    "host": author_data["host"],
-                    "displayName": author_data["displayName"],
-                    "profileImage": author_data["profileImage"],
-
-                },
-                "comment": comment.comment,
-                "contentType": comment.contentType,
-                "published": comment.dateCreated,
-                "id": comment.url_id,
-                "post": post.url_id,
-                "likes": {
-                    "type":"likes",
-                    "page": like_data["page"],
-                    "id": like_data["id"],
-                    "page_number": like_data["page_number"],
-                    "size": like_data["size"],
-                    "count": like_data["count"],
-                    "src": like_data["src"],
-                }
-            }
-
-            filtered_comment_attributes.append(comment_object)
+        filtered_comment_attributes = [comment_document(comment) for comment in page_comments]
 
         comments_object = {
             "type": "comments",
@@ -400,11 +422,11 @@ class CommentViewSet(viewsets.ViewSet):
             "id": post.url_id + f"/comments",
             "page_number": page_number,
             "size": 5,
-            "count": len(comments),
+            "count": paginator.count if since is None else comments.count(),
             "src": filtered_comment_attributes
         }
 
-        return JsonResponse(comments_object, safe=False, status=200)
+        return FastJsonResponse(comments_object, safe=False, status=200)
 
     
 
@@ -450,11 +472,10 @@ class CommentViewSet(viewsets.ViewSet):
             JsonResponce containing the response   
         """
         decoded_comment_id = unquote(comment_id)
+        comments = with_comment_documents(Comment.objects.all())
         
         if user_id == None or post_id == None:
-            comment = get_object_or_404(Comment, url_id=decoded_comment_id)
-            post_id = comment.post.url_id
-            user_id = comment.post.user.url_id
+            comment = get_object_or_404(comments, url_id=decoded_comment_id)
 
         else:
             decoded_author_id = unquote(user_id)
@@ -463,44 +484,10 @@ class CommentViewSet(viewsets.ViewSet):
             decoded_post_id = unquote(post_id)
             post = Post.objects.filter(url_id=decoded_post_id, user=user).first()
 
-            comment = get_object_or_404(Comment, url_id=decoded_comment_id, post=post)
-
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=comment.user.url_id)
-        author_data = json.loads(response.content)
-
-        like_viewset = LikeViewSet()
-        response = like_viewset.get_comment_likes(request, user_id, post_id, comment_id)
-        like_data = json.loads(response.content)
-
-        comment_object = {
-            "type": "comment",
-            "author": {
-                "type": "author",
-                "id": author_data["id"],
-                "page": author_data["page"],
-                "host": author_data["host"],
-                "displayName": author_data["displayName"],
-                "github": author_data["github"],
-                "profileImage": author_data["profileImage"]
-            },
-            "comment": comment.comment,
-            "contentType": comment.contentType,
-            "published": comment.dateCreated,
-            "id": comment.url_id,
-            "post": comment.post.url_id,
-            "likes": {
-                "type":"likes",
-                "page": like_data["page"],
-                "id": like_data["id"],
-                "page_number": like_data["page_number"],
-                "size": like_data["size"],
-                "count": like_data["count"],
-                "src": like_data["src"],
-            }
+            comment = get_object_or_404(comments, url_id=decoded_comment_id, post=post)
 
-        }
-        return JsonResponse(comment_object, status=200)
+        comment_object = comment_document(comment)
+        return FastJsonResponse(comment_object, status=200)
 
 
     @extend_schema(
@@ -515,6 +502,7 @@ class CommentViewSet(viewsets.ViewSet):
         parameters=[
             OpenApiParameter(name="size", description="the size of the comments paginator", required=False, type=str),
             OpenApiParameter(name="page", description="the page number of the comments paginator", required=False, type=str),
+            OpenApiParameter(name="since", description="only comments changed after this ISO 8601 timestamp or unix seconds (alias updated_after)", required=False, type=str),
         ],
         responses={
             200: OpenApiResponse(description="Successfully retrieved comments.", response=CommentsSerializer),
@@ -546,6 +534,11 @@ class CommentViewSet(viewsets.ViewSet):
         Returns:
             JsonResponce containing the response   
         """
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
+
         # get the paginator page and size (default size 1 and 10)
         page = request.GET.get('page', 1)
         size = request.GET.get('size', 10)
@@ -556,59 +549,26 @@ class CommentViewSet(viewsets.ViewSet):
 
         # Get all the comments authored by the given user
         comments = Comment.objects.filter(user=comment_author)
+        listed_comments = comments.order_by('dateCreated', 'id')
+        if since is not None:
+            listed_comments = comments.filter(updated_at__gt=since).order_by('updated_at', 'id')
 
         # Filter the comments based on visibility
         # not required since comments are local for right now 
 
-        # Paginates likes based on the size
-        comments_paginator = Paginator(comments, size)
+        # Paginates comments based on the size
+        comments_paginator = Paginator(with_comment_documents(listed_comments), size)
         page_comments = comments_paginator.page(page)
-        comments_src = []
-
-        # Get the authors data
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=decoded_author_id)
-        author_data = json.loads(response.content)
 
         # Create the list of comments
-        for comment in page_comments:
-            like_viewset = LikeViewSet()
-            response = like_viewset.get_comment_likes(request, user_id, comment.post.url_id, comment.url_id)
-            like_data = json.loads(response.content)
-
-            comments_src.append({
-                "type": "comment",
-                "author": {
-                    "type": "author",
-                    "id": author_data["id"],
-                    "page": author_data["page"],
-                    "host": author_data["host"],
-                    "displayName": author_data["displayName"],
-                    "github": author_data["github"],
-                    "profileImage": author_data["profileImage"]
-                },
-                "comment": comment.comment,
-                "contentType": comment.contentType,
-                "published": comment.dateCreated,
-                "id": comment.url_id,
-                "post": comment.post.url_id,
-                "likes": {
-                    "type":"likes",
-                    "page": like_data["page"],
-                    "id": like_data["id"],
-                    "page_number": like_data["page_number"],
-                    "size": like_data["size"],
-                    "count": like_data["count"],
-                    "src": like_data["src"],
-                }
-            })   
+        comments_src = [comment_document(comment) for comment in page_comments]
 
         authors_comments = {
             "type": "comments",
             "page_number": page,
             "size": size,
-            "count": len(comments),
+            "count": comments_paginator.count,
             "src":comments_src
         }   
 
-        return JsonResponse(authors_comments, status=200)
\ No newline at end of file
+        return FastJsonResponse(authors_comments, status=200)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import hashlib
+from calendar import timegm
+from functools import wraps
+from urllib.parse import unquote
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from ..models import User, Post, Comment, Like
+from .id_functions import create_user_url_id
+
+def conditional(version_func):
+    '''
+    Wraps a GET view so conditional requests are answered with 304 Not Modified when the object did not change.
+
+    Unlike django's condition decorator the version is looked up once for both validators, and only the view
+    the url resolves to is wrapped, so the viewsets calling each other in-process never see a 304.
+
+    Parameters:
+        version_func: function taking the view's arguments and returning the version stamps (datetimes) of the
+                      objects the response is built from, or None when the object does not exist.
+
+    Returns:
+        decorator for the view.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            stamps = version_func(request, *args, **kwargs)
+            if not stamps:
+                return view(request, *args, **kwargs)
+
+            # the path and query are part of the tag since page and size change the embedded lists
+            version = "|".join([request.get_full_path()] + [stamp.isoformat() for stamp in stamps])
+            etag = "W/" + quote_etag(hashlib.sha1(version.encode("utf-8")).hexdigest())
+            last_modified = timegm(max(stamps).utctimetuple())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers.setdefault("ETag", etag)
+                response.headers.setdefault("Last-Modified", http_date(last_modified))
+            return response
+        return inner
+    return decorator
+
+def user_version(request, pk=None, **kwargs):
+    return User.objects.filter(pk=create_user_url_id(request, pk)).values_list("updated_at").first()
+
+def latest_author_update(rows):
+    # stamp of the most recently changed author of the rows, the post's own stamp stands in when there are none
+    return Coalesce(Subquery(rows.order_by("-user__updated_at").values("user__updated_at")[:1]), "updated_at")
+
+def post_version(request, user_id=None, post_id=None, **kwargs):
+    # the post document embeds its author, its comments and likes with their authors, and the likes of the comments
+    return Post.objects.filter(user_id=unquote(user_id), url_id=unquote(post_id)).annotate(
+        comment_authors_updated_at=latest_author_update(Comment.objects.filter(post=OuterRef("pk"))),
+        like_authors_updated_at=latest_author_update(Like.objects.filter(post=OuterRef("pk"))),
+        comment_like_authors_updated_at=latest_author_update(Like.objects.filter(comment__post=OuterRef("pk"))),
+    ).values_list(
+        "updated_at", "user__updated_at", "comment_authors_updated_at", "like_authors_updated_at", "comment_like_authors_updated_at"
+    ).first()
+
+def comment_version(request, comment_id=None, **kwargs):
+    return Comment.objects.filter(url_id=unquote(comment_id)).values_list("updated_at", "user__updated_at").first()
+
+def like_version(request, like_id=None, **kwargs):
+    return Like.objects.filter(url_id=unquote(like_id)).values_list("updated_at", "user__updated_at").first()
@@ -1,4 +1,4 @@
-from django.http import JsonResponse
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
 from ..models import User, FollowRequest, Follow
 from django.contrib.auth.decorators import login_required
@@ -117,16 +117,16 @@ class FollowRequestViewSet(viewsets.ViewSet):
 
             # Check if a follow request already exists
             if FollowRequest.objects.filter(requester=current_user, requestee=author).exists():
-                return JsonResponse({"error": "Follow request already sent."}, status=400)
+                return FastJsonResponse({"error": "Follow request already sent."}, status=400)
 
             # Create and save a follow request
             follow_request = FollowRequest(requester=current_user, requestee=author)
             follow_request.save()
 
-            return JsonResponse({"message": "Follow request sent."}, status=200)
+            return FastJsonResponse({"message": "Follow request sent."}, status=200)
 
         else:
-            return JsonResponse({"error": "Method not allowed."}, status=405)
+            return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
     @extend_schema(
         summary="Accept a follow request",
@@ -187,10 +187,10 @@ class FollowRequestViewSet(viewsets.ViewSet):
             # Delete the follow request
             follow_request.delete()
 
-            return JsonResponse({"message": "Follow request accepted."}, status=200)
+            return FastJsonResponse({"message": "Follow request accepted."}, status=200)
 
         else:
-            return JsonResponse({"error": "Method not allowed."}, status=405)
+            return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
     @extend_schema(
         summary="Reject a follow request",
@@ -247,10 +247,10 @@ class FollowRequestViewSet(viewsets.ViewSet):
             # Delete the follow request
             follow_request.delete()
 
-            return JsonResponse({"message": "Follow request rejected."}, status=200)
+            return FastJsonResponse({"message": "Follow request rejected."}, status=200)
 
         else:
-            return JsonResponse({"error": "Method not allowed."}, status=405)
+            return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
 
     @extend_schema(
@@ -329,4 +329,4 @@ class FollowRequestViewSet(viewsets.ViewSet):
             for follow_request in follow_requests
         ]
 
-        return JsonResponse({"follow_requests": requests_list}, status=200)
+        return FastJsonResponse({"follow_requests": requests_list}, status=200)
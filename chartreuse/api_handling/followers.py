@@ -1,8 +1,7 @@
-from django.http import JsonResponse
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
 from ..models import User, FollowRequest, Follow
 from django.contrib.auth.decorators import login_required
-import json
 from rest_framework.authentication import SessionAuthentication
 from urllib.parse import unquote
 from rest_framework.permissions import IsAuthenticated
@@ -103,7 +102,7 @@ class FollowViewSet(viewsets.ViewSet):
             return response
 
         if not request.user.is_authenticated:
-            return JsonResponse({"error": "User is not authenticated."}, status=401)
+            return FastJsonResponse({"error": "User is not authenticated."}, status=401)
 
         if request.method == 'POST' or request.method == 'PUT':
 
@@ -115,14 +114,14 @@ class FollowViewSet(viewsets.ViewSet):
 
             # Check if the user already follows the author
             if Follow.objects.filter(follower=foreign_author, followed=author).exists():
-                return JsonResponse({"message": "Already a follower"}, status=400)
+                return FastJsonResponse({"message": "Already a follower"}, status=400)
 
             # Create and save a follower object
             Follow.objects.create(follower=foreign_author, followed=author)
-            return JsonResponse({"message": "Follower added"}, status=201)
+            return FastJsonResponse({"message": "Follower added"}, status=201)
 
         else:
-            return JsonResponse({"error": "Method not allowed."}, status=405)
+            return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
     @extend_schema(
         summary="Remove a follower",
@@ -192,15 +191,15 @@ class FollowViewSet(viewsets.ViewSet):
             follow = Follow.objects.filter(follower=foreign_author, followed=author)
 
             if not follow.exists():
-                return JsonResponse({"error": "Not a follower."}, status=400)
+                return FastJsonResponse({"error": "Not a follower."}, status=400)
 
             # Remove the follower
             follow.delete()
 
-            return JsonResponse({"message": "Follower removed."}, status=204)
+            return FastJsonResponse({"message": "Follower removed."}, status=204)
 
         else:
-            return JsonResponse({"error": "Method not allowed."}, status=405)
+            return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
     @extend_schema(
         summary="Retrieve list of followers for a specific author",
@@ -290,7 +289,7 @@ class FollowViewSet(viewsets.ViewSet):
             "followers": followers_list
         }
 
-        return JsonResponse(response, status=200)
+        return FastJsonResponse(response, status=200)
 
     @extend_schema(
         summary="Check if a specific author is a follower",
@@ -347,5 +346,5 @@ class FollowViewSet(viewsets.ViewSet):
         foreign_author = get_object_or_404(User, url_id=decoded_foreign_author_id)
 
         if Follow.objects.filter(follower=foreign_author, followed=author).exists():
-            return JsonResponse({"message": "Is a follower"}, status=200)
-        return JsonResponse({"message": "Not a follower"}, status=404)
+            return FastJsonResponse({"message": "Is a follower"}, status=200)
+        return FastJsonResponse({"message": "Not a follower"}, status=404)
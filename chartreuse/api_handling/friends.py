@@ -1,6 +1,6 @@
-from django.http import JsonResponse
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
-from ..models import Follow, User
+from ..models import Friendship, User
 from urllib.parse import unquote
 from rest_framework import serializers, viewsets
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter, inline_serializer
@@ -82,13 +82,8 @@ class FriendsViewSet(viewsets.ViewSet):
         decoded_author_id = unquote(author_id)
         author = get_object_or_404(User, url_id=decoded_author_id)
 
-        # Get the followers of the author
-        followers = Follow.objects.filter(followed=author).values_list('follower', flat=True)
-
-        # Get the authors that the current author follows
-        following = Follow.objects.filter(follower=author).values_list('followed', flat=True)
-
-        friends = User.objects.filter(url_id__in=followers).filter(url_id__in=following)
+        # Get the authors that follow the author back from the friendship table
+        friends = User.objects.filter(friendships__friend=author)
 
         friends_list = []
 
@@ -110,7 +105,7 @@ class FriendsViewSet(viewsets.ViewSet):
             "friends": friends_list
         }
 
-        return JsonResponse(response, status=200)
+        return FastJsonResponse(response, status=200)
 
     @extend_schema(
         summary="Check if two authors are friends (mutual followers)",
@@ -170,8 +165,7 @@ class FriendsViewSet(viewsets.ViewSet):
         foreign_author = get_object_or_404(User, url_id=decoded_foreign_author_id)
 
         # Check if the current user follows the author and vice versa
-        if (Follow.objects.filter(follower=author, followed=foreign_author).exists() and
-            Follow.objects.filter(follower=foreign_author, followed=author).exists()):
-            return JsonResponse({"message": "Authors are friends"}, status=200)
+        if Friendship.objects.filter(user=author, friend=foreign_author).exists():
+            return FastJsonResponse({"message": "Authors are friends"}, status=200)
 
-        return JsonResponse({"message": "Authors are not friends"}, status=404)
\ No newline at end of file
+        return FastJsonResponse({"message": "Authors are not friends"}, status=404)
\ No newline at end of file
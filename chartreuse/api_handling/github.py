@@ -1,7 +1,7 @@
 import requests
 from django.shortcuts import get_object_or_404
 from ..models import User
-from django.http import JsonResponse
+from ..fast_json import FastJsonResponse
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample, inline_serializer
 from rest_framework.decorators import action, api_view
 from urllib.parse import unquote
@@ -63,9 +63,9 @@ def get_events(request, user_id):
 
         response = requests.get(f"https://api.github.com/users/{githubUsername}/events/public")
 
-        return JsonResponse(response.json(), safe=False)
+        return FastJsonResponse(response.json(), safe=False)
     else:
-        return JsonResponse({"error": "Method not allowed."}, status=405)
+        return FastJsonResponse({"error": "Method not allowed."}, status=405)
     
 @extend_schema(
     summary="Gets the repositories starred by a user on github",
@@ -126,9 +126,9 @@ def get_starred(request, user_id):
 
         response = requests.get(f"https://api.github.com/users/{githubUsername}/starred")
 
-        return JsonResponse(response.json(), safe=False)
+        return FastJsonResponse(response.json(), safe=False)
     else:
-        return JsonResponse({"error": "Method not allowed."}, status=405)
+        return FastJsonResponse({"error": "Method not allowed."}, status=405)
 
 @extend_schema(
     summary="Gets the repositories watched by a user on github",
@@ -201,6 +201,6 @@ def get_subscriptions(request, user_id):
 
         response = requests.get(f"https://api.github.com/users/{githubUsername}/subscriptions")
 
-        return JsonResponse(response.json(), safe=False)
+        return FastJsonResponse(response.json(), safe=False)
     else:
-        return JsonResponse({"error": "Method not allowed."}, status=405)
\ No newline at end of file
+        return FastJsonResponse({"error": "Method not allowed."}, status=405)
\ No newline at end of file
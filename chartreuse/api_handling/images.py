@@ -1,6 +1,6 @@
 import base64
 from urllib.request import urlopen
-from django.http import JsonResponse
+from ..fast_json import FastJsonResponse
 from .. import models
 from urllib.parse import unquote
 from django.shortcuts import redirect
@@ -87,7 +87,7 @@ def retrieve_from_homepage(request, post_id):
         # Redirect to the saved image
         return redirect(f"/static/images/{post.id}{suffix}")
     else:
-        return JsonResponse({'error': 'Not an image'}, status=404)
+        return FastJsonResponse({'error': 'Not an image'}, status=404)
 
 @extend_schema(
     summary="Retrieve and serve an image from a post on an author's profile",
@@ -179,7 +179,7 @@ def retrieve_from_profile(request, author_id, post_id):
         # Redirect to the saved image
         return redirect(f"/static/images/{post.id}{suffix}")
     else:
-        return JsonResponse({'error': 'Not an image'}, status=404)
+        return FastJsonResponse({'error': 'Not an image'}, status=404)
 
 
 def encode_image(image_path):
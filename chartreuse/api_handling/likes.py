@@ -1,7 +1,9 @@
-import json
 
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.conf import settings
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from .. import fast_json
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
 from rest_framework import serializers
@@ -9,9 +11,12 @@ from rest_framework import viewsets
 from rest_framework.decorators import action, api_view
 from rest_framework.authentication import SessionAuthentication
 from ..models import Like, User, Post, Comment
-from .users import UserSerializer, UserViewSet
+from .users import UserSerializer, UserViewSet, author_document
 from urllib.parse import unquote
 from ..views import checkIfRequestAuthenticated
+from .changes import parse_since, invalid_since_response
+from ..pagination import keyset_page
+from ..table_counts import table_counts
 from rest_framework.permissions import AllowAny
 
 def create_user_url_id(request, id):
@@ -24,7 +29,99 @@ def create_user_url_id(request, id):
         scheme = request.scheme
         url = f"{scheme}://{host}/chartreuse/api/authors/{id}"
         return url
-    
+
+# Number of likes embedded in a comment document, the rest are paged through its likes endpoint
+EMBEDDED_LIKES_SIZE = 50
+
+def like_document(like, object_id):
+    '''
+    Builds the json document of a like.
+
+    Parameters:
+        like: the Like object, with its user loaded.
+        object_id: the url id of the liked post or comment.
+
+    Returns:
+        dict of the like document.
+    '''
+    return {
+        "type": "like",
+        "author": author_document(like.user),
+        "published": like.dateCreated,
+        "id": like.url_id or f"{like.user.url_id}/liked/{like.pk}",
+        "object": object_id
+    }
+
+def likes_count(field):
+    '''
+    Counts the likes of every row with a subquery, which unlike a joined Count leaves the page and its
+    COUNT(*) free of a GROUP BY over the likes.
+
+    Parameters:
+        field: the Like foreign key pointing at the rows, post or comment.
+
+    Returns:
+        expression to annotate the rows with.
+    '''
+    likes = Like.objects.filter(**{field: OuterRef("pk")}).order_by().values(field).annotate(count=Count("id")).values("count")
+    return Coalesce(Subquery(likes), 0)
+
+def embedded_likes(lookup="like_set", size=EMBEDDED_LIKES_SIZE):
+    '''
+    Prefetches the first likes of every object on a page, with their authors, in one query.
+
+    Parameters:
+        lookup: the relation from the paged objects to their likes.
+        size: the number of likes kept per object.
+
+    Returns:
+        Prefetch storing the likes in the embedded_likes attribute of each object.
+    '''
+    likes = Like.objects.select_related("user").order_by("dateCreated", "id")[:size]
+    return Prefetch(lookup, queryset=likes, to_attr="embedded_likes")
+
+# Likes are listed oldest first, with the id breaking ties between likes made in the same instant
+LIKES_ORDERING = ("dateCreated", "id")
+
+def likes_page(request, likes, count_key, since=None):
+    '''
+    Gets one page of a likes listing with the authors of its likes joined in, and the cached number of likes.
+
+    Parameters:
+        request: request holding the page, size and cursor query parameters.
+        likes: queryset of every like being listed.
+        count_key: key the number of likes is cached under in table_counts.
+        since: only list likes changed after this datetime, ordered by their change, when given.
+
+    Returns:
+        dict with the page_number, size, count and next fields of the listing and the Like objects of the
+        page under src. Raises ValueError for an invalid page, size or cursor.
+    '''
+    page = int(request.GET.get('page', 1))  # Default page is 1
+    size = int(request.GET.get('size', 50))  # Default size is 50
+    if page < 1 or size < 1:
+        raise ValueError(f"Invalid page {page} or size {size}")
+    # popular posts have thousands of likes, so a page never holds more than LIKES_MAX_PAGE_SIZE of them
+    size = min(size, getattr(settings, 'LIKES_MAX_PAGE_SIZE', 100))
+
+    listed = likes.select_related("user")
+    ordering = LIKES_ORDERING
+    if since is not None:
+        listed = listed.filter(updated_at__gt=since)
+        ordering = ("updated_at", "id")
+
+    rows, next_cursor = keyset_page(listed, ordering, size, cursor=request.GET.get('cursor'), offset=(page - 1) * size)
+    return {
+        "page_number": page,
+        "size": size,
+        "count": table_counts.count(count_key, likes),
+        "next": next_cursor,
+        "src": rows
+    }
+
+def invalid_page_response():
+    return FastJsonResponse({"error": "Invalid page, size or cursor."}, status=400)
+
 
 class LikeSerializer(serializers.Serializer):
     type = serializers.CharField(default="like")
@@ -43,10 +140,11 @@ class LikesSerializer(serializers.Serializer):
     page_number = serializers.IntegerField()
     size = serializers.IntegerField()
     count = serializers.IntegerField()
+    next = serializers.CharField(allow_null=True)
     src = LikeSerializer(many=True)
 
     class Meta:
-        fields = ['type', 'page', 'id', 'page_number', 'size', 'count', 'src']
+        fields = ['type', 'page', 'id', 'page_number', 'size', 'count', 'next', 'src']
 
 class LikeViewSet(viewsets.ViewSet):
     serializer_class = LikeSerializer
@@ -122,7 +220,7 @@ class LikeViewSet(viewsets.ViewSet):
         # Get the post URL from the request body
         post_url = request.POST.get('post')
         if not post_url:
-            return JsonResponse({"error": "Post URL is required."}, status=400)
+            return FastJsonResponse({"error": "Post URL is required."}, status=400)
 
         # Ensure the user liking the post is the current user
         user_liking = User.objects.get(pk=decoded_user_id)
@@ -145,7 +243,7 @@ class LikeViewSet(viewsets.ViewSet):
             like, created = Like.objects.get_or_create(user=user_liking, post=post)
         
         if not created:
-            return JsonResponse({"error": "Like already exists."}, status=400)
+            return FastJsonResponse({"error": "Like already exists."}, status=400)
         
         like.save()
 
@@ -154,9 +252,9 @@ class LikeViewSet(viewsets.ViewSet):
         user_response = user_viewset.retrieve(request, pk=decoded_user_id)
         
         if user_response.status_code != 200:
-            return JsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
+            return FastJsonResponse({"error": "Failed to retrieve user details."}, status=user_response.status_code)
         
-        user_data = json.loads(user_response.content)
+        user_data = fast_json.loads(user_response.content)
 
         # Construct the like object to return in the response
         like_object = {
@@ -174,7 +272,7 @@ class LikeViewSet(viewsets.ViewSet):
             "id": like.url_id,
             "object": decoded_post_url
         }
-        return JsonResponse(like_object, status=200)
+        return FastJsonResponse(like_object, status=200)
     
     @extend_schema(
         summary="Removes a like from a post",
@@ -244,7 +342,7 @@ class LikeViewSet(viewsets.ViewSet):
         
         # Check if the user has already liked this post
         if not Like.objects.filter(user=user_liking, post=post).exists():
-            return JsonResponse({"error": "Like does not exist."}, status=400)
+            return FastJsonResponse({"error": "Like does not exist."}, status=400)
         
         # Create and save the like
         like = Like.objects.filter(user=user_liking, post=post)
@@ -253,7 +351,7 @@ class LikeViewSet(viewsets.ViewSet):
         request.method = 'GET'
         user_viewset = UserViewSet() 
         response = user_viewset.retrieve(request, pk=decoded_user_id)
-        data = json.loads(response.content)
+        data = fast_json.loads(response.content)
         
         # Construct the like object to return in the response
         likeObject = {
@@ -272,7 +370,7 @@ class LikeViewSet(viewsets.ViewSet):
             "object": decoded_post_url
         }
 
-        return JsonResponse(likeObject, status=200)
+        return FastJsonResponse(likeObject, status=200)
 
     @extend_schema(
         summary="Gets a specific like from a user",
@@ -323,7 +421,7 @@ class LikeViewSet(viewsets.ViewSet):
         user_viewset = UserViewSet() 
         response = user_viewset.retrieve(request, pk=decoded_user_id)
 
-        data = json.loads(response.content)
+        data = fast_json.loads(response.content)
         like = Like.objects.filter(url_id=decoded_like_id).first()
 
         if like.post is None:
@@ -346,7 +444,7 @@ class LikeViewSet(viewsets.ViewSet):
             "id": like.url_id,
             "object": object_id
         }
-        return JsonResponse(likeObject, safe=False)
+        return FastJsonResponse(likeObject, safe=False)
 
     @extend_schema(
         summary="Gets all likes on a post",
@@ -357,8 +455,21 @@ class LikeViewSet(viewsets.ViewSet):
             "\n\n**Why to use:** This API helps in getting all likes related to a post, useful for tracking engagement."
             "\n\n**Why not to use:** If the post doesn't exist, or if you do not require all likes on a post."
         ),
+        parameters=[
+            OpenApiParameter(name="page", description="Page number for pagination.", required=False, type=int),
+            OpenApiParameter(name="size", description="Number of likes per page, at most LIKES_MAX_PAGE_SIZE (100 by default).", required=False, type=int),
+            OpenApiParameter(name="cursor", description="The next value of the previous page, continues the listing after it and takes precedence over page.", required=False, type=str),
+            OpenApiParameter(name="since", description="Only likes changed after this ISO 8601 timestamp or unix seconds (alias updated_after).", required=False, type=str),
+        ],
         responses={
             200: OpenApiResponse(description="Successfully retrieved all likes.", response=LikesSerializer),
+            400: OpenApiResponse(
+                description="Invalid page, size, cursor or since.",
+                response=inline_serializer(
+                    name="InvalidLikesPageResponse",
+                    fields={"error": serializers.CharField(default="Invalid page, size or cursor.")}
+                )
+            ),
             405: OpenApiResponse(
                 description="Method not allowed.",
                 response=inline_serializer(
@@ -379,65 +490,27 @@ class LikeViewSet(viewsets.ViewSet):
         user = get_object_or_404(User, url_id=decoded_user_id)
         post = get_object_or_404(Post, url_id=decoded_post_id)
 
-        likes = Like.objects.filter(user=user, post=post)
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
 
-        request.method = 'GET'
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=decoded_user_id)
-
-        data = json.loads(response.content)
-
-        page = request.GET.get('page')
-        size = request.GET.get('size')
-
-        if (page is None):
-            page = 1 # Default page is 1
-
-        if (size is None):
-            size = 50 # Default size is 50
-        
-        request.method = 'GET'
-        user_viewset = UserViewSet() 
-        response = user_viewset.retrieve(request, pk=decoded_user_id)
-        data = json.loads(response.content)
-        
-        # Paginates likes based on the size
-        likes_paginator = Paginator(likes, size)
-
-        page_likes = likes_paginator.page(page)
-
-        # Since we have some additional fields, we only want to return the required ones
-        filtered_likes_attributes = []
-        for like in page_likes:
-
-            likeObject = {
-                "type": "likes",
-                "author": {
-                    "type": "author",
-                    "id": data["id"],
-                    "page": data["page"],
-                    "host": data["host"],
-                    "displayName": data["displayName"],
-                    "github": data["github"],
-                    "profileImage": data["profileImage"]
-                },
-                "published": like.dateCreated,
-                "id": like.url_id,
-                "object": like.post.url_id
-            }
-
-            filtered_likes_attributes.append(likeObject)
+        # every like on the post, each with its own author
+        likes = Like.objects.filter(post=post)
+        try:
+            listing = likes_page(request, likes, ("post_likes", post.pk), since)
+        except ValueError:
+            return invalid_page_response()
 
         userLikes = {
             "type": "likes",
             "page": str(user.url_id) + "/posts/",
-            "page_number": page,
-            "size": size,
-            "count": len(likes),
-            "src": filtered_likes_attributes
+            "id": str(post.url_id) + "/likes",
+            **listing,
+            "src": [like_document(like, post.url_id) for like in listing["src"]]
         }
 
-        return JsonResponse(userLikes, safe=False)
+        return FastJsonResponse(userLikes, safe=False)
 
     @extend_schema(
         summary="Gets all likes on a comment from a post",
@@ -448,8 +521,21 @@ class LikeViewSet(viewsets.ViewSet):
             "\n\n**Why to use:** This endpoint is helpful to track how many likes a specific comment has received."
             "\n\n**Why not to use:** If you're not interested in the comment likes or if the comment doesn't exist."
         ),
+        parameters=[
+            OpenApiParameter(name="page", description="Page number for pagination.", required=False, type=int),
+            OpenApiParameter(name="size", description="Number of likes per page, at most LIKES_MAX_PAGE_SIZE (100 by default).", required=False, type=int),
+            OpenApiParameter(name="cursor", description="The next value of the previous page, continues the listing after it and takes precedence over page.", required=False, type=str),
+            OpenApiParameter(name="since", description="Only likes changed after this ISO 8601 timestamp or unix seconds (alias updated_after).", required=False, type=str),
+        ],
         responses={
             200: OpenApiResponse(description="Successfully retrieved all likes.", response=LikesSerializer),
+            400: OpenApiResponse(
+                description="Invalid page, size, cursor or since.",
+                response=inline_serializer(
+                    name="InvalidLikesPageResponse",
+                    fields={"error": serializers.CharField(default="Invalid page, size or cursor.")}
+                )
+            ),
             405: OpenApiResponse(
                 description="Method not allowed.",
                 response=inline_serializer(
@@ -472,60 +558,27 @@ class LikeViewSet(viewsets.ViewSet):
         post = get_object_or_404(Post, url_id=decoded_post_id)
         comment = get_object_or_404(Comment, url_id=decoded_comment_id)
 
-        likes = Like.objects.filter(user=user, comment=comment)
-
-        request.method = 'GET'
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=decoded_user_id)
-
-        data = json.loads(response.content)
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
 
-        page = request.GET.get('page', 1)   # Default page is 1
-        size = request.GET.get('size', 50)  # Default size is 50
-        
-        request.method = 'GET'
-        user_viewset = UserViewSet() 
-        response = user_viewset.retrieve(request, pk=decoded_user_id)
-        data = json.loads(response.content)
-        
-        # Paginates likes based on the size
-        likes_paginator = Paginator(likes, size)
-
-        page_likes = likes_paginator.page(page)
-
-        # Since we have some additional fields, we only want to return the required ones
-        filtered_likes_attributes = []
-        for like in likes:
-
-            likeObject = {
-                "type": "like",
-                "author": {
-                    "type": "author",
-                    "id": data["id"],
-                    "page": data["page"],
-                    "host": data["host"],
-                    "displayName": data["displayName"],
-                    "github": data["github"],
-                    "profileImage": data["profileImage"]
-                },
-                "published": like.dateCreated,
-                "id": like.url_id,
-                "object": like.comment.url_id
-            }
-
-            filtered_likes_attributes.append(likeObject)
+        # every like on the comment, each with its own author
+        likes = Like.objects.filter(comment=comment)
+        try:
+            listing = likes_page(request, likes, ("comment_likes", comment.pk), since)
+        except ValueError:
+            return invalid_page_response()
 
         userLikes = {
             "type": "likes",
             "page": str(post.url_id),
             "id": str(comment.url_id) + "/likes/",
-            "page_number": page,
-            "size": size,
-            "count": len(likes),
-            "src": filtered_likes_attributes
+            **listing,
+            "src": [like_document(like, comment.url_id) for like in listing["src"]]
         }
 
-        return JsonResponse(userLikes, safe=False)
+        return FastJsonResponse(userLikes, safe=False)
 
     @extend_schema(
         summary="Gets all likes made by a user",
@@ -539,10 +592,19 @@ class LikeViewSet(viewsets.ViewSet):
         request=UserSerializer,
         parameters=[
             OpenApiParameter(name="page", description="Page number for pagination.", required=False, type=int),
-            OpenApiParameter(name="size", description="Number of likes per page.", required=False, type=int),
+            OpenApiParameter(name="size", description="Number of likes per page, at most LIKES_MAX_PAGE_SIZE (100 by default).", required=False, type=int),
+            OpenApiParameter(name="cursor", description="The next value of the previous page, continues the listing after it and takes precedence over page.", required=False, type=str),
+            OpenApiParameter(name="since", description="Only likes changed after this ISO 8601 timestamp or unix seconds (alias updated_after).", required=False, type=str),
         ],
         responses={
             200: OpenApiResponse(description="Successfully retrieved all likes.", response=LikesSerializer),
+            400: OpenApiResponse(
+                description="Invalid page, size, cursor or since.",
+                response=inline_serializer(
+                    name="InvalidLikesPageResponse",
+                    fields={"error": serializers.CharField(default="Invalid page, size or cursor.")}
+                )
+            ),
             405: OpenApiResponse(
                 description="Method not allowed.",
                 response=inline_serializer(
@@ -565,57 +627,30 @@ class LikeViewSet(viewsets.ViewSet):
             JsonResponse containing the like objects.
         '''
         decoded_user_id = create_user_url_id(request, user_id)
-        page = request.GET.get('page')
-        size = request.GET.get('size')
 
-        if (page is None):
-            page = 1 # Default page is 1
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
 
-        if (size is None):
-            size = 50 # Default size is 50
-        
         user = get_object_or_404(User, url_id=decoded_user_id)
+        # the liked posts and comments are joined in too, without the text that is never sent
         likes = Like.objects.filter(user=user)
-
-        request.method = 'GET'
-        user_viewset = UserViewSet() 
-        response = user_viewset.retrieve(request, pk=decoded_user_id)
-        data = json.loads(response.content)
-        
-        # Paginates likes based on the size
-        likes_paginator = Paginator(likes, size)
-
-        page_likes = likes_paginator.page(page)
-
-        # Since we have some additional fields, we only want to return the required ones
-        filtered_likes_attributes = []
-        for like in page_likes:
-
-            likeObject = {
-                "type": "likes",
-                "author": {
-                    "type": "author",
-                    "id": data["id"],
-                    "page": data["page"],
-                    "host": data["host"],
-                    "displayName": data["displayName"],
-                    "github": data["github"],
-                    "profileImage": data["profileImage"]
-                },
-                "published": like.dateCreated,
-                "id": like.url_id,
-                "object": like.post.url_id
-            }
-
-            filtered_likes_attributes.append(likeObject)
+        try:
+            listed = likes.select_related("post", "comment").defer("post__description", "post__content", "comment__comment")
+            listing = likes_page(request, listed, ("user_likes", user.pk), since)
+        except ValueError:
+            return invalid_page_response()
 
         userLikes = {
             "type": "likes",
             "page": str(user.url_id) + "/posts/",
-            "page_number": page,
-            "size": size,
-            "count": len(likes),
-            "src": filtered_likes_attributes
+            "id": str(user.url_id) + "/liked",
+            **listing,
+            "src": [
+                like_document(like, like.comment.url_id if like.comment_id is not None else like.post.url_id)
+                for like in listing["src"]
+            ]
         }
 
-        return JsonResponse(userLikes, safe=False)
\ No newline at end of file
+        return FastJsonResponse(userLikes, safe=False)
@@ -1,7 +1,7 @@
-import json
 
 from django.db.models import Q
-from django.http import JsonResponse
+from .. import fast_json
+from ..fast_json import FastJsonResponse
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
@@ -14,6 +14,8 @@ from .comments import CommentViewSet
 from .likes import LikeViewSet
 from .likes import LikesSerializer
 from .comments import CommentsSerializer
+from .changes import parse_since, invalid_since_response
+from .sparse_fields import POST_FIELDS, requested_fields, invalid_fields_response
 from urllib.parse import unquote
 from rest_framework.permissions import AllowAny
 from rest_framework.authentication import SessionAuthentication
@@ -31,6 +33,62 @@ def create_user_url_id(request, id):
         url = f"{scheme}://{host}/chartreuse/api/authors/{id}"
         return url
 
+# Large text columns of a post left unloaded when their field is not requested
+DEFERRABLE_POST_COLUMNS = ("description", "content")
+
+def build_post_object(post, fields, author_data=None, comments_data=None, likes_data=None):
+    '''
+    Builds the json document of a post with only the requested fields.
+
+    Parameters:
+        post: the Post object.
+        fields: tuple of the post fields to write, from requested_fields.
+        author_data: author document of the post, needed when author is requested.
+        comments_data: comments document of the post, needed when comments are requested.
+        likes_data: likes document of the post, needed when likes are requested.
+
+    Returns:
+        dict of the post document.
+    '''
+    postObject = {}
+    for field in fields:
+        if field == "type":
+            postObject["type"] = "post"
+        elif field == "id":
+            postObject["id"] = post.url_id
+        elif field == "author":
+            postObject["author"] = {
+                "type": "author",
+                "id": author_data["id"],
+                "page": author_data["page"],
+                "host": author_data["host"],
+                "displayName": author_data["displayName"],
+                "github": author_data["github"],
+                "profileImage": author_data["profileImage"],
+            }
+        elif field == "comments":
+            postObject["comments"] = {
+                "type": "comments",
+                "page": comments_data["page"],
+                "id": comments_data["id"],
+                "page_number": comments_data["page_number"],
+                "size": comments_data["size"],
+                "count": comments_data["count"],
+                "src": comments_data["src"]
+            }
+        elif field == "likes":
+            postObject["likes"] = {
+                "types": "likes",
+                "page": likes_data["page"],
+                "page_number": likes_data["page_number"],
+                "size": likes_data["size"],
+                "count": likes_data["count"],
+                "src": likes_data["src"]
+            }
+        else:
+            postObject[field] = getattr(post, field)
+    return postObject
+
 
 class PostSerializer(serializers.Serializer):
     type = serializers.CharField(default="post")
@@ -125,7 +183,7 @@ class PostViewSet(viewsets.ViewSet):
         host = Host(request.get_host())
 
         if user is None:
-            return JsonResponse({"error": "User not found."}, status=404)
+            return FastJsonResponse({"error": "User not found."}, status=404)
 
         elif user.host != f"https://{host.host}/chartreuse/api/":
             response = checkIfRequestAuthenticated(request)
@@ -143,7 +201,7 @@ class PostViewSet(viewsets.ViewSet):
 
         post_title = request.POST.get("title")
         if not post_title:
-            return JsonResponse({"error": "Post title is required."}, status=400)
+            return FastJsonResponse({"error": "Post title is required."}, status=400)
         
         post_description = request.POST.get("description")
         contentType_description = request.POST.get("contentType")
@@ -152,7 +210,7 @@ class PostViewSet(viewsets.ViewSet):
 
         content_description = request.POST.get("content")
         if not content_description:
-            return JsonResponse({"error": "Post content is required."}, status=400)
+            return FastJsonResponse({"error": "Post content is required."}, status=400)
 
         # Create and save the post
         post = Post.objects.create(user=author, title=post_title, description=post_description, contentType=contentType_description, content=content_description, visibility=post_type)
@@ -164,10 +222,10 @@ class PostViewSet(viewsets.ViewSet):
         request.method = "GET"
         user_viewset = UserViewSet()
         response = user_viewset.retrieve(request, pk=user_id)
-        author_data = json.loads(response.content)
+        author_data = fast_json.loads(response.content)
 
         if response.status_code != 200:
-            return JsonResponse({"error": "Failed to retrieve user details."}, status=response.status_code)
+            return FastJsonResponse({"error": "Failed to retrieve user details."}, status=response.status_code)
 
         # Construct the post object to return in the responce
         if post_type in ["PUBLIC", "FRIENDS", "UNLISTED", "DELETED"]:
@@ -190,10 +248,10 @@ class PostViewSet(viewsets.ViewSet):
                 "published": post.published,
                 "visibility": post_type,
             }
-            return JsonResponse(postObject, status=201)
+            return FastJsonResponse(postObject, status=201)
 
         else:
-            return JsonResponse({"error": "post visibliity invalid"}, status=400)
+            return FastJsonResponse({"error": "post visibliity invalid"}, status=400)
 
         
     @extend_schema(
@@ -276,18 +334,18 @@ class PostViewSet(viewsets.ViewSet):
         request.method = "GET"
         user_viewset = UserViewSet()
         response = user_viewset.retrieve(request, pk=decoded_user_id)
-        author_data = json.loads(response.content)
+        author_data = fast_json.loads(response.content)
 
         if response.status_code != 200:
-            return JsonResponse({"error": "Failed to retrieve user details."}, status=response.status_code)
+            return FastJsonResponse({"error": "Failed to retrieve user details."}, status=response.status_code)
 
         comments_viewset = CommentViewSet()
         response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
-        comments_data = json.loads(response.content)
+        comments_data = fast_json.loads(response.content)
 
         likes_viewset = LikeViewSet()
         response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
-        likes_data = json.loads(response.content)
+        likes_data = fast_json.loads(response.content)
 
         # Construct the post object to return in the responce
         postObject = {
@@ -327,7 +385,7 @@ class PostViewSet(viewsets.ViewSet):
             "visibility": post.visibility,
         }
 
-        return JsonResponse(postObject, status=200)
+        return FastJsonResponse(postObject, status=200)
         
 
     @extend_schema(
@@ -343,6 +401,8 @@ class PostViewSet(viewsets.ViewSet):
             parameters=[
             OpenApiParameter(name="user_id", description="The id of the user requesting the post.", required=False, type=str),
             OpenApiParameter(name="post_id", description="The ID of the post to retrieve (required).", required=False, type=str),
+            OpenApiParameter(name="fields", description="Comma separated post fields to return, type and id are always returned.", required=False, type=str),
+            OpenApiParameter(name="exclude", description="Comma separated post fields to leave out, e.g. comments,likes,content.", required=False, type=str),
             ],
             responses={
                 200: OpenApiResponse(description="Successfully retrieved post.", response=PostSerializer),
@@ -391,102 +451,39 @@ class PostViewSet(viewsets.ViewSet):
         decoded_user_id = unquote(user_id)
         decoded_post_id = unquote(post_id)
 
+        try:
+            fields = requested_fields(request, POST_FIELDS)
+        except ValueError as error:
+            return invalid_fields_response(error)
+
         author = User.objects.get(url_id=decoded_user_id)
 
-        post = Post.objects.filter(user=author, url_id=decoded_post_id).first()
+        # omitted sections are never queried
+        deferred = [column for column in DEFERRABLE_POST_COLUMNS if column not in fields]
+        post = Post.objects.filter(user=author, url_id=decoded_post_id).defer(*deferred).first()
 
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=user_id)
-        author_data = json.loads(response.content)
-    
-        comments_viewset = CommentViewSet()
-        response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
-        comments_data = json.loads(response.content)
+        if post.visibility not in ["PUBLIC", "UNLISTED", "DELETED", "FRIENDS"]:
+            return FastJsonResponse({"error": "Post does not exist."}, status=404)
 
-        likes_viewset = LikeViewSet()
-        response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
-        likes_data = json.loads(response.content)
-    
-        if post.visibility in ["PUBLIC", "UNLISTED", "DELETED"]:
-            postObject = {
-                "type": "post",
-                "title": post.title,
-                "id": post.url_id,
-                "description": post.description,
-                "contentType": post.contentType,
-                "content": post.content,
-                "author": {
-                    "type": "author",
-                    "id": author_data["id"],
-                    "page": author_data["page"],
-                    "host": author_data["host"],
-                    "displayName": author_data["displayName"],
-                    "github": author_data["github"],
-                    "profileImage": author_data["profileImage"]
-                },
-                "comments":{
-                    "type": "comments",
-                    "page": comments_data["page"],
-                    "page_number": comments_data["page_number"],
-                    "size": comments_data["size"],
-                    "count": comments_data["count"],
-                    "src": comments_data["src"]
-                },
-                "likes": {
-                    "types": "likes",
-                    "page": likes_data["page"],
-                    "page_number": likes_data["page_number"],
-                    "size": likes_data["size"],
-                    "count": likes_data["count"],
-                    "src": likes_data["src"]
-                },
-                "published": post.published,
-                "visibility": post.visibility,
-            }
+        author_data = comments_data = likes_data = None
+        if "author" in fields:
+            user_viewset = UserViewSet()
+            response = user_viewset.retrieve(request, pk=user_id)
+            author_data = fast_json.loads(response.content)
 
-        elif post.visibility == "FRIENDS":
-            # check if the current user is the authors friend
-            postObject = {
-                "type": "post",
-                "title": post.title,
-                "id": post.url_id,
-                "description": post.description,
-                "contentType": post.contentType,
-                "content": post.content,
-                "author": {
-                    "type": "author",
-                    "id": author_data["id"],
-                    "page": author_data["page"],
-                    "host": author_data["host"],
-                    "displayName": author_data["displayName"],
-                    "github": author_data["github"],
-                    "profileImage": author_data["profileImage"]
-                },
-                "comments":{
-                    "type": "comments",
-                    "page": comments_data["page"],
-                    "id": comments_data["id"],
-                    "page_number": comments_data["page_number"],
-                    "size": comments_data["size"],
-                    "count": comments_data["count"],
-                    "src": comments_data["src"]
-                },
-                "likes": {
-                    "types": "likes",
-                    "page": likes_data["page"],
-                    # "id": likes_data["id"],
-                    "page_number": likes_data["page_number"],
-                    "size": likes_data["size"],
-                    "count": likes_data["count"],
-                    "src": likes_data["src"]
-                },
-                "published": post.published,
-                "visibility": post.visibility,
-            } 
-        else:
-            return JsonResponse({"error": "Post does not exist."}, status=404)
-        
-        return JsonResponse(postObject, status=200)
+        if "comments" in fields:
+            comments_viewset = CommentViewSet()
+            response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
+            comments_data = fast_json.loads(response.content)
+
+        if "likes" in fields:
+            likes_viewset = LikeViewSet()
+            response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
+            likes_data = fast_json.loads(response.content)
+
+        postObject = build_post_object(post, fields, author_data, comments_data, likes_data)
+
+        return FastJsonResponse(postObject, status=200)
 
     @extend_schema(
         summary="Updates the post",
@@ -583,15 +580,15 @@ class PostViewSet(viewsets.ViewSet):
         request.method = "GET"
         user_viewset = UserViewSet()
         response = user_viewset.retrieve(request, pk=user_id)
-        author_data = json.loads(response.content)
+        author_data = fast_json.loads(response.content)
 
         comments_viewset = CommentViewSet()
         response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
-        comments_data = json.loads(response.content)
+        comments_data = fast_json.loads(response.content)
 
         likes_viewset = LikeViewSet()
         response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
-        likes_data = json.loads(response.content)
+        likes_data = fast_json.loads(response.content)
 
         # Construct the post object to return in the responce
         if post_type in ["PUBLIC", "FRIENDS", "UNLISTED", "DELETED"]:
@@ -632,10 +629,10 @@ class PostViewSet(viewsets.ViewSet):
                 "visibility": post_type,
             }
 
-            return JsonResponse(postObject, status=200)
+            return FastJsonResponse(postObject, status=200)
 
         else:
-            return JsonResponse({"error": "post visibility invalid"}, status=400)
+            return FastJsonResponse({"error": "post visibility invalid"}, status=400)
 
 
     @extend_schema(
@@ -652,9 +649,19 @@ class PostViewSet(viewsets.ViewSet):
             OpenApiParameter(name="page", description="Page number for pagination.", required=False, type=int),
             OpenApiParameter(name="size", description="Number of posts per page.", required=False, type=int),
             OpenApiParameter(name="user_id", description="The id of the request user.", required=False, type=str),
+            OpenApiParameter(name="since", description="Only posts changed after this ISO 8601 timestamp or unix seconds (alias updated_after).", required=False, type=str),
+            OpenApiParameter(name="fields", description="Comma separated post fields to return, type and id are always returned.", required=False, type=str),
+            OpenApiParameter(name="exclude", description="Comma separated post fields to leave out, e.g. comments,likes,content.", required=False, type=str),
         ],
         responses={
             200: OpenApiResponse(description="Successfully retrieved all posts.", response=PostsSerializer),
+            400: OpenApiResponse(
+                description="Invalid since timestamp or unknown field.",
+                response=inline_serializer(
+                    name="InvalidSinceResponse",
+                    fields={"error": serializers.CharField(default="Invalid since timestamp.")}
+                )
+            ),
             405: OpenApiResponse(
                 description="Method not allowed.",
                 response=inline_serializer(
@@ -678,6 +685,16 @@ class PostViewSet(viewsets.ViewSet):
         checkIfRequestAuthenticated(request)
         decoded_author_id = create_user_url_id(request, user_id)
 
+        try:
+            since = parse_since(request)
+        except ValueError:
+            return invalid_since_response()
+
+        try:
+            fields = requested_fields(request, POST_FIELDS)
+        except ValueError as error:
+            return invalid_fields_response(error)
+
         page = request.GET.get("page")
         size = request.GET.get("size")
 
@@ -693,9 +710,11 @@ class PostViewSet(viewsets.ViewSet):
 
         user = get_object_or_404(User, pk=decoded_author_id)
 
-        user_viewset = UserViewSet()
-        response = user_viewset.retrieve(request, pk=decoded_author_id)
-        author_data = json.loads(response.content)
+        author_data = None
+        if "author" in fields:
+            user_viewset = UserViewSet()
+            response = user_viewset.retrieve(request, pk=decoded_author_id)
+            author_data = fast_json.loads(response.content)
 
         if request.user.is_authenticated:
             posts = Post.objects.filter(
@@ -708,6 +727,13 @@ class PostViewSet(viewsets.ViewSet):
                 Q(user=user, visibility="PUBLIC")
             ).order_by('-published')
 
+        if since is not None:
+            # peers syncing only want what changed, oldest change first so they can carry on from the last one
+            posts = posts.filter(updated_at__gt=since).order_by('updated_at', 'id')
+
+        # omitted sections are never queried
+        posts = posts.defer(*[column for column in DEFERRABLE_POST_COLUMNS if column not in fields])
+
         posts_paginator = Paginator(posts, size)
 
         page_posts = posts_paginator.page(page)
@@ -716,50 +742,18 @@ class PostViewSet(viewsets.ViewSet):
 
         for post in page_posts:
 
-            comments_viewset = CommentViewSet()
-            response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
-            comments_data = json.loads(response.content)
+            comments_data = likes_data = None
+            if "comments" in fields:
+                comments_viewset = CommentViewSet()
+                response = comments_viewset.get_comments(request, post_id=post.url_id, user_id=user_id)
+                comments_data = fast_json.loads(response.content)
 
-            likes_viewset = LikeViewSet()
-            response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
-            likes_data = json.loads(response.content)
+            if "likes" in fields:
+                likes_viewset = LikeViewSet()
+                response = likes_viewset.get_post_likes(request, user_id=post.user.url_id, post_id=post.url_id)
+                likes_data = fast_json.loads(response.content)
 
-            postObject = {
-                "type": "post",
-                "title": post.title,
-                "id": post.url_id,
-                "description": post.description,
-                "contentType": post.contentType,
-                "content": post.content,
-                "author": {
-                    "type": "author",
-                    "id": author_data["id"],
-                    "page": author_data["page"],
-                    "host": author_data["host"],
-                    "displayName": author_data["displayName"],
-                    "github": author_data["github"],
-                    "profileImage": author_data["profileImage"],
-                },
-                "comments": {
-                    "type": "comments",
-                    "page": comments_data["page"],
-                    "id": comments_data["id"],
-                    "page_number": comments_data["page_number"],
-                    "size": comments_data["size"],
-                    "count": comments_data["count"],
-                    "src": comments_data["src"]
-                },
-                "likes": {
-                    "types": "likes",
-                    "page": likes_data["page"],
-                    "page_number": likes_data["page_number"],
-                    "size": likes_data["size"],
-                    "count": likes_data["count"],
-                    "src": likes_data["src"]
-                },
-                "published": post.published,
-                "visibility": post.visibility,
-            }
+            postObject = build_post_object(post, fields, author_data, comments_data, likes_data)
 
             filtered_posts_attributes.append(postObject)
         
@@ -771,4 +765,4 @@ class PostViewSet(viewsets.ViewSet):
             "src": filtered_posts_attributes
         }
 
-        return JsonResponse(posts, status=200, safe=False)
\ No newline at end of file
+        return FastJsonResponse(posts, status=200, safe=False)
\ No newline at end of file
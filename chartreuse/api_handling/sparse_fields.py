@@ -0,0 +1,79 @@
+from functools import wraps
+from .. import fast_json
+from ..fast_json import FastJsonResponse
+
+# Sections of a post document, in the order they are written
+POST_FIELDS = ("type", "title", "id", "description", "contentType", "content", "author", "comments", "likes", "published", "visibility")
+
+# Sections of an author document, in the order they are written
+AUTHOR_FIELDS = ("type", "id", "host", "displayName", "github", "profileImage", "page")
+
+# Sections every document keeps, a document without them can not be told apart from another
+REQUIRED_FIELDS = ("type", "id")
+
+def requested_fields(request, available):
+    '''
+    Reads the ?fields= and ?exclude= sparse fieldset parameters of a request.
+
+    Parameters:
+        request: HttpRequest object containing the query parameters.
+        available: tuple of the sections of the document, in document order.
+
+    Returns:
+        tuple of the sections to write, in document order. All of them when neither parameter is given.
+
+    Raises:
+        ValueError when a parameter names a section the document does not have.
+    '''
+    def parse(name):
+        value = request.GET.get(name)
+        if value is None:
+            return None
+        names = {field.strip() for field in value.split(",") if field.strip()}
+        unknown = names.difference(available)
+        if unknown:
+            raise ValueError(f"Unknown field {', '.join(sorted(unknown))}.")
+        return names
+
+    fields = parse("fields")
+    excluded = parse("exclude") or set()
+
+    selected = set(available) if fields is None else fields
+    selected = selected.difference(excluded).union(REQUIRED_FIELDS)
+    return tuple(field for field in available if field in selected)
+
+def invalid_fields_response(error):
+    return FastJsonResponse({"error": str(error)}, status=400)
+
+def sparse(available):
+    '''
+    Wraps a GET view so its json document only keeps the sections asked for with ?fields= and ?exclude=.
+
+    Only the view the url resolves to is wrapped, so the viewsets building each other's documents in-process
+    always get them whole.
+
+    Parameters:
+        available: tuple of the sections of the document, in document order.
+
+    Returns:
+        decorator for the view.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method != "GET" or ("fields" not in request.GET and "exclude" not in request.GET):
+                return view(request, *args, **kwargs)
+            try:
+                fields = requested_fields(request, available)
+            except ValueError as error:
+                return invalid_fields_response(error)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or not response.get("Content-Type", "").startswith("application/json"):
+                return response
+
+            document = fast_json.loads(response.content)
+            response.content = fast_json.dumps({field: value for field, value in document.items() if field in fields})
+            return response
+        return inner
+    return decorator
@@ -4,12 +4,12 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth.models import User as AuthUser
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.paginator import Paginator, EmptyPage
-from django.http import JsonResponse
+from .. import fast_json
+from ..fast_json import FastJsonResponse
 from django.shortcuts import get_object_or_404
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, inline_serializer
 from rest_framework import serializers, viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from urllib.parse import unquote
@@ -19,6 +19,10 @@ from ..views import checkIfRequestAuthenticated
 
 from .. import views
 from ..models import User
+from .sparse_fields import AUTHOR_FIELDS, requested_fields, invalid_fields_response
+from ..pagination import keyset_page
+from ..table_counts import table_counts
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
@@ -33,7 +37,58 @@ def create_user_url_id(request, id):
         scheme = request.scheme
         url = f"{scheme}://{host}/chartreuse/api/authors/{id}"
         return url
-    
+
+# Model columns each author field is built from
+AUTHOR_COLUMNS = {
+    "id": ("url_id",),
+    "host": ("host",),
+    "displayName": ("displayName",),
+    "github": ("github",),
+    "profileImage": ("profileImage",),
+    "page": ("host", "url_id"),
+}
+
+# Order authors are listed in, the unique url_id keeps authors created at the same time in a stable order
+AUTHOR_ORDERING = ("dateCreated", "url_id")
+
+# Default largest number of ids one batch lookup accepts
+DEFAULT_BATCH_MAX_IDS = 500
+
+def author_columns(fields):
+    '''
+    Gets the model columns the requested author fields are built from.
+
+    Parameters:
+        fields: tuple of the author fields to write, from requested_fields.
+
+    Returns:
+        set of the User columns to load.
+    '''
+    columns = {"url_id"}
+    for field in fields:
+        columns.update(AUTHOR_COLUMNS.get(field, ()))
+    return columns
+
+def author_document(user, fields=AUTHOR_FIELDS):
+    '''
+    Builds the json document of an author with only the requested fields.
+
+    Parameters:
+        user: the User object.
+        fields: tuple of the author fields to write, from requested_fields.
+
+    Returns:
+        dict of the author document.
+    '''
+    author = {"type": "author"}
+    for field in fields:
+        if field == "id":
+            author["id"] = user.url_id
+        elif field == "page":
+            author["page"] = user.host + "authors/" + user.url_id
+        elif field != "type":
+            author[field] = getattr(user, field)
+    return author
 
 class UserSerializer(serializers.ModelSerializer):
     type = serializers.CharField(default="author")
@@ -66,9 +121,11 @@ class UserSerializer(serializers.ModelSerializer):
 class UsersSerializer(serializers.Serializer):
     type = serializers.CharField(default="authors")
     authors = UserSerializer(many=True)
+    count = serializers.IntegerField()
+    next = serializers.CharField(allow_null=True)
 
     class Meta:
-        fields = ['type', 'authors']
+        fields = ['type', 'authors', 'count', 'next']
 
 class UserViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
@@ -81,18 +138,29 @@ class UserViewSet(viewsets.ViewSet):
         description=(
             "Gets a paginated list of users based on the provided query parameters (page and size)."
             "\n\n**When to use:** Use this endpoint when you need to display a list of all users."
-            "\n\n**How to use:** Send a GET request to this endpoint. You can use pagination by specifying the 'page' and 'size' parameters."
+            "\n\n**How to use:** Send a GET request to this endpoint. You can use pagination by specifying the 'page' and 'size' parameters, "
+            "or pass the `next` value of the previous page as `cursor` to walk through all users without skipping or repeating any."
             "\n\n**Why to use:** This endpoint allows you to view all users, useful for user management features."
             "\n\n**Why not to use:** Avoid using this endpoint for individual user details; use the specific user endpoint instead."),
         parameters=[
             OpenApiParameter(name='page', type=int, description="Page number for pagination (Default is 1)."),
             OpenApiParameter(name='size', type=int, description="Number of users per page (Default is 50)."),
+            OpenApiParameter(name='cursor', type=str, description="The next value of the previous page, gets the page after it instead of the page number."),
+            OpenApiParameter(name='fields', type=str, description="Comma separated author fields to return, type and id are always returned."),
+            OpenApiParameter(name='exclude', type=str, description="Comma separated author fields to leave out."),
         ],
         responses={
             200: OpenApiResponse( 
                 response=UsersSerializer(), description="A paginated list of users.",
                    
             ),
+            400: OpenApiResponse(
+                description="Unknown field, invalid page, size or cursor.",
+                response=inline_serializer(
+                    name="UnknownFieldResponse",
+                    fields={"error": serializers.CharField(default="Invalid cursor.")}
+                )
+            ),
             404: OpenApiResponse(
                 response=None,
                 description="No users found."
@@ -113,48 +181,160 @@ class UserViewSet(viewsets.ViewSet):
         '''  
         page = request.query_params.get('page', 1)
         size = request.query_params.get('size', 50)
+        cursor = request.query_params.get('cursor')
 
         if (page is None):
             page = 1 # Default page is 1
 
         if (size is None):
             size = 50 # Default size is 50
-        
-        # Gets all the users
-        users = User.objects.all()
 
-        # Paginates users based on the size
-        user_paginator = Paginator(users, size)
         try:
-            page_users = user_paginator.page(page)
-        except EmptyPage:
-            authors = {
+            fields = requested_fields(request, AUTHOR_FIELDS)
+        except ValueError as error:
+            return invalid_fields_response(error)
+
+        try:
+            page = int(page)
+            size = int(size)
+        except ValueError:
+            return FastJsonResponse({"error": "page and size must be numbers."}, status=400)
+
+        authors = {
             "type": "authors",
-            "authors": []
-            }
-            return JsonResponse(authors,safe=False)
+            "authors": [],
+            "count": table_counts.count("authors", User.objects.all()),
+            "next": None
+        }
+        if page < 1 or size < 1:
+            return FastJsonResponse(authors, safe=False)
+
+        # Gets a page of users in a stable order, loading only the columns of the requested fields.
+        # The page after a cursor is found with the index instead of skipping all the rows before it.
+        users = User.objects.only(*author_columns(fields), *AUTHOR_ORDERING)
+        try:
+            page_users, authors["next"] = keyset_page(users, AUTHOR_ORDERING, size, cursor=cursor, offset=(page - 1) * size)
+        except ValueError:
+            return FastJsonResponse({"error": "Invalid cursor."}, status=400)
 
         # Since we have some additional fields, we only want to return the required ones
-        filtered_user_attributes = []
         for user in page_users:
-            page = user.host + "authors/" + user.url_id
+            authors["authors"].append(author_document(user, fields))
 
-            filtered_user_attributes.append({
-                "type": "author",
-                "id": user.url_id,
-                "host": user.host,
-                "displayName": user.displayName,
-                "github": user.github,
-                "profileImage": user.profileImage,
-                "page": page
-            })
+        return FastJsonResponse(authors, safe=False)
 
-        authors = {
-            "type": "authors",
-            "authors": filtered_user_attributes
+    @extend_schema(
+        summary="Get many users at once",
+        description=(
+            "Retrieves the authors with the given ids in one response, optionally only the ones with a GitHub link."
+            "\n\n**When to use:** Use this endpoint to resolve many authors at once, instead of requesting them one by one."
+            "\n\n**How to use:** Send a GET request with an `id` parameter per author, or a POST request with the ids in an `ids` list of the json body. "
+            "Send `github=true` to only get the authors with a GitHub link. Without ids it pages through every author with a GitHub link, "
+            "pass the `next` of each response as `cursor` until it is null."
+            "\n\n**Why to use:** All the authors are looked up with one query and sent in one response."
+            "\n\n**Why not to use:** Ids that are not found are left out of the response, and the number of ids and authors per request is limited."
+        ),
+        request=inline_serializer(
+            name="AuthorBatchRequest",
+            fields={
+                "ids": serializers.ListField(child=serializers.CharField()),
+                "github": serializers.BooleanField(required=False),
+                "size": serializers.IntegerField(required=False),
+                "cursor": serializers.CharField(required=False),
+            }
+        ),
+        parameters=[
+            OpenApiParameter(name='id', type=str, many=True, description="Id of an author to get, repeated for every author."),
+            OpenApiParameter(name='github', type=bool, description="Only get the authors with a GitHub link."),
+            OpenApiParameter(name='size', type=int, description="Number of authors per page when no ids are given, at most the largest number of ids (Default is 500)."),
+            OpenApiParameter(name='cursor', type=str, description="The next value of the previous page, when no ids are given."),
+            OpenApiParameter(name='fields', type=str, description="Comma separated author fields to return, type and id are always returned."),
+            OpenApiParameter(name='exclude', type=str, description="Comma separated author fields to leave out."),
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=UsersSerializer(), description="The authors found, in the order of the ids.",
+            ),
+            400: OpenApiResponse(
+                description="Invalid ids, size or cursor.",
+                response=inline_serializer(
+                    name="InvalidBatchResponse",
+                    fields={"error": serializers.CharField(default="Author ids are required.")}
+                )
+            ),
         }
+    )
+    @action(detail=False, methods=["GET", "POST"])
+    def batch(self, request):
+        '''
+        Gets many users with one query.
+
+        Parameters:
+            request: rest_framework object containing the author ids as query parameters or in the json body.
 
-        return JsonResponse(authors, safe=False)
+        Returns:
+            JsonResponse containing the users found.
+        '''
+        max_ids = getattr(settings, 'AUTHOR_BATCH_MAX_IDS', DEFAULT_BATCH_MAX_IDS)
+        if request.method == "POST":
+            ids = request.data.get("ids", [])
+            github = request.data.get("github", False)
+            size = request.data.get("size", max_ids)
+            cursor = request.data.get("cursor")
+        else:
+            ids = request.query_params.getlist("id")
+            github = request.query_params.get("github", "false")
+            size = request.query_params.get("size", max_ids)
+            cursor = request.query_params.get("cursor")
+
+        if not isinstance(ids, list) or not all(isinstance(author_id, str) for author_id in ids):
+            return FastJsonResponse({"error": "ids must be a list of author ids."}, status=400)
+        if isinstance(github, str):
+            github = github.lower() in ("true", "1", "yes")
+
+        if len(ids) > max_ids:
+            return FastJsonResponse({"error": f"At most {max_ids} author ids can be requested at once."}, status=400)
+        if not ids and not github:
+            return FastJsonResponse({"error": "Author ids are required."}, status=400)
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            return FastJsonResponse({"error": "size must be a number."}, status=400)
+        if size < 1:
+            return FastJsonResponse({"error": "size must be a positive number."}, status=400)
+        if cursor is not None and not isinstance(cursor, str):
+            return FastJsonResponse({"error": "Invalid cursor."}, status=400)
+
+        try:
+            fields = requested_fields(request, AUTHOR_FIELDS)
+        except ValueError as error:
+            return invalid_fields_response(error)
+
+        columns = author_columns(fields)
+        users = User.objects.only(*columns, *AUTHOR_ORDERING)
+        if ids:
+            ids = [create_user_url_id(request, author_id) for author_id in ids]
+            users = users.filter(url_id__in=ids)
+        if github:
+            users = users.filter(github__isnull=False).exclude(github="")
+
+        next_cursor = None
+        if ids:
+            # answered in the order asked for, each author once
+            found = {user.url_id: user for user in users}
+            users = [found[url_id] for url_id in dict.fromkeys(ids) if url_id in found]
+        else:
+            # every author with a github link is paged, at most as many per page as ids could be asked for
+            try:
+                users, next_cursor = keyset_page(users, AUTHOR_ORDERING, min(size, max_ids), cursor=cursor)
+            except ValueError:
+                return FastJsonResponse({"error": "Invalid cursor."}, status=400)
+
+        return FastJsonResponse({
+            "type": "authors",
+            "authors": [author_document(user, fields) for user in users],
+            "next": next_cursor
+        }, safe=False)
 
     @extend_schema(
         summary="Get a specific user",
@@ -165,6 +345,10 @@ class UserViewSet(viewsets.ViewSet):
             "\n\n**Why to use:** This endpoint is useful when you need details about a specific user, such as their display name, GitHub URL, or profile image."
             "\n\n**Why not to use:** Avoid using this endpoint to list multiple users. Use the user list endpoint instead."
         ),
+        parameters=[
+            OpenApiParameter(name='fields', type=str, description="Comma separated author fields to return, type and id are always returned."),
+            OpenApiParameter(name='exclude', type=str, description="Comma separated author fields to leave out."),
+        ],
         responses={
             200: OpenApiResponse(
                 response=UserSerializer,
@@ -197,7 +381,7 @@ class UserViewSet(viewsets.ViewSet):
         page = user.host + "/authors/" + user.url_id
 
         # We only want to return the required fields
-        return JsonResponse({
+        return FastJsonResponse({
             "type": "author",
             "id": user.url_id,
             "host": user.host,
@@ -254,7 +438,7 @@ class UserViewSet(viewsets.ViewSet):
         decoded_user_id = unquote(pk)
         host = get_host_from_id(decoded_user_id)
 
-        data = json.loads(request.body.decode('utf-8'))
+        data = fast_json.loads(request.body)
 
         if(host != views.Host.host):
             # if the user is not on the current host, we need to get the user from the remote host
@@ -264,7 +448,7 @@ class UserViewSet(viewsets.ViewSet):
             response.raise_for_status()
             response_data = response.json()
 
-            return JsonResponse(response_data, safe=False)
+            return FastJsonResponse(response_data, safe=False)
         else:
             # case where the user is on the current host
             user = get_object_or_404(User, pk=decoded_user_id)
@@ -278,9 +462,9 @@ class UserViewSet(viewsets.ViewSet):
                 serializer.save()
             
             else:
-                return JsonResponse(serializer.errors, status=400)
+                return FastJsonResponse(serializer.errors, status=400)
 
-            return JsonResponse({
+            return FastJsonResponse({
                 "type": "author",
                 "id": user.url_id,
                 "host": user.host,
@@ -408,13 +592,13 @@ class UserViewSet(viewsets.ViewSet):
         authUser = AuthUser.objects.filter(username=username)
 
         if authUser.exists():
-            return JsonResponse({"error": "Username already exists."}, status=400)
+            return FastJsonResponse({"error": "Username already exists."}, status=400)
 
         # Validate password
         try:
             validate_password(password)
         except ValidationError as e:
-            return JsonResponse({"error": e.messages}, status=400)
+            return FastJsonResponse({"error": e.messages}, status=400)
     
         authUser = AuthUser.objects.create(
             first_name = firstName,
@@ -441,7 +625,7 @@ class UserViewSet(viewsets.ViewSet):
 
         page = user.host + "/authors/" + user.url_id
 
-        return JsonResponse({
+        return FastJsonResponse({
             "type": "author",
             "id": user.url_id,
             "host": user.host,
@@ -500,15 +684,15 @@ class UserViewSet(viewsets.ViewSet):
         password = request.data.get('password')
 
         if not username or not password:
-            return JsonResponse({"error": "Username and password are required."}, status=400)
+            return FastJsonResponse({"error": "Username and password are required."}, status=400)
 
         user = authenticate(request, username=username, password=password)
 
         if user is not None:
             login(request, user)
-            return JsonResponse({"success": "User logged in successfully."}, status=200)
+            return FastJsonResponse({"success": "User logged in successfully."}, status=200)
         else:
-            return JsonResponse({"error": "Invalid credentials."}, status=400)
+            return FastJsonResponse({"error": "Invalid credentials."}, status=400)
 
 def get_host_from_id(user_id):
     '''
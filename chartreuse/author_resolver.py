@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+from .models import User
+from .table_counts import table_counts
+
+# Default number of seconds a known author stays fresh in each process
+DEFAULT_TTL = 300
+
+# Default number of authors kept in memory before the least recently used are evicted
+DEFAULT_MAX_AUTHORS = 10000
+
+# Fields copied from an author json object onto the User model
+AUTHOR_FIELDS = ('displayName', 'host', 'github', 'profileImage')
+
+class AuthorResolver:
+    '''
+    Purpose: Turn remote author json objects into User objects, discovering the authors we do not know yet.
+
+    Known authors are cached on the request and, for a short TTL, by the process, keyed by their url_id (FQID),
+    so resolving an author that was already seen costs no query. Misses are looked up with a single query and the
+    new authors are inserted with a single INSERT that ignores conflicts. Callers always get their own User copies,
+    so changing a returned object never changes the cache. User saves and deletes in this process invalidate it.
+    '''
+
+    def __init__(self, ttl=None, max_authors=None):
+        self._ttl = ttl
+        self._max_authors = max_authors
+        self._authors = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'AUTHOR_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def max_authors(self):
+        if self._max_authors is not None:
+            return self._max_authors
+        return getattr(settings, 'AUTHOR_CACHE_MAX_AUTHORS', DEFAULT_MAX_AUTHORS)
+
+    def resolve(self, author_docs, request=None, validate=True):
+        '''
+        Purpose: Get the User of every author json object, adding the unknown authors to the database.
+
+        Arguments:
+        author_docs: dict of author url_id to author json object
+        request: the current request, used for the per-request cache
+        validate: skip authors whose json object would not make a valid User
+
+        Returns:
+        dict of url_id to User for every author that exists or was valid
+        '''
+        authors = self.prepare(author_docs, request, validate)
+        self.save(authors, request)
+        return authors
+
+    def resolve_one(self, url_id, json_obj, request=None, validate=True):
+        '''
+        Purpose: resolve() for a single author, returns the User or None if the author json is invalid.
+        '''
+        return self.resolve({url_id: json_obj}, request, validate).get(url_id)
+
+    def prepare(self, author_docs, request=None, validate=True):
+        '''
+        Purpose: Resolve author json objects without writing anything, so callers can validate a whole payload first.
+
+        Arguments:
+        author_docs: dict of author url_id to author json object
+        request: the current request, used for the per-request cache
+        validate: skip authors whose json object would not make a valid User
+
+        Returns:
+        dict of url_id to User, authors not yet in the database are returned unsaved and must be passed to save()
+        '''
+        request_cache = self._request_cache(request)
+        now = time.monotonic()
+        authors = {}
+        missing = []
+
+        with self._lock:
+            for url_id in author_docs:
+                fields = request_cache.get(url_id)
+                if fields is None:
+                    cached = self._authors.get(url_id)
+                    if cached is not None and cached[0] > now:
+                        self._authors.move_to_end(url_id)
+                        fields = cached[1]
+                if fields is None:
+                    missing.append(url_id)
+                else:
+                    authors[url_id] = self._build(fields)
+
+        if not missing:
+            return authors
+
+        found = User.objects.in_bulk(missing)
+        self._remember(request_cache, found.values())
+        for url_id in missing:
+            if url_id in found:
+                authors[url_id] = found[url_id]
+                continue
+
+            json_obj = author_docs[url_id]
+            if not isinstance(json_obj, dict):
+                continue
+            new_author = User(url_id=url_id, **{field: json_obj.get(field) or '' for field in AUTHOR_FIELDS})
+            if validate:
+                try:
+                    # CHATGPT (OpenAI) citation. on November 26, 2024, asked: "why is my validation not being checked, and does the create method check for validation",
+                    # To which chat gpt said my test data urls in test_inpox.py were incorrect and that calling full_clean will validate the items.
+                    new_author.full_clean(exclude=['user'], validate_unique=False)
+                except ValidationError:
+                    continue
+            authors[url_id] = new_author
+        return authors
+
+    def save(self, authors, request=None):
+        '''
+        Purpose: Insert the unsaved authors returned by prepare() in one query.
+
+        Arguments:
+        authors: dict of url_id to User returned by prepare()
+        request: the current request, used for the per-request cache
+        '''
+        new_authors = [author for author in authors.values() if author._state.adding]
+        if not new_authors:
+            return
+        # another request may have discovered the same author in the meantime
+        User.objects.bulk_create(new_authors, ignore_conflicts=True)
+        # bulk_create skips the post_save receivers, so the cached number of authors is dropped here
+        table_counts.invalidate("authors")
+        self._remember(self._request_cache(request), new_authors)
+
+    def invalidate(self, *url_ids):
+        with self._lock:
+            for url_id in url_ids:
+                self._authors.pop(url_id, None)
+
+    def forget_request(self, request):
+        '''
+        Purpose: Drop the per-request cache, used when a savepoint that may have inserted authors is rolled back.
+        '''
+        self._request_cache(request).clear()
+
+    def clear(self):
+        with self._lock:
+            self._authors.clear()
+
+    def _remember(self, request_cache, users):
+        snapshots = {user.url_id: self._snapshot(user) for user in users}
+        request_cache.update(snapshots)
+
+        # rows read or written inside a transaction may be rolled back, so they are not shared with other requests
+        if connection.in_atomic_block:
+            return
+
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for url_id, fields in snapshots.items():
+                self._authors[url_id] = (expires, fields)
+                self._authors.move_to_end(url_id)
+            while len(self._authors) > self.max_authors:
+                self._authors.popitem(last=False)
+
+    def _request_cache(self, request):
+        if request is None:
+            return {}
+        # stored on the underlying HttpRequest so rest_framework and Django views share it
+        http_request = getattr(request, '_request', request)
+        request_cache = getattr(http_request, '_known_authors', None)
+        if request_cache is None:
+            request_cache = {}
+            setattr(http_request, '_known_authors', request_cache)
+        return request_cache
+
+    @staticmethod
+    def _snapshot(user):
+        return {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+
+    @staticmethod
+    def _build(fields):
+        user = User(**fields)
+        user._state.adding = False
+        user._state.db = User.objects.db
+        return user
+
+author_resolver = AuthorResolver()
@@ -0,0 +1,163 @@
+import logging
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpRequest
+from django.utils import timezone
+
+from . import fast_json, node_client
+from .api_handling.posts import PostViewSet
+from .delivery import Delivery, deliver
+from .models import BackfillJob, Post
+
+logger = logging.getLogger(__name__)
+
+# Default number of posts built and sent to the follower's inbox in one batch
+DEFAULT_PAGE_SIZE = 50
+
+def backfill_posts(author):
+    '''
+    Purpose: The posts of an author that a new remote follower should receive.
+
+    Parameters:
+    author: the local User being followed
+
+    Returns:
+    queryset of the posts in id order
+    '''
+    return Post.objects.filter(user=author).exclude(contentType='repost').exclude(visibility='DELETED').order_by('id')
+
+def enqueue_backfill(author, follower, node):
+    '''
+    Purpose: Create the job sending an author's existing posts to a remote follower, without sending anything yet.
+
+    Parameters:
+    author: the local User being followed
+    follower: the remote User that was accepted
+    node: the OUTGOING Node of the follower's host
+
+    Returns:
+    the created BackfillJob
+    '''
+    return BackfillJob.objects.create(author=author, follower=follower, node=node, total_posts=backfill_posts(author).count())
+
+def claim_backfill_job():
+    '''
+    Purpose: Mark the oldest pending job as running, skipping jobs another worker is claiming.
+
+    Returns:
+    the claimed BackfillJob or None when nothing is pending
+    '''
+    with transaction.atomic():
+        job = BackfillJob.objects.select_for_update(skip_locked=True).filter(status='PENDING').order_by('id').first()
+        if job is None:
+            return None
+        job.status = 'RUNNING'
+        job.started_at = job.started_at or timezone.now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+def build_post_document(post):
+    '''
+    Purpose: Build the json document of a post in-process instead of requesting it from our own api.
+
+    Parameters:
+    post: the Post to build
+
+    Returns:
+    the post document, or None when the post can not be served
+    '''
+    request = HttpRequest()
+    request.method = 'GET'
+    response = PostViewSet().get_post(request, user_id=post.user.url_id, post_id=post.url_id)
+    if response.status_code != 200:
+        return None
+    return fast_json.loads(response.content)
+
+def send_backfill_page(job, documents, url, headers):
+    '''
+    Purpose: Send a page of post documents to the follower's inbox as one batch, falling back to a delivery per
+    post when the remote inbox does not answer with a status for every item.
+
+    Parameters:
+    job: the running BackfillJob
+    documents: the post documents of the page
+    url: inbox url of the follower
+    headers: headers sent with the deliveries
+
+    Returns:
+    a (sent, failed) tuple of post counts
+    '''
+    node = job.node
+    try:
+        response = node_client.post(url, node=node, headers=headers, json={"type": "inbox", "items": documents}, auth=(node.username, node.password))
+        results = response.json().get('items') if response.status_code == 200 else None
+    except (requests.exceptions.RequestException, ValueError, AttributeError):
+        results = None
+
+    if not isinstance(results, list) or len(results) != len(documents):
+        # the remote inbox does not take batches, every post goes through the delivery queue with its retries
+        for document in documents:
+            deliver(Delivery(node, url, document, headers))
+        return len(documents), 0
+
+    sent = failed = 0
+    for document, result in zip(documents, results):
+        status_code = result.get('status_code', 500) if isinstance(result, dict) else 500
+        if status_code == 429 or status_code >= 500:
+            # transient failures of single items are retried on their own
+            deliver(Delivery(node, url, document, headers))
+            sent += 1
+        elif status_code >= 400:
+            failed += 1
+        else:
+            sent += 1
+    return sent, failed
+
+def run_backfill_job(job, page_size=None, send_page=send_backfill_page):
+    '''
+    Purpose: Page through the author's posts after the job's cursor and send them to the follower, saving the
+    progress after every page so the job can be watched and resumed.
+
+    Parameters:
+    job: the claimed BackfillJob
+    page_size: number of posts sent per batch
+    send_page: function sending a page of documents, returning its (sent, failed) counts
+    '''
+    page_size = page_size or getattr(settings, 'BACKFILL_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    follower = job.follower
+    url = f"{follower.host}authors/{quote(follower.url_id,safe='')}/inbox/"
+    headers = {
+        "Content-Type": "application/json; charset=utf-8"
+    }
+
+    try:
+        posts = backfill_posts(job.author).select_related('user')
+        while True:
+            page = list(posts.filter(id__gt=job.last_post_id)[:page_size])
+            if not page:
+                break
+
+            documents = []
+            skipped = 0
+            for post in page:
+                document = build_post_document(post)
+                if document is None:
+                    skipped += 1
+                else:
+                    documents.append(document)
+
+            sent, failed = send_page(job, documents, url, headers) if documents else (0, 0)
+            job.last_post_id = page[-1].id
+            BackfillJob.objects.filter(pk=job.pk).update(
+                last_post_id=job.last_post_id, sent_posts=F('sent_posts') + sent, failed_posts=F('failed_posts') + failed + skipped
+            )
+    except Exception as error:
+        logger.exception("Backfill job %s failed", job.pk)
+        BackfillJob.objects.filter(pk=job.pk).update(status='FAILED', error=repr(error), finished_at=timezone.now())
+        return
+
+    BackfillJob.objects.filter(pk=job.pk).update(status='DONE', error='', finished_at=timezone.now())
@@ -0,0 +1,309 @@
+import logging
+import random
+import threading
+from datetime import timedelta
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import node_client
+from .models import DeadLetterDelivery, FailedDelivery
+
+logger = logging.getLogger(__name__)
+
+# Default number of deliveries sent at the same time across all nodes
+DEFAULT_MAX_IN_FLIGHT = 8
+
+# Default number of deliveries sent at the same time to a single node
+DEFAULT_PER_NODE_LIMIT = 2
+
+# Default number of deliveries waiting for a single node before new ones are refused
+DEFAULT_QUEUE_SIZE = 1000
+
+# Default number of attempts before a delivery is moved to the dead letter table
+DEFAULT_MAX_ATTEMPTS = 8
+
+# Default seconds before the first retry, doubled for every further attempt
+DEFAULT_RETRY_BASE_DELAY = 30
+
+# Default longest wait between two attempts, in seconds
+DEFAULT_RETRY_MAX_DELAY = 3600
+
+# Default seconds a queued delivery may take to be sent before retry_deliveries sends it again, in case the
+# process holding it in memory was restarted or crashed
+DEFAULT_SEND_TIMEOUT = 300
+
+# failed_delivery_id is the FailedDelivery row kept for the delivery until it is sent
+Delivery = namedtuple('Delivery', ['node', 'url', 'payload', 'headers', 'failed_delivery_id'], defaults=(None,))
+
+def send_delivery(delivery):
+    '''
+    Purpose: POST a delivery to the remote inbox it is addressed to, recording it for a retry if it fails.
+
+    Connection errors, open circuits, 429 and 5xx responses are retried, other 4xx responses will never succeed
+    and go straight to the dead letter table.
+
+    Parameters:
+    delivery: the Delivery to send
+    '''
+    node = delivery.node
+    try:
+        response = node_client.post(delivery.url, node=node, headers=delivery.headers, json=delivery.payload, auth=(node.username, node.password))
+    except requests.exceptions.RequestException as error:
+        record_failed_delivery(delivery, repr(error))
+        return
+
+    if response.status_code == 429 or response.status_code >= 500:
+        record_failed_delivery(delivery, f"HTTP {response.status_code}")
+    elif response.status_code >= 400:
+        record_failed_delivery(delivery, f"HTTP {response.status_code}", retry=False)
+    elif delivery.failed_delivery_id is not None:
+        FailedDelivery.objects.filter(pk=delivery.failed_delivery_id).delete()
+
+def backoff_delay(attempts):
+    '''
+    Purpose: Seconds to wait before the next attempt of a delivery that already failed attempts times.
+
+    The delay doubles with every attempt up to DELIVERY_RETRY_MAX_DELAY, and a random half of it is jittered
+    so deliveries that failed together do not all come back at the same moment.
+    '''
+    base = getattr(settings, 'DELIVERY_RETRY_BASE_DELAY', DEFAULT_RETRY_BASE_DELAY)
+    cap = getattr(settings, 'DELIVERY_RETRY_MAX_DELAY', DEFAULT_RETRY_MAX_DELAY)
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def record_failed_delivery(delivery, error, retry=True):
+    '''
+    Purpose: Persist a failed delivery with its next attempt time, or dead letter it once it ran out of attempts.
+
+    Parameters:
+    delivery: the Delivery that failed
+    error: description of the failure
+    retry: False when retrying can not help
+    '''
+    logger.warning("Delivery to %s failed: %s", delivery.url, error)
+    max_attempts = getattr(settings, 'DELIVERY_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+    with transaction.atomic():
+        failed = None
+        if delivery.failed_delivery_id is not None:
+            failed = FailedDelivery.objects.select_for_update().filter(pk=delivery.failed_delivery_id).first()
+        if failed is None:
+            failed = FailedDelivery(node=delivery.node, url=delivery.url, payload=delivery.payload, headers=delivery.headers)
+
+        failed.attempts += 1
+        failed.last_error = error
+        if retry and failed.attempts < max_attempts:
+            failed.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(failed.attempts))
+            failed.save()
+            return
+
+        DeadLetterDelivery.objects.create(
+            node=delivery.node, url=failed.url, payload=failed.payload, headers=failed.headers,
+            attempts=failed.attempts, last_error=error, created_at=failed.created_at or timezone.now(),
+        )
+        if failed.pk is not None:
+            failed.delete()
+
+def deliver(delivery):
+    '''
+    Purpose: Persist a delivery and hand it to the scheduler, or keep it for a later retry when the node's queue is full.
+
+    The delivery is written to a FailedDelivery row before it is queued in memory, and the row is deleted once it
+    is sent. A delivery lost with its process is sent by retry_deliveries once DELIVERY_SEND_TIMEOUT has passed.
+    It is queued after the surrounding transaction commits, so the sender never misses the row.
+
+    Parameters:
+    delivery: the Delivery to send
+    '''
+    if delivery.failed_delivery_id is None:
+        outbox = FailedDelivery.objects.create(
+            node=delivery.node, url=delivery.url, payload=delivery.payload, headers=delivery.headers,
+            next_attempt_at=timezone.now() + timedelta(seconds=getattr(settings, 'DELIVERY_SEND_TIMEOUT', DEFAULT_SEND_TIMEOUT)),
+        )
+        delivery = delivery._replace(failed_delivery_id=outbox.pk)
+
+    def submit():
+        if not delivery_scheduler.submit(delivery):
+            record_failed_delivery(delivery, "Delivery queue full")
+    transaction.on_commit(submit)
+
+def retry_due_deliveries(limit=100):
+    '''
+    Purpose: Queue the failed deliveries whose next attempt is due, pushing their next attempt back so
+    a concurrent pass does not pick them up again while they are being sent.
+
+    Parameters:
+    limit: maximum number of deliveries queued in this pass
+
+    Returns:
+    the number of deliveries queued
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        due = list(
+            FailedDelivery.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now, node__status='ENABLED')
+            .select_related('node').order_by('next_attempt_at')[:limit]
+        )
+        FailedDelivery.objects.filter(pk__in=[failed.pk for failed in due]).update(
+            next_attempt_at=now + timedelta(seconds=getattr(settings, 'DELIVERY_RETRY_MAX_DELAY', DEFAULT_RETRY_MAX_DELAY))
+        )
+
+    queued = 0
+    for failed in due:
+        if delivery_scheduler.submit(Delivery(failed.node, failed.url, failed.payload, failed.headers, failed.pk)):
+            queued += 1
+    return queued
+
+def replay_dead_letters(dead_letters):
+    '''
+    Purpose: Give dead lettered deliveries a fresh set of attempts, starting right away.
+
+    Parameters:
+    dead_letters: queryset of DeadLetterDelivery
+
+    Returns:
+    the number of deliveries replayed
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        dead_letters = list(dead_letters)
+        FailedDelivery.objects.bulk_create([
+            FailedDelivery(node_id=dead_letter.node_id, url=dead_letter.url, payload=dead_letter.payload, headers=dead_letter.headers, next_attempt_at=now)
+            for dead_letter in dead_letters
+        ])
+        DeadLetterDelivery.objects.filter(pk__in=[dead_letter.pk for dead_letter in dead_letters]).delete()
+    return len(dead_letters)
+
+class DeliveryScheduler:
+    '''
+    Purpose: Send inbox deliveries to remote nodes in the background without letting one node take all the capacity.
+
+    Deliveries wait in a queue per node. A dispatcher thread hands them to a fixed pool of senders, taking the nodes
+    in round-robin order and skipping any node that already has its limit of deliveries in flight, so a slow or busy
+    peer only ever ties up its own share of the pool. Nothing is spawned per delivery, and a node whose queue is full
+    refuses new deliveries instead of growing without bound.
+    '''
+
+    def __init__(self, max_in_flight=None, per_node_limit=None, queue_size=None, send=send_delivery):
+        self._max_in_flight = max_in_flight
+        self._per_node_limit = per_node_limit
+        self._queue_size = queue_size
+        self._send = send
+        self._queues = OrderedDict()
+        self._in_flight = {}
+        self._total_in_flight = 0
+        self._condition = threading.Condition()
+        self._executor = None
+
+    @property
+    def max_in_flight(self):
+        if self._max_in_flight is not None:
+            return self._max_in_flight
+        return getattr(settings, 'DELIVERY_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+
+    @property
+    def per_node_limit(self):
+        if self._per_node_limit is not None:
+            return self._per_node_limit
+        return getattr(settings, 'DELIVERY_PER_NODE_LIMIT', DEFAULT_PER_NODE_LIMIT)
+
+    @property
+    def queue_size(self):
+        if self._queue_size is not None:
+            return self._queue_size
+        return getattr(settings, 'DELIVERY_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+
+    def submit(self, delivery):
+        '''
+        Purpose: Queue a delivery for its node.
+
+        Arguments:
+        delivery: the Delivery to send
+
+        Returns:
+        True if the delivery was queued, False if the node's queue is full
+        '''
+        key = delivery.node.host
+        with self._condition:
+            queue = self._queues.setdefault(key, deque())
+            if len(queue) >= self.queue_size:
+                return False
+            queue.append(delivery)
+            self._start()
+            self._condition.notify_all()
+        return True
+
+    def pending(self):
+        with self._condition:
+            return sum(len(queue) for queue in self._queues.values()) + self._total_in_flight
+
+    def drain(self, timeout=None):
+        '''
+        Purpose: Wait until every queued delivery has been sent.
+
+        Returns:
+        True if the queues emptied before the timeout
+        '''
+        with self._condition:
+            return self._condition.wait_for(lambda: self._total_in_flight == 0 and not any(self._queues.values()), timeout)
+
+    def _start(self):
+        # started on first use so importing the module never spawns threads
+        if self._executor is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='delivery')
+        threading.Thread(target=self._dispatch, name='delivery-dispatcher', daemon=True).start()
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                delivery = self._next()
+                while delivery is None:
+                    self._condition.wait()
+                    delivery = self._next()
+            self._executor.submit(self._run, delivery)
+
+    def _next(self):
+        '''
+        Purpose: Take the next delivery in round-robin order from a node that is under its in-flight limit.
+        Must be called while holding the condition.
+        '''
+        if self._total_in_flight >= self.max_in_flight:
+            return None
+
+        for key in list(self._queues):
+            queue = self._queues[key]
+            if not queue:
+                if not self._in_flight.get(key):
+                    del self._queues[key]
+                continue
+            if self._in_flight.get(key, 0) >= self.per_node_limit:
+                continue
+
+            # the node goes to the back of the line once it got its turn
+            self._queues.move_to_end(key)
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            self._total_in_flight += 1
+            return queue.popleft()
+        return None
+
+    def _run(self, delivery):
+        try:
+            self._send(delivery)
+        except Exception:
+            logger.exception("Delivery to %s failed", delivery.url)
+        finally:
+            close_old_connections()
+            with self._condition:
+                key = delivery.node.host
+                self._in_flight[key] -= 1
+                self._total_in_flight -= 1
+                self._condition.notify_all()
+
+delivery_scheduler = DeliveryScheduler()
@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # orjson is a requirement, the standard library encoder only covers installs without it
+    orjson = None
+
+def default(value):
+    '''
+    Purpose: Convert the values neither json encoder knows into json types.
+
+    Parameters:
+    value: the value that could not be encoded
+
+    Returns:
+    a string for lazy translations and decimals, raises TypeError for anything else
+    '''
+    if isinstance(value, (Promise, decimal.Decimal)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONEncoder(DjangoJSONEncoder):
+    '''
+    Standard library encoder writing the same json as orjson, so responses do not change with the backend in use.
+    Datetimes keep their microseconds, UTC is written as Z and non-ASCII text in urls and content is written as UTF-8.
+    '''
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            text = o.isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+        if isinstance(o, datetime.time):
+            return o.isoformat()
+        try:
+            return default(o)
+        except TypeError:
+            return super().default(o)
+
+def use_orjson():
+    '''
+    Purpose: Whether json is encoded and decoded with orjson, which is used when it is installed unless the
+    FAST_JSON_BACKEND setting asks for the standard library.
+
+    Returns:
+    True when orjson is used
+    '''
+    return orjson is not None and getattr(settings, 'FAST_JSON_BACKEND', 'orjson') == 'orjson'
+
+def dumps(data):
+    '''
+    Purpose: Encode data to json.
+
+    Parameters:
+    data: the dicts, lists and scalars to encode, datetimes, uuids and decimals included
+
+    Returns:
+    the UTF-8 encoded json bytes
+    '''
+    if use_orjson():
+        return orjson.dumps(data, default=default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=FastJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def loads(data):
+    '''
+    Purpose: Decode json.
+
+    Parameters:
+    data: json as bytes or str
+
+    Returns:
+    the decoded data, raises ValueError when it is not valid json
+    '''
+    if use_orjson():
+        return orjson.loads(data)
+    return json.loads(data)
+
+class FastJsonResponse(JsonResponse):
+    '''
+    JsonResponse encoding its data with orjson when it is installed and with the standard library otherwise.
+    An explicit encoder or json_dumps_params is honoured by using the standard library.
+    '''
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if encoder is not None or json_dumps_params:
+            super().__init__(data, encoder=encoder or DjangoJSONEncoder, safe=safe, json_dumps_params=json_dumps_params, **kwargs)
+            return
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super(JsonResponse, self).__init__(content=dumps(data), **kwargs)
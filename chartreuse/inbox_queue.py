@@ -0,0 +1,241 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .activity_ledger import activity_key, activity_ledger
+from .delivery import backoff_delay
+from .models import InboxActivity
+
+# Activity types the inbox knows how to apply
+ACTIVITY_TYPES = ('post', 'comment', 'like', 'follow')
+
+# Default number of pending activities claimed per pass of the worker
+DEFAULT_BATCH_SIZE = 100
+
+# Default number of times an activity is tried before it is left FAILED
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Default number of seconds a claimed activity stays with its worker before another worker may claim it
+DEFAULT_CLAIM_TIMEOUT = 300
+
+def activity_object_key(data):
+    '''
+    Purpose: Find the object an activity is about, activities of the same type sharing a key must be applied in the
+    order they arrived.
+
+    Parameters:
+    data: the parsed json activity
+
+    Returns:
+    the url of the post for posts and comments, the liked object for likes and the followed author for follows
+    '''
+    activity_type = data.get('type')
+    if activity_type == 'post':
+        key = data.get('id')
+    elif activity_type == 'comment':
+        key = data.get('post')
+    elif activity_type == 'like':
+        key = data.get('object')
+    else:
+        key = data.get('object')
+        if isinstance(key, dict):
+            key = key.get('id')
+    return str(key or '')[:500]
+
+def enqueue_activity(recipient, data, ledger_key=None):
+    '''
+    Purpose: Persist an inbox activity so the process_inbox worker can apply it later.
+
+    A retry of an activity with an id that is still waiting for the worker is not queued again. Activities are
+    only entered in the activity ledger once the worker applied them, so a retry of one that failed is queued anew.
+
+    Parameters:
+    recipient: the User whose inbox received the activity
+    data: the parsed json activity
+    ledger_key: the activity_key of the activity, None for activities without an id
+
+    Returns:
+    the created InboxActivity, or the one already waiting
+    '''
+    if ledger_key is not None:
+        waiting = InboxActivity.objects.filter(
+            recipient=recipient, payload_hash=ledger_key.payload_hash, status__in=('PENDING', 'RUNNING')
+        ).first()
+        if waiting is not None:
+            return waiting
+
+    return InboxActivity.objects.create(
+        recipient=recipient,
+        activity_type=data.get('type'),
+        object_key=activity_object_key(data),
+        payload=data,
+        payload_hash=ledger_key.payload_hash if ledger_key is not None else '',
+    )
+
+def claim_pending_activities(batch_size=DEFAULT_BATCH_SIZE):
+    '''
+    Purpose: Mark the oldest due activities as running, skipping rows another worker is claiming.
+
+    Pending activities are due once their retry time has passed, and running ones once their claim has
+    timed out because the worker applying them died. An activity is held back while an older activity of the
+    same type about the same object is still waiting outside this claim, e.g. for its retry or with another
+    worker, so a post update is never applied before an earlier one that is being retried. Activities of other
+    types are not held back, a comment waiting for its post must not keep the post from being applied.
+
+    Parameters:
+    batch_size: maximum number of activities claimed
+
+    Returns:
+    the claimed InboxActivity objects, in arrival order
+    '''
+    now = timezone.now()
+    claim_timeout = getattr(settings, 'INBOX_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)
+    with transaction.atomic():
+        activities = list(
+            InboxActivity.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING') | Q(status='RUNNING'))
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .order_by('id')[:batch_size]
+        )
+
+        # the oldest unfinished activity of every type and object that is not part of this claim
+        blocking = {
+            (activity_type, object_key): first_id
+            for activity_type, object_key, first_id in InboxActivity.objects
+            .filter(object_key__in={activity.object_key for activity in activities if activity.object_key})
+            .filter(status__in=('PENDING', 'RUNNING'))
+            .exclude(pk__in=[activity.pk for activity in activities])
+            .values('activity_type', 'object_key').annotate(first_id=Min('id')).values_list('activity_type', 'object_key', 'first_id')
+        }
+        activities = [
+            activity for activity in activities
+            if activity.pk < blocking.get((activity.activity_type, activity.object_key), activity.pk + 1)
+        ]
+
+        InboxActivity.objects.filter(pk__in=[activity.pk for activity in activities]).update(
+            status='RUNNING', attempts=F('attempts') + 1, next_attempt_at=now + timedelta(seconds=claim_timeout)
+        )
+
+    for activity in activities:
+        activity.status = 'RUNNING'
+        activity.attempts += 1
+    return activities
+
+def release_activity(activity):
+    '''
+    Purpose: Give back a claimed activity without applying it, without counting the claim as an attempt.
+    '''
+    activity.status = 'PENDING'
+    activity.attempts -= 1
+    activity.next_attempt_at = None
+    InboxActivity.objects.filter(pk=activity.pk).update(status='PENDING', attempts=F('attempts') - 1, next_attempt_at=None)
+
+def apply_activity(activity):
+    '''
+    Purpose: Apply a queued activity and record its outcome on the row.
+
+    An activity that failed because the object it refers to is missing, such as a like on a comment that
+    another worker has not created yet, or that raised, goes back to PENDING with a backoff until it has
+    been tried INBOX_MAX_ATTEMPTS times.
+
+    Parameters:
+    activity: the InboxActivity to apply
+    '''
+    # imported here because the inbox view imports this module to enqueue activities
+    from .view.inbox import process_activity
+
+    try:
+        response = process_activity(activity.payload)
+    except Exception as error:
+        activity.status = 'FAILED'
+        activity.status_code = None
+        activity.error = repr(error)
+    else:
+        if response is None:
+            # process_activity does not answer activity types it does not know
+            activity.status = 'FAILED'
+            activity.status_code = 400
+            activity.error = 'Unknown activity type'
+        elif response.status_code >= 400:
+            activity.status = 'FAILED'
+            activity.status_code = response.status_code
+            activity.error = response.content.decode('utf-8')
+        else:
+            activity.status = 'DONE'
+            activity.status_code = response.status_code
+            # retries of the activity from now on are answered from the ledger
+            activity_ledger.record(activity_key(activity.payload))
+
+    activity.next_attempt_at = None
+    retryable = activity.status_code is None or activity.status_code == 404
+    if activity.status == 'FAILED' and retryable and activity.attempts < getattr(settings, 'INBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+        activity.status = 'PENDING'
+        activity.next_attempt_at = timezone.now() + timedelta(seconds=backoff_delay(activity.attempts))
+
+    activity.processed_at = timezone.now()
+    activity.save(update_fields=['status', 'status_code', 'error', 'processed_at', 'next_attempt_at'])
+
+def apply_in_order(activities):
+    '''
+    Purpose: Apply claimed activities in arrival order. Once an activity goes back to PENDING for a retry, the
+    later activities of its type about the same object are released instead of being applied ahead of it.
+
+    Returns:
+    the number of activities applied
+    '''
+    held = set()
+    applied = 0
+    for activity in activities:
+        key = (activity.activity_type, activity.object_key)
+        if activity.object_key and key in held:
+            release_activity(activity)
+            continue
+        apply_activity(activity)
+        applied += 1
+        if activity.status == 'PENDING':
+            held.add(key)
+    return applied
+
+def _apply_partition(activities):
+    '''
+    Purpose: Apply one worker's share of a batch in arrival order, then release the thread's database connection.
+    '''
+    try:
+        return apply_in_order(activities)
+    finally:
+        connection.close()
+
+def process_pending_activities(workers=1, batch_size=DEFAULT_BATCH_SIZE):
+    '''
+    Purpose: Apply the oldest batch of pending inbox activities.
+
+    Activities are claimed first, so overlapping passes and other worker processes never apply the same
+    activity twice. They are split between the workers by object key, so every activity about the same
+    object is handled by the same worker in the order it was received while unrelated objects run in parallel.
+
+    Parameters:
+    workers: number of threads applying activities
+    batch_size: maximum number of activities claimed in this pass
+
+    Returns:
+    the number of activities processed
+    '''
+    activities = claim_pending_activities(batch_size)
+    if not activities:
+        return 0
+
+    if workers <= 1:
+        return apply_in_order(activities)
+
+    partitions = [[] for _ in range(workers)]
+    for activity in activities:
+        partitions[zlib.crc32(activity.object_key.encode('utf-8')) % workers].append(activity)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # sum() re-raises any exception raised inside a worker
+        return sum(executor.map(_apply_partition, [partition for partition in partitions if partition]))
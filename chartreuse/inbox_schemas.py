@@ -0,0 +1,122 @@
+from jsonschema import Draft7Validator
+
+from .models import CONTENT_TYPE_CHOICES, VISIBILITY_CHOICES
+
+# Maximum number of validation errors reported back to a peer
+MAX_ERRORS = 20
+
+STRING = {'type': 'string'}
+OPTIONAL_STRING = {'type': ['string', 'null']}
+
+AUTHOR_SCHEMA = {
+    'type': 'object',
+    'required': ['id'],
+    'properties': {
+        'type': STRING,
+        'id': {'type': 'string', 'minLength': 1},
+        'host': OPTIONAL_STRING,
+        'displayName': OPTIONAL_STRING,
+        'github': OPTIONAL_STRING,
+        'profileImage': OPTIONAL_STRING,
+        'page': OPTIONAL_STRING,
+    },
+}
+
+# nested comments and likes that are malformed are skipped rather than rejecting their post, so only their containers are checked
+NESTED_LIST_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'src': {'type': 'array', 'items': {'type': 'object'}},
+    },
+}
+
+POST_SCHEMA = {
+    'type': 'object',
+    'required': ['type', 'title', 'description', 'id', 'contentType', 'content', 'author', 'published', 'visibility'],
+    'properties': {
+        'type': {'const': 'post'},
+        'title': STRING,
+        'description': STRING,
+        'id': STRING,
+        'contentType': {'enum': list(CONTENT_TYPE_CHOICES)},
+        'content': STRING,
+        'author': AUTHOR_SCHEMA,
+        'published': STRING,
+        'visibility': {'enum': list(VISIBILITY_CHOICES)},
+        'comments': NESTED_LIST_SCHEMA,
+        'likes': NESTED_LIST_SCHEMA,
+    },
+}
+
+LIKE_SCHEMA = {
+    'type': 'object',
+    'required': ['type', 'author', 'published', 'id', 'object'],
+    'properties': {
+        'type': {'const': 'like'},
+        'author': AUTHOR_SCHEMA,
+        'published': STRING,
+        'id': STRING,
+        'object': STRING,
+    },
+}
+
+COMMENT_SCHEMA = {
+    'type': 'object',
+    'required': ['type', 'author', 'comment', 'contentType', 'id', 'post', 'published'],
+    'properties': {
+        'type': {'const': 'comment'},
+        'author': AUTHOR_SCHEMA,
+        'comment': STRING,
+        'contentType': {'enum': list(CONTENT_TYPE_CHOICES)},
+        'id': STRING,
+        'post': STRING,
+        'published': STRING,
+        'likes': NESTED_LIST_SCHEMA,
+    },
+}
+
+FOLLOW_SCHEMA = {
+    'type': 'object',
+    'required': ['type', 'actor', 'object'],
+    'properties': {
+        'type': {'const': 'follow'},
+        'actor': AUTHOR_SCHEMA,
+        'object': AUTHOR_SCHEMA,
+    },
+}
+
+# compiled once at import, validating a payload then does no schema work
+VALIDATORS = {
+    activity_type: Draft7Validator(schema)
+    for activity_type, schema in (
+        ('author', AUTHOR_SCHEMA),
+        ('post', POST_SCHEMA),
+        ('comment', COMMENT_SCHEMA),
+        ('like', LIKE_SCHEMA),
+        ('follow', FOLLOW_SCHEMA),
+    )
+}
+
+def validate_document(data, document_type=None):
+    '''
+    Purpose: Check an inbound federation document against its schema without touching the database.
+
+    Parameters:
+    data: the parsed json document
+    document_type: the schema to use, defaults to the type field of the document
+
+    Returns:
+    list of {"path": ..., "message": ...} errors, empty when the document is valid
+    '''
+    if not isinstance(data, dict):
+        return [{'path': '', 'message': 'Expected a json object'}]
+
+    validator = VALIDATORS.get(document_type or data.get('type'))
+    if validator is None:
+        return [{'path': 'type', 'message': f"Unsupported type {data.get('type')!r}"}]
+
+    errors = sorted(validator.iter_errors(data), key=lambda error: list(error.absolute_path))
+    return [
+        {'path': '.'.join(str(part) for part in error.absolute_path), 'message': error.message}
+        for error in errors[:MAX_ERRORS]
+    ]
@@ -0,0 +1,82 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Like
+
+logger = logging.getLogger(__name__)
+
+# Default number of seconds a like toggle waits for further toggles before its final state is delivered
+DEFAULT_DEBOUNCE = 2
+
+class LikeCoalescer:
+    '''
+    Purpose: Debounce outbound like deliveries per (user, liked object).
+
+    Every toggle restarts the object's timer, and once the user stops toggling for the debounce window the
+    current state is read back: a like that still exists is delivered once, and an unlike sends nothing since
+    remote nodes have no way to remove a like. With a debounce of 0 the final state is delivered right away.
+    '''
+
+    def __init__(self, send, debounce=None):
+        self._send = send
+        self._debounce = debounce
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def debounce(self):
+        if self._debounce is not None:
+            return self._debounce
+        return getattr(settings, 'LIKE_DELIVERY_DEBOUNCE', DEFAULT_DEBOUNCE)
+
+    def toggled(self, user_id, post_id=None, comment_id=None):
+        '''
+        Purpose: Record that a user liked or unliked a post or comment.
+
+        Arguments:
+        user_id: url_id of the user who toggled the like
+        post_id: pk of the liked post
+        comment_id: pk of the liked comment
+        '''
+        key = (user_id, post_id, comment_id)
+        if self.debounce <= 0:
+            self._flush(key)
+            return
+
+        timer = threading.Timer(self.debounce, self._fire, args=(key,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.pop(key, None)
+            if previous is not None:
+                previous.cancel()
+            self._timers[key] = timer
+        timer.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._timers)
+
+    def _fire(self, key):
+        with self._lock:
+            if self._timers.get(key) is not threading.current_thread():
+                return
+            del self._timers[key]
+        try:
+            self._flush(key)
+        except Exception:
+            logger.exception("Delivering like %s failed", key)
+        finally:
+            close_old_connections()
+
+    def _flush(self, key):
+        user_id, post_id, comment_id = key
+        like = Like.objects.filter(user_id=user_id, post_id=post_id, comment_id=comment_id).select_related('user').first()
+        if like is None:
+            return
+        if not like.url_id:
+            # Like.save only assigns url_id in memory, so rebuild it for rows read back from the database
+            like.url_id = f"{like.user.url_id}/liked/{like.pk}"
+        self._send(like)
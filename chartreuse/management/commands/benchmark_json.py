@@ -0,0 +1,123 @@
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.utils import timezone
+from chartreuse import fast_json
+from chartreuse.fast_json import FastJsonResponse
+
+
+def author_document(number):
+    return {
+        "type": "author",
+        "id": f"https://node.example/chartreuse/api/authors/{number}",
+        "host": "https://node.example/chartreuse/api/",
+        "displayName": f"Author {number}",
+        "github": f"https://github.com/author{number}",
+        "profileImage": "https://node.example/static/images/default.png",
+        "page": f"https://node.example/chartreuse/api/authors/https://node.example/chartreuse/api/authors/{number}",
+    }
+
+def like_document(post_id, number, published):
+    author = author_document(number)
+    return {
+        "type": "like",
+        "author": author,
+        "published": published,
+        "id": f"{author['id']}/liked/{number}",
+        "object": post_id,
+    }
+
+def post_page(posts, comments, likes):
+    '''
+    Purpose: Build a page of post documents shaped like the ones the posts endpoint sends.
+
+    Parameters:
+    posts: number of posts on the page
+    comments: number of comments embedded in every post
+    likes: number of likes embedded in every post and comment
+
+    Returns:
+    dict of the page
+    '''
+    published = timezone.now()
+    page = []
+    for number in range(posts):
+        post_id = f"https://node.example/chartreuse/api/authors/1/posts/{number}"
+        comment_documents = [{
+            "type": "comment",
+            "author": author_document(comment),
+            "comment": "A comment on the post, " * 4,
+            "contentType": "text/markdown",
+            "published": published,
+            "id": f"https://node.example/chartreuse/api/authors/{comment}/commented/{number}{comment}",
+            "post": post_id,
+            "likes": {
+                "type": "likes",
+                "page": post_id,
+                "id": f"{post_id}/likes",
+                "page_number": 1,
+                "size": 50,
+                "count": likes,
+                "src": [like_document(post_id, like, published) for like in range(likes)],
+            },
+        } for comment in range(comments)]
+        page.append({
+            "type": "post",
+            "title": f"Post {number}",
+            "id": post_id,
+            "description": "The description of the post",
+            "contentType": "text/markdown",
+            "content": "The content of the post. " * 40,
+            "author": author_document(1),
+            "comments": {
+                "type": "comments",
+                "page": post_id,
+                "id": f"{post_id}/comments",
+                "page_number": 1,
+                "size": 5,
+                "count": comments,
+                "src": comment_documents,
+            },
+            "likes": {
+                "types": "likes",
+                "page": post_id,
+                "page_number": 1,
+                "size": 50,
+                "count": likes,
+                "src": [like_document(post_id, like, published) for like in range(likes)],
+            },
+            "published": published,
+            "visibility": "PUBLIC",
+        })
+    return {"type": "posts", "page_number": 1, "size": posts, "count": posts, "src": page}
+
+
+class Command(BaseCommand):
+    help = "Times encoding and decoding a large page of posts with the standard library and with chartreuse.fast_json."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50, help="Posts on the page.")
+        parser.add_argument('--comments', type=int, default=5, help="Comments embedded in every post.")
+        parser.add_argument('--likes', type=int, default=20, help="Likes embedded in every post and comment.")
+        parser.add_argument('--repeat', type=int, default=20, help="Times each step is run.")
+
+    def handle(self, *args, **options):
+        data = post_page(options['posts'], options['comments'], options['likes'])
+        repeat = options['repeat']
+        content = JsonResponse(data).content
+
+        results = [
+            ("encode", lambda: JsonResponse(data), lambda: FastJsonResponse(data)),
+            ("decode", lambda: json.loads(content), lambda: fast_json.loads(content)),
+        ]
+
+        backend = "orjson" if fast_json.use_orjson() else "json"
+        self.stdout.write(f"Page of {options['posts']} posts, {len(content)} bytes, fast_json backend {backend}")
+        for name, stdlib, fast in results:
+            stdlib_time = min(timeit.repeat(stdlib, number=1, repeat=repeat)) * 1000
+            fast_time = min(timeit.repeat(fast, number=1, repeat=repeat)) * 1000
+            self.stdout.write(
+                f"{name}: json {stdlib_time:.2f} ms, fast_json {fast_time:.2f} ms, {stdlib_time / fast_time:.1f}x"
+            )
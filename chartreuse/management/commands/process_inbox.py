@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chartreuse.inbox_queue import DEFAULT_BATCH_SIZE, process_pending_activities
+
+
+class Command(BaseCommand):
+    help = "Applies inbox activities queued while INBOX_ASYNC is enabled."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Number of threads applying activities.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Activities claimed per pass.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        # nothing new is queued while INBOX_ASYNC is off, so only what is left over is drained
+        once = options['once'] or not getattr(settings, 'INBOX_ASYNC', False)
+        total = 0
+        while True:
+            count = process_pending_activities(workers=options['workers'], batch_size=options['batch_size'])
+            total += count
+            if count:
+                continue
+            if once:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} inbox activities."))
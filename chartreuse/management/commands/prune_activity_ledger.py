@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from chartreuse.activity_ledger import activity_ledger
+
+
+class Command(BaseCommand):
+    help = "Deletes processed inbox activities older than INBOX_LEDGER_TTL, peers no longer retry them."
+
+    def handle(self, *args, **options):
+        deleted = activity_ledger.prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} processed activities."))
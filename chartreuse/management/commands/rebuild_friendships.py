@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from chartreuse.view.follow_utils import rebuild_friendships
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized friendship table from the current follows."
+
+    def handle(self, *args, **options):
+        count = rebuild_friendships()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count // 2} friendships."))
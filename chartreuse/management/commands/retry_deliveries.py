@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from chartreuse.delivery import delivery_scheduler, retry_due_deliveries
+
+
+class Command(BaseCommand):
+    help = "Retries failed inbox deliveries whose backoff has elapsed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Deliveries queued per pass.")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to wait when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Retry what is due now and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            count = retry_due_deliveries(limit=options['batch_size'])
+            total += count
+            # wait for this pass to be sent so failures are rescheduled before the next one
+            delivery_scheduler.drain()
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Retried {total} deliveries."))
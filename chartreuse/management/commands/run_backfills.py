@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from chartreuse.backfill import claim_backfill_job, run_backfill_job
+from chartreuse.delivery import delivery_scheduler
+
+
+class Command(BaseCommand):
+    help = "Sends the existing posts of authors to their newly accepted remote followers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=None, help="Posts sent per batch.")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to wait when no job is pending.")
+        parser.add_argument('--once', action='store_true', help="Run the pending jobs and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            job = claim_backfill_job()
+            if job is not None:
+                run_backfill_job(job, page_size=options['page_size'])
+                total += 1
+                continue
+            # posts that fell back to single deliveries are still being sent
+            delivery_scheduler.drain()
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} backfill jobs."))
@@ -0,0 +1,180 @@
+import io
+import re
+import zlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.http.request import RequestDataTooBig
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Default smallest response body, in bytes, worth compressing
+DEFAULT_MIN_SIZE = 1024
+
+# Default brotli quality, low enough to compress dynamic pages on every request
+DEFAULT_BROTLI_QUALITY = 5
+
+# Default largest request body, in bytes, a compressed request may expand to
+DEFAULT_MAX_REQUEST_BYTES = 2621440
+
+# Content types that are already compressed and only get bigger when compressed again
+INCOMPRESSIBLE_TYPES = re.compile(r'^(image/(?!svg)|video/|audio/|application/(zip|gzip|x-gzip|octet-stream|pdf))')
+
+# Content types brotli is used for. Pages that may reflect user input next to a secret, such as html with its csrf
+# token, are left to GZipMiddleware, which pads them against BREACH
+BROTLI_TYPES = re.compile(r'^application/([\w.-]+\+)?json\b')
+
+# Input read per step when decompressing a request body, so an oversized body is noticed early
+DECOMPRESS_CHUNK_SIZE = 16384
+
+def accepted_encodings(header):
+    '''
+    Purpose: Parse an Accept-Encoding header.
+
+    Parameters:
+    header: the Accept-Encoding value
+
+    Returns:
+    set of the content codings the client accepts, leaving out the ones it refused with q=0
+    '''
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+def brotli_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        # flushing every chunk keeps the response streaming instead of buffering it all in the compressor
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+async def brotli_async_sequence(sequence, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+class RequestTooLarge(Exception):
+    pass
+
+def decompress_body(body, encoding, max_bytes):
+    '''
+    Purpose: Decompress a request body, stopping as soon as it expands past max_bytes.
+
+    Parameters:
+    body: the compressed request body
+    encoding: the Content-Encoding of the request, gzip, deflate or br
+    max_bytes: largest decompressed size accepted
+
+    Returns:
+    the decompressed body, raises RequestTooLarge when it is bigger than max_bytes and ValueError when it is corrupt
+    '''
+    if encoding == 'br':
+        decompressor = brotli.Decompressor()
+        output = io.BytesIO()
+        for start in range(0, len(body), DECOMPRESS_CHUNK_SIZE):
+            try:
+                output.write(decompressor.process(body[start:start + DECOMPRESS_CHUNK_SIZE]))
+            except brotli.error as error:
+                raise ValueError(str(error))
+            if output.tell() > max_bytes:
+                raise RequestTooLarge()
+        return output.getvalue()
+
+    # 47 detects gzip and zlib headers, raw deflate streams are tried when that fails
+    for wbits in ((47,) if encoding != 'deflate' else (47, -zlib.MAX_WBITS)):
+        decompressor = zlib.decompressobj(wbits)
+        try:
+            data = decompressor.decompress(body, max_bytes + 1)
+        except zlib.error as error:
+            last_error = error
+            continue
+        if len(data) > max_bytes:
+            raise RequestTooLarge()
+        if not decompressor.eof:
+            raise ValueError('Truncated compressed body')
+        return data
+    raise ValueError(str(last_error))
+
+class CompressionMiddleware(GZipMiddleware):
+    '''
+    Compresses json responses with brotli when it is installed and the client accepts it, and every other response
+    with gzip. Streaming responses are compressed chunk by chunk and bodies under COMPRESSION_MIN_SIZE are sent as is.
+
+    Request bodies sent with a gzip, deflate or br Content-Encoding are decompressed before any view reads them,
+    so peers can post compressed inbox deliveries.
+    '''
+
+    def process_request(self, request):
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            return None
+        if encoding == 'x-gzip':
+            encoding = 'gzip'
+        if encoding not in ('gzip', 'deflate', 'br') or (encoding == 'br' and brotli is None):
+            return JsonResponse({'error': f'Unsupported Content-Encoding {encoding}'}, status=415)
+
+        max_bytes = getattr(settings, 'COMPRESSION_MAX_REQUEST_BYTES', DEFAULT_MAX_REQUEST_BYTES)
+        try:
+            body = decompress_body(request.body, encoding, max_bytes)
+        except (RequestTooLarge, RequestDataTooBig):
+            return JsonResponse({'error': 'Payload too large'}, status=413)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid compressed body'}, status=400)
+
+        request._body = body
+        request._stream = io.BytesIO(body)
+        request.META['CONTENT_LENGTH'] = str(len(body))
+        del request.META['HTTP_CONTENT_ENCODING']
+        return None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or INCOMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is None or 'br' not in accepted or not BROTLI_TYPES.match(response.get('Content-Type', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = brotli_async_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = brotli_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=quality)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # the compressed body is no longer byte for byte the one a strong ETag was made for
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
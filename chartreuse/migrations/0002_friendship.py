@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+def populate_friendships(apps, schema_editor):
+    Follow = apps.get_model('chartreuse', 'Follow')
+    Friendship = apps.get_model('chartreuse', 'Friendship')
+    mutual_follows = Follow.objects.filter(
+        Exists(Follow.objects.filter(follower=OuterRef('followed'), followed=OuterRef('follower')))
+    ).values_list('follower_id', 'followed_id')
+    Friendship.objects.bulk_create(
+        [Friendship(user_id=follower, friend_id=followed) for follower, followed in mutual_follows],
+        ignore_conflicts=True
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Friendship',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('friend', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chartreuse.user')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='friendships', to='chartreuse.user')),
+            ],
+            options={
+                'unique_together': {('user', 'friend')},
+            },
+        ),
+        migrations.RunPython(populate_friendships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-19 17:42
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import migrations, models
+
+def hash_incoming_passwords(apps, schema_editor):
+    Node = apps.get_model('chartreuse', 'Node')
+    for node in Node.objects.filter(follow_status='INCOMING'):
+        try:
+            identify_hasher(node.password)
+        except ValueError:
+            node.password = make_password(node.password)
+            node.save(update_fields=['password'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0002_friendship'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='node',
+            name='password',
+            field=models.CharField(max_length=128),
+        ),
+        migrations.RunPython(hash_incoming_passwords, migrations.RunPython.noop),
+    ]
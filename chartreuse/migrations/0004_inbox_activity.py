@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-19 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0003_hash_node_passwords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(max_length=20)),
+                ('object_key', models.CharField(max_length=500)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='PENDING', max_length=20)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_activities', to='chartreuse.user')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='inbox_activity_status_idx')],
+            },
+        ),
+    ]
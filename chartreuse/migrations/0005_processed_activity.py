@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0004_inbox_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_id', models.CharField(max_length=500)),
+                ('payload_hash', models.CharField(max_length=64, unique=True)),
+                ('processed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
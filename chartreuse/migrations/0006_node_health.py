@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0005_processed_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='circuit_opened_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='circuit_state',
+            field=models.CharField(choices=[('CLOSED', 'CLOSED'), ('OPEN', 'OPEN'), ('HALF_OPEN', 'HALF_OPEN')], default='CLOSED', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='consecutive_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='node',
+            name='latency_ewma_ms',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0007_delivery_retries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('RUNNING', 'RUNNING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='PENDING', max_length=20)),
+                ('total_posts', models.PositiveIntegerField(default=0)),
+                ('sent_posts', models.PositiveIntegerField(default=0)),
+                ('failed_posts', models.PositiveIntegerField(default=0)),
+                ('last_post_id', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backfill_jobs', to='chartreuse.user')),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='chartreuse.user')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backfill_jobs', to='chartreuse.node')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='backfill_job_status_idx')],
+            },
+        ),
+    ]
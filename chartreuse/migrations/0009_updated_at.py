@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+def populate_updated_at(apps, schema_editor):
+    # existing rows start from their creation time rather than the time of the migration
+    apps.get_model('chartreuse', 'Post').objects.update(updated_at=F('published'))
+    apps.get_model('chartreuse', 'Comment').objects.update(updated_at=F('dateCreated'))
+    apps.get_model('chartreuse', 'Like').objects.update(updated_at=F('dateCreated'))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0008_backfill_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(populate_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:14
+
+from django.db import migrations, models
+from django.db.models import F
+
+def populate_updated_at(apps, schema_editor):
+    apps.get_model('chartreuse', 'User').objects.update(updated_at=F('dateCreated'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(populate_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0010_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='compress_requests',
+            field=models.BooleanField(default=False),
+        ),
+    ]
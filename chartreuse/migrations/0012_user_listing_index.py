@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0011_node_compress_requests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['dateCreated', 'url_id'], name='chartreuse__dateCre_740236_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0012_user_listing_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['post', 'dateCreated', 'id'], name='like_post_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['comment', 'dateCreated', 'id'], name='like_comment_page_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user', 'dateCreated', 'id'], name='like_user_page_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0013_like_page_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxactivity',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='inboxactivity',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='inboxactivity',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'PENDING'), ('RUNNING', 'RUNNING'), ('DONE', 'DONE'), ('FAILED', 'FAILED')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-19 19:30
+
+from django.db import migrations, models
+
+def clear_processed_activities(apps, schema_editor):
+    # the ledger only answers retries, rows keyed by payload hash alone have no activity type to carry over
+    ProcessedActivity = apps.get_model('chartreuse', 'ProcessedActivity')
+    ProcessedActivity.objects.all().delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0014_inbox_activity_claims'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_processed_activities, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='processedactivity',
+            name='activity_type',
+            field=models.CharField(default='', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='processedactivity',
+            name='payload_hash',
+            field=models.CharField(max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='processedactivity',
+            name='processed_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AddConstraint(
+            model_name='processedactivity',
+            constraint=models.UniqueConstraint(fields=('activity_type', 'activity_id'), name='unique_processed_activity'),
+        ),
+    ]
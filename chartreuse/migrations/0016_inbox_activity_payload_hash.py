@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0015_processed_activity_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxactivity',
+            name='payload_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-19 19:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chartreuse', '0016_inbox_activity_payload_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inboxactivity',
+            index=models.Index(fields=['object_key', 'status'], name='inbox_activity_object_idx'),
+        ),
+    ]
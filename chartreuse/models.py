@@ -1,11 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User as AuthUser
+from django.contrib.auth.hashers import identify_hasher, make_password
 from django.db.models import UniqueConstraint
 
 VISIBILITY_CHOICES = {"PUBLIC": "PUBLIC", "FRIENDS": "FRIENDS", "UNLISTED": "UNLISTED", "DELETED": "DELETED"}
 CONTENT_TYPE_CHOICES = {"text/markdown": "text/markdown", "text/plain": "text/plain", "application/base64": "application/base64", "image/png;base64": "image/png;base64", "image/jpeg;base64": "image/jpeg;base64"}
 FOLLOW_STATUS_CHOICES = {'OUTGOING':'OUTGOING','INCOMING':'INCOMING'}
 ENABLE_DISABLE_CHOICES = {'ENABLED':'ENABLED','DISABLED':'DISABLED'}
+INBOX_ACTIVITY_STATUS_CHOICES = {'PENDING':'PENDING','RUNNING':'RUNNING','DONE':'DONE','FAILED':'FAILED'}
+CIRCUIT_STATE_CHOICES = {'CLOSED':'CLOSED','OPEN':'OPEN','HALF_OPEN':'HALF_OPEN'}
+BACKFILL_STATUS_CHOICES = {'PENDING':'PENDING','RUNNING':'RUNNING','DONE':'DONE','FAILED':'FAILED'}
 
 class User(models.Model):
     user = models.OneToOneField(AuthUser, on_delete=models.CASCADE, null=True, blank=True)
@@ -15,6 +19,13 @@ class User(models.Model):
     github = models.URLField(null=True,blank=True)
     profileImage = models.URLField()
     dateCreated  = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True) # version stamp of the author document
+
+    class Meta:
+        indexes = [
+            # the author list is paged in this order
+            models.Index(fields=['dateCreated', 'url_id']),
+        ]
 
     def __str__(self):
         return f"User(pk={self.pk}, displayName={self.displayName}, host={self.host}, github={self.github}, profileImage={self.profileImage})"
@@ -29,6 +40,7 @@ class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     published = models.DateTimeField(auto_now_add=True)
     visibility = models.CharField(max_length=20, choices=VISIBILITY_CHOICES, default='PUBLIC')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True) # peers sync with ?since= against this
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -46,6 +58,7 @@ class Comment(models.Model):
     comment = models.TextField()
     contentType = models.CharField(max_length=50, choices=CONTENT_TYPE_CHOICES, default='text/markdown')
     dateCreated = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -64,11 +77,18 @@ class Like(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True)
     dateCreated = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         constraints = [
             UniqueConstraint(fields=['user', 'post'], name='unique_user_post_like')
         ]
+        indexes = [
+            # likes are paged oldest first on their post, their comment and their author
+            models.Index(fields=['post', 'dateCreated', 'id'], name='like_post_page_idx'),
+            models.Index(fields=['comment', 'dateCreated', 'id'], name='like_comment_page_idx'),
+            models.Index(fields=['user', 'dateCreated', 'id'], name='like_user_page_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -87,12 +107,74 @@ class Follow(models.Model):
         unique_together = ('follower', 'followed')
 
 
+class Friendship(models.Model):
+    '''
+    Materialized mutual follow, kept in sync with the Follow table by the signals in signals.py.
+    Every friendship is stored in both directions so a single (user, friend) lookup answers it.
+    '''
+    user = models.ForeignKey(User, related_name="friendships", on_delete=models.CASCADE) # Use user.friendships to get all the friendships of a user
+    friend = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'friend')
+
+
 class FollowRequest(models.Model):
     requester = models.ForeignKey(User, related_name="follow_requests_sent", on_delete=models.CASCADE)
     requestee = models.ForeignKey(User, related_name="follow_requests_received", on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=False)
 
+class InboxActivity(models.Model):
+    '''
+    Raw activity delivered to an author's inbox, waiting to be applied by the process_inbox worker.
+    '''
+    recipient = models.ForeignKey(User, related_name="inbox_activities", on_delete=models.CASCADE)
+    activity_type = models.CharField(max_length=20)
+    # url of the post, comment or author the activity is about, activities of one type with the same key are applied in order
+    object_key = models.CharField(max_length=500)
+    payload = models.JSONField()
+    # activity_hash of the payload for activities with an id, so a retry is not queued again while the first one waits
+    payload_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    status = models.CharField(max_length=20, choices=INBOX_ACTIVITY_STATUS_CHOICES, default='PENDING')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # number of times a worker claimed the activity, and when it may next be claimed: the retry time of a
+    # failed activity or the time a claimed activity whose worker died is given to another worker
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='inbox_activity_status_idx'),
+            # finds the older unfinished activities about the objects being claimed
+            models.Index(fields=['object_key', 'status'], name='inbox_activity_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"InboxActivity(id={self.id}, type={self.activity_type}, object={self.object_key}, status={self.status})"
+
+class ProcessedActivity(models.Model):
+    '''
+    Ledger of inbox activities that were already applied, used to skip deliveries retried by peers.
+    '''
+    activity_type = models.CharField(max_length=20)
+    activity_id = models.CharField(max_length=500)
+    # sha256 of the canonical json payload last applied for this activity, so a changed activity is still applied
+    payload_hash = models.CharField(max_length=64)
+    processed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['activity_type', 'activity_id'], name='unique_processed_activity'),
+        ]
+
+    def __str__(self):
+        return f"ProcessedActivity(activity_type={self.activity_type}, activity_id={self.activity_id}, payload_hash={self.payload_hash})"
+
 class GithubPolling(models.Model):
     last_polled = models.DateTimeField(auto_now_add=True)
 
@@ -100,15 +182,100 @@ class Node(models.Model):
     id = models.AutoField(primary_key=True)
     host = models.URLField()
     username = models.CharField(max_length=100)
-    password = models.CharField(max_length=100)
+    # incoming node passwords are stored hashed, outgoing ones are needed in plaintext to connect to that node
+    password = models.CharField(max_length=128)
     # outgoing means we are connecting to that node
     # incoming means that node is connecting to us
     follow_status = models.CharField(max_length=100, choices=FOLLOW_STATUS_CHOICES)
     status = models.CharField(max_length=100, choices=ENABLE_DISABLE_CHOICES)
+    # health of outgoing nodes, updated by node_client.py after every request so all workers share it
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    latency_ewma_ms = models.FloatField(null=True, blank=True)
+    circuit_state = models.CharField(max_length=20, choices=CIRCUIT_STATE_CHOICES, default='CLOSED')
+    # when the circuit last opened, or moved to half open to send a trial request
+    circuit_opened_at = models.DateTimeField(null=True, blank=True)
+    # set for outgoing nodes that accept gzip compressed request bodies
+    compress_requests = models.BooleanField(default=False)
+
+    def save(self, *args, **kwargs):
+        '''
+        Hashes the password of incoming nodes unless it is already hashed
+        '''
+        if self.follow_status == "INCOMING":
+            try:
+                identify_hasher(self.password)
+            except ValueError:
+                self.password = make_password(self.password)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"host={self.host}, username={self.username}, password={self.password}, outgoing={self.follow_status}"
     
+class FailedDelivery(models.Model):
+    '''
+    Inbox delivery to a remote node that is being sent, or that failed and is waiting to be retried by the
+    retry_deliveries command. Rows are deleted once the delivery succeeds.
+    '''
+    node = models.ForeignKey(Node, related_name="failed_deliveries", on_delete=models.CASCADE)
+    url = models.URLField(max_length=500)
+    payload = models.JSONField()
+    headers = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    next_attempt_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"FailedDelivery(id={self.id}, url={self.url}, attempts={self.attempts}, next_attempt_at={self.next_attempt_at})"
+
+class DeadLetterDelivery(models.Model):
+    '''
+    Inbox delivery that was given up on after too many attempts, kept so an admin can replay it.
+    '''
+    node = models.ForeignKey(Node, related_name="dead_letter_deliveries", on_delete=models.CASCADE)
+    url = models.URLField(max_length=500)
+    payload = models.JSONField()
+    headers = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+    dead_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"DeadLetterDelivery(id={self.id}, url={self.url}, attempts={self.attempts}, dead_at={self.dead_at})"
+
+class BackfillJob(models.Model):
+    '''
+    Sends a local author's existing posts to a newly accepted remote follower, run by the run_backfills command.
+    '''
+    author = models.ForeignKey(User, related_name="backfill_jobs", on_delete=models.CASCADE)
+    follower = models.ForeignKey(User, related_name="+", on_delete=models.CASCADE)
+    node = models.ForeignKey(Node, related_name="backfill_jobs", on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=BACKFILL_STATUS_CHOICES, default='PENDING')
+    total_posts = models.PositiveIntegerField(default=0)
+    sent_posts = models.PositiveIntegerField(default=0)
+    failed_posts = models.PositiveIntegerField(default=0)
+    # id of the last post handled, a requeued job carries on after it
+    last_post_id = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='backfill_job_status_idx')
+        ]
+
+    @property
+    def progress(self):
+        if self.total_posts == 0:
+            return 100
+        return min(100, round(100 * (self.sent_posts + self.failed_posts) / self.total_posts))
+
+    def __str__(self):
+        return f"BackfillJob(id={self.id}, author={self.author_id}, follower={self.follower_id}, status={self.status}, progress={self.progress}%)"
+
 class Settings(models.Model):
     '''
     This is a custom singleton model to control all the admins settings in the database.
@@ -0,0 +1,129 @@
+import base64
+import binascii
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.db import connection
+
+from .models import Node
+
+# Default number of seconds a verified Authorization header is trusted by a process
+DEFAULT_TTL = 30
+
+# Default number of verified headers kept in memory before the least recently used are evicted
+DEFAULT_MAX_ENTRIES = 1000
+
+def decode_basic_auth(authorization):
+    '''
+    Purpose: Split a Basic Authorization header into its username and password.
+
+    Arguments:
+    authorization: the raw Authorization header value
+
+    Raises ValueError when the header is not valid Basic authentication.
+    '''
+    try:
+        decoded_str = base64.b64decode(authorization.split(" ")[1]).decode('utf-8')
+        username, password = decoded_str.split(":", 1)
+    except (IndexError, ValueError, binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid authentication format")
+    return username, password
+
+class NodeCredentialVerifier:
+    '''
+    Purpose: Verify the Basic credentials of incoming node requests against the hashed node passwords.
+
+    A verified principal (the Node id) is remembered on the request, so repeated checks during one request
+    are free, and by the process for a short TTL keyed by a digest of the header, so the password hash only
+    has to be checked once per TTL. Failed checks are never cached, expired entries are dropped when they are
+    next looked up and the least recently used entries are evicted past max_entries. Node changes in this
+    process clear the cache.
+    '''
+
+    def __init__(self, ttl=None, max_entries=None):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'NODE_AUTH_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, 'NODE_AUTH_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+
+    def verify(self, request, authorization):
+        '''
+        Purpose: Get the id of the enabled incoming Node the Authorization header belongs to, or None.
+
+        Arguments:
+        request: the request being authenticated (Django, rest_framework or requests object)
+        authorization: the raw Authorization header value
+
+        Raises ValueError when the header is not valid Basic authentication.
+        '''
+        # per request cache, stored on the underlying HttpRequest so nested viewset calls share it
+        http_request = getattr(request, '_request', request)
+        request_cache = getattr(http_request, '_node_principals', None)
+        if request_cache is None:
+            request_cache = {}
+            setattr(http_request, '_node_principals', request_cache)
+        if authorization in request_cache:
+            return request_cache[authorization]
+
+        node_id = self._verify(authorization)
+        request_cache[authorization] = node_id
+        return node_id
+
+    def clear(self):
+        with self._lock:
+            self._verified.clear()
+
+    def in_transaction(self):
+        '''
+        Purpose: Whether checks are made inside a transaction. The Node they read may be rolled back, so they are
+        never shared with other requests.
+        '''
+        return connection.in_atomic_block
+
+    def _verify(self, authorization):
+        key = hashlib.sha256(authorization.encode('utf-8')).hexdigest()
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._verified.get(key)
+            if cached is not None:
+                if cached[0] > now:
+                    self._verified.move_to_end(key)
+                    return cached[1]
+                del self._verified[key]
+
+        username, password = decode_basic_auth(authorization)
+
+        node_id = None
+        for node in Node.objects.filter(username=username, follow_status="INCOMING", status="ENABLED"):
+            if check_password(password, node.password):
+                node_id = node.id
+                break
+
+        # only successful checks made outside of a transaction are shared with other requests
+        if node_id is not None and not self.in_transaction():
+            with self._lock:
+                self._verified[key] = (now + self.ttl, node_id)
+                self._verified.move_to_end(key)
+                while len(self._verified) > self.max_entries:
+                    self._verified.popitem(last=False)
+
+        return node_id
+
+node_verifier = NodeCredentialVerifier()
@@ -0,0 +1,279 @@
+import copy
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+
+from .models import Node
+
+# Default number of consecutive failed requests that opens a node's circuit
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Default number of seconds an open circuit fails fast before one trial request is let through
+DEFAULT_COOLDOWN = 60
+
+# Default number of seconds to wait on a node before the request counts as failed
+DEFAULT_TIMEOUT = 10
+
+# Weight of the newest request in the latency moving average
+LATENCY_ALPHA = 0.2
+
+# Default smallest request body, in bytes, compressed for nodes that accept compressed requests
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+
+# Default number of remote GET responses kept to revalidate with conditional requests
+DEFAULT_CONDITIONAL_CACHE_SIZE = 512
+
+# Default largest response body, in bytes, kept for revalidation
+DEFAULT_CONDITIONAL_CACHE_MAX_BYTES = 1048576
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    '''
+    Raised instead of contacting a node whose circuit is open, callers already handle it like a dead host.
+    '''
+    def __init__(self, node):
+        super().__init__(f"Circuit open for node {node.host}")
+        self.node = node
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+def node_for_url(url):
+    '''
+    Purpose: Find the enabled outgoing Node a url belongs to.
+
+    Parameters:
+    url: the url about to be requested
+
+    Returns:
+    the Node with the longest host that prefixes the url, or None for urls of hosts we do not connect to
+    '''
+    # the prefix match is done by the database so only the matching node is loaded
+    return (
+        Node.objects.filter(follow_status='OUTGOING', status='ENABLED')
+        .alias(requested_url=Value(url, output_field=CharField()))
+        .filter(requested_url__startswith=F('host'))
+        .order_by(Length('host').desc())
+        .first()
+    )
+
+def allow_request(node):
+    '''
+    Purpose: Decide whether a request to a node may be sent, based on the circuit state stored on the Node.
+
+    A closed circuit always allows requests. An open circuit fails fast until its cooldown is over, then exactly
+    one worker moves it to half open, stamping circuit_opened_at, and sends a trial request while every other
+    request keeps failing fast. A half open circuit whose trial never reported back, e.g. because its worker died,
+    lets a new trial through once that stamp is older than the cooldown.
+
+    The state is read from the database rather than from the Node instance, which may have been loaded long before,
+    e.g. by a delivery queued before another worker opened the circuit.
+
+    Parameters:
+    node: the Node about to be contacted, its circuit fields are refreshed in place
+    '''
+    stored = Node.objects.filter(pk=node.pk).values('circuit_state', 'circuit_opened_at').first()
+    if stored is not None:
+        node.circuit_state = stored['circuit_state']
+        node.circuit_opened_at = stored['circuit_opened_at']
+
+    if node.circuit_state == 'CLOSED':
+        return True
+
+    now = timezone.now()
+    cooldown = timedelta(seconds=get_setting('NODE_CIRCUIT_COOLDOWN', DEFAULT_COOLDOWN))
+    if node.circuit_opened_at is not None and now - node.circuit_opened_at < cooldown:
+        return False
+
+    # only the worker whose update wins gets to send the trial request
+    won = Node.objects.filter(pk=node.pk, circuit_state=node.circuit_state, circuit_opened_at=node.circuit_opened_at).update(circuit_state='HALF_OPEN', circuit_opened_at=now)
+    if won:
+        node.circuit_state = 'HALF_OPEN'
+        node.circuit_opened_at = now
+    return bool(won)
+
+def record_success(node, latency_ms):
+    '''
+    Purpose: Close a node's circuit and fold the request latency into its moving average.
+    '''
+    Node.objects.filter(pk=node.pk).update(
+        consecutive_failures=0,
+        circuit_state='CLOSED',
+        circuit_opened_at=None,
+        latency_ewma_ms=Coalesce(F('latency_ewma_ms') * (1 - LATENCY_ALPHA) + latency_ms * LATENCY_ALPHA, Value(latency_ms)),
+    )
+
+def record_failure(node):
+    '''
+    Purpose: Count a failed request against a node, opening its circuit once the failure threshold is reached
+    or when the trial request of a half open circuit fails.
+    '''
+    Node.objects.filter(pk=node.pk).update(consecutive_failures=F('consecutive_failures') + 1)
+
+    threshold = get_setting('NODE_CIRCUIT_FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD)
+    Node.objects.filter(pk=node.pk).filter(
+        Q(circuit_state='HALF_OPEN') | Q(circuit_state='CLOSED', consecutive_failures__gte=threshold)
+    ).update(circuit_state='OPEN', circuit_opened_at=timezone.now())
+
+def reset_circuit(node):
+    '''
+    Purpose: Forget a node's failures so it is contacted again right away.
+    '''
+    Node.objects.filter(pk=node.pk).update(consecutive_failures=0, circuit_state='CLOSED', circuit_opened_at=None)
+
+def compress_json_body(kwargs):
+    '''
+    Purpose: Replace the json argument of a request with a gzip compressed body, when it is big enough to be worth it.
+
+    Parameters:
+    kwargs: the keyword arguments about to be passed to requests.request, changed in place
+    '''
+    body = json.dumps(kwargs['json'], cls=DjangoJSONEncoder).encode('utf-8')
+    if len(body) < get_setting('COMPRESSION_MIN_SIZE', DEFAULT_COMPRESSION_MIN_SIZE):
+        return
+    headers = dict(kwargs.get('headers') or {})
+    headers.setdefault('Content-Type', 'application/json; charset=utf-8')
+    headers['Content-Encoding'] = 'gzip'
+    kwargs['headers'] = headers
+    kwargs['data'] = gzip.compress(body)
+    del kwargs['json']
+
+def request(method, url, node=None, **kwargs):
+    '''
+    Purpose: Send an http request to a remote node through its circuit breaker.
+
+    Connection errors, timeouts and 5xx responses count as failures. Urls that do not belong to an outgoing node
+    are requested directly.
+
+    Parameters:
+    method: http method, e.g. 'GET' or 'POST'
+    url: the url to request
+    node: the Node the url belongs to, looked up from the url when not given
+    kwargs: passed on to requests.request, a timeout is added when missing
+
+    Returns:
+    the requests.Response
+
+    Raises CircuitOpenError when the node's circuit is open, and any requests exception raised by the request.
+    '''
+    kwargs.setdefault('timeout', get_setting('NODE_REQUEST_TIMEOUT', DEFAULT_TIMEOUT))
+    if node is None:
+        node = node_for_url(url)
+    if node is None:
+        return requests.request(method, url, **kwargs)
+
+    if node.compress_requests and kwargs.get('json') is not None:
+        compress_json_body(kwargs)
+
+    if not allow_request(node):
+        raise CircuitOpenError(node)
+
+    start = time.monotonic()
+    try:
+        response = requests.request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        record_failure(node)
+        raise
+
+    if response.status_code >= 500:
+        record_failure(node)
+    else:
+        record_success(node, (time.monotonic() - start) * 1000)
+    return response
+
+class ConditionalCache:
+    '''
+    Purpose: Remember remote GET responses that carry an ETag or Last-Modified, so fetching the same object again
+    sends If-None-Match / If-Modified-Since and a 304 answer reuses the remembered body.
+
+    Entries are keyed by the full url and the credentials, and the least recently used ones are dropped once
+    NODE_CONDITIONAL_CACHE_SIZE responses are kept.
+    '''
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return get_setting('NODE_CONDITIONAL_CACHE_SIZE', DEFAULT_CONDITIONAL_CACHE_SIZE)
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return get_setting('NODE_CONDITIONAL_CACHE_MAX_BYTES', DEFAULT_CONDITIONAL_CACHE_MAX_BYTES)
+
+    @staticmethod
+    def key(url, kwargs):
+        prepared = requests.Request('GET', url, params=kwargs.get('params'), auth=kwargs.get('auth'), headers=kwargs.get('headers')).prepare()
+        return (prepared.url, prepared.headers.get('Authorization'))
+
+    def get(self, url, node=None, **kwargs):
+        '''
+        Purpose: GET a url through the circuit breaker, revalidating a remembered response when there is one.
+
+        Parameters:
+        url: the url to request
+        node: the Node the url belongs to
+        kwargs: passed on to request
+
+        Returns:
+        the requests.Response, a copy of the remembered 200 response when the node answered 304
+        '''
+        headers = dict(kwargs.get('headers') or {})
+        if kwargs.get('stream') or 'If-None-Match' in headers or 'If-Modified-Since' in headers:
+            return request('GET', url, node=node, **kwargs)
+
+        key = self.key(url, kwargs)
+        with self._lock:
+            cached = self._responses.get(key)
+        if cached is not None:
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+            kwargs['headers'] = headers
+
+        response = request('GET', url, node=node, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            with self._lock:
+                if key in self._responses:
+                    self._responses.move_to_end(key)
+            return copy.copy(cached)
+
+        with self._lock:
+            if response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified')) and len(response.content) <= self.max_bytes:
+                self._responses[key] = response
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+            else:
+                self._responses.pop(key, None)
+        return copy.copy(response)
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+
+conditional_cache = ConditionalCache()
+
+def get(url, node=None, **kwargs):
+    return conditional_cache.get(url, node=node, **kwargs)
+
+def post(url, node=None, **kwargs):
+    return request('POST', url, node=node, **kwargs)
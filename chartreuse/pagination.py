@@ -0,0 +1,96 @@
+import base64
+import binascii
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from . import fast_json
+
+def encode_cursor(values):
+    '''
+    Purpose: Encode the ordering values of the last row of a page into an opaque cursor.
+
+    Parameters:
+    values: list of the values, in ordering order
+
+    Returns:
+    url safe cursor string
+    '''
+    return base64.urlsafe_b64encode(fast_json.dumps(list(values))).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    '''
+    Purpose: Decode a cursor made by encode_cursor.
+
+    Parameters:
+    cursor: the cursor string
+
+    Returns:
+    list of the ordering values, raises ValueError when the cursor is not valid
+    '''
+    try:
+        values = fast_json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeEncodeError, ValueError):
+        raise ValueError(f"Invalid cursor {cursor}")
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor {cursor}")
+    return values
+
+def after_cursor(queryset, ordering, cursor):
+    '''
+    Purpose: Filter a queryset to the rows that come after a cursor in the given ordering.
+
+    Parameters:
+    queryset: the rows being paged
+    ordering: tuple of the field names the rows are ordered by, a leading - for descending ones, ending with a unique field
+    cursor: the cursor of the last row of the previous page
+
+    Returns:
+    the filtered queryset, raises ValueError when the cursor is not valid for the ordering
+    '''
+    values = decode_cursor(cursor)
+    if len(values) != len(ordering):
+        raise ValueError(f"Invalid cursor {cursor}")
+
+    names = [name.lstrip('-') for name in ordering]
+    try:
+        values = [queryset.model._meta.get_field(name).to_python(value) for name, value in zip(names, values)]
+    except ValidationError:
+        raise ValueError(f"Invalid cursor {cursor}")
+    if any(value is None for value in values):
+        raise ValueError(f"Invalid cursor {cursor}")
+
+    # (a, b) > (x, y) is written as a > x or (a = x and b > y), which every database can answer from an index on (a, b)
+    condition = Q()
+    for index, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        equal = {name: value for name, value in zip(names[:index], values[:index])}
+        condition |= Q(**equal, **{f"{names[index]}__{lookup}": values[index]})
+    return queryset.filter(condition)
+
+def keyset_page(queryset, ordering, size, cursor=None, offset=0):
+    '''
+    Purpose: Get a page of rows without counting the whole queryset, continuing after a cursor when one is given.
+
+    Parameters:
+    queryset: the rows being paged
+    ordering: tuple of the field names the rows are ordered by, a leading - for descending ones, ending with a unique field
+    size: number of rows on the page
+    cursor: the cursor of the last row of the previous page, or None for the first page
+    offset: number of rows skipped when no cursor is given, so page numbers keep working
+
+    Returns:
+    a (rows, next_cursor) tuple, next_cursor is None on the last page. Raises ValueError for an invalid cursor.
+    '''
+    if cursor:
+        queryset = after_cursor(queryset, ordering, cursor)
+        offset = 0
+
+    # one row past the page tells whether there is a next page without a COUNT(*)
+    rows = list(queryset.order_by(*ordering)[offset:offset + size + 1])
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, name.lstrip('-')) for name in ordering)
@@ -0,0 +1,148 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Comment, Follow, FollowRequest, Friendship, Like, Node, Post, User
+from .author_resolver import author_resolver
+from .node_auth import node_verifier
+from .social_graph import social_graph
+from .table_counts import table_counts
+
+
+@receiver(post_save, sender=Follow)
+def add_friendship(sender, instance, created, **kwargs):
+    '''
+    Purpose: Materialize a friendship when a new follow completes a mutual follow.
+
+    Arguments:
+    instance: the Follow object that was just saved
+    created: True if the follow was newly created
+    '''
+    if not created:
+        return
+
+    if Follow.objects.filter(follower_id=instance.followed_id, followed_id=instance.follower_id).exists():
+        Friendship.objects.bulk_create([
+            Friendship(user_id=instance.follower_id, friend_id=instance.followed_id),
+            Friendship(user_id=instance.followed_id, friend_id=instance.follower_id),
+        ], ignore_conflicts=True)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_friendship(sender, instance, **kwargs):
+    '''
+    Purpose: Remove both directions of a friendship once either side unfollows.
+
+    Arguments:
+    instance: the Follow object that was just deleted
+    '''
+    Friendship.objects.filter(user_id=instance.follower_id, friend_id=instance.followed_id).delete()
+    Friendship.objects.filter(user_id=instance.followed_id, friend_id=instance.follower_id).delete()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph(sender, instance, **kwargs):
+    '''
+    Purpose: Drop the cached social graph of both users in a follow that changed, again once the change commits
+    so an entry loaded before the commit is not kept.
+    '''
+    users = (instance.follower_id, instance.followed_id)
+    social_graph.invalidate(*users)
+    transaction.on_commit(lambda: social_graph.invalidate(*users))
+
+
+@receiver(post_save, sender=FollowRequest)
+@receiver(post_delete, sender=FollowRequest)
+def invalidate_follow_request_graph(sender, instance, **kwargs):
+    '''
+    Purpose: Drop the cached social graph of both users in a follow request that changed, again once the change
+    commits so an entry loaded before the commit is not kept.
+    '''
+    users = (instance.requester_id, instance.requestee_id)
+    social_graph.invalidate(*users)
+    transaction.on_commit(lambda: social_graph.invalidate(*users))
+
+
+@receiver(post_save, sender=Node)
+@receiver(post_delete, sender=Node)
+def invalidate_node_credentials(sender, instance, **kwargs):
+    '''
+    Purpose: Forget the verified node credentials once any node changes.
+    '''
+    node_verifier.clear()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_known_author(sender, instance, **kwargs):
+    '''
+    Purpose: Drop an author from the known author cache when it is changed or removed.
+
+    Arguments:
+    instance: the User object that was saved or deleted
+    '''
+    author_resolver.invalidate(instance.url_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_count(sender, instance, created=True, **kwargs):
+    '''
+    Purpose: Drop the cached number of authors when one is added or removed.
+
+    Arguments:
+    instance: the User object that was saved or deleted
+    created: True if the user was newly created, always True for deletes
+    '''
+    if created:
+        table_counts.invalidate("authors")
+
+
+def like_count_keys(like):
+    '''
+    Purpose: The table_counts keys of the numbers of likes a like is counted in.
+
+    Arguments:
+    like: the Like object
+
+    Returns:
+    the keys of the likes of its post, its comment and its author
+    '''
+    return (("post_likes", like.post_id), ("comment_likes", like.comment_id), ("user_likes", like.user_id))
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_like_counts(sender, instance, created=True, **kwargs):
+    '''
+    Purpose: Drop the cached numbers of likes of the post, comment and author of a like when it is added or removed.
+    Likes inserted with bulk_create skip this receiver, so their inserts call like_count_keys themselves.
+
+    Arguments:
+    instance: the Like object that was saved or deleted
+    created: True if the like was newly created, always True for deletes
+    '''
+    if created:
+        table_counts.invalidate(*like_count_keys(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def touch_liked_or_commented_object(sender, instance, **kwargs):
+    '''
+    Purpose: Bump updated_at of the post or comment a like or comment belongs to, since their documents embed
+    the like and comment counts and peers syncing with ?since= need to see them change.
+
+    Arguments:
+    instance: the Comment or Like object that was saved or deleted
+    '''
+    now = timezone.now()
+    if instance.post_id is not None:
+        Post.objects.filter(pk=instance.post_id).update(updated_at=now)
+    if sender is Like and instance.comment_id is not None:
+        Comment.objects.filter(pk=instance.comment_id).update(updated_at=now)
+        # the post document lists its comments with their like counts too
+        Post.objects.filter(comment=instance.comment_id).update(updated_at=now)
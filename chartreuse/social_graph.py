@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, FollowRequest, Friendship, User
+
+# Default number of seconds a user's graph entry stays fresh
+DEFAULT_TTL = 60
+
+# Default number of users kept in memory before the least recently used are evicted
+DEFAULT_MAX_USERS = 10000
+
+GraphEntry = namedtuple('GraphEntry', ['followees', 'friends', 'requested'])
+
+class SocialGraphCache:
+    '''
+    Purpose: Per-process cache of each active user's followee, friend and pending follow request ids.
+
+    Visibility checks are answered from memory, and the database is only queried when a user's entry
+    is missing or has outlived its TTL. Entries are invalidated by the Follow and FollowRequest signals
+    of this process, both when the change is made and once it commits, and an entry whose user was
+    invalidated while it was loading is not kept. Other worker processes pick up the change once their
+    copy expires.
+    '''
+
+    def __init__(self, ttl=None, max_users=None):
+        self._ttl = ttl
+        self._max_users = max_users
+        self._entries = OrderedDict()
+        # loads in flight and the invalidations seen during them, per user
+        self._loads = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'SOCIAL_GRAPH_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def max_users(self):
+        if self._max_users is not None:
+            return self._max_users
+        return getattr(settings, 'SOCIAL_GRAPH_CACHE_MAX_USERS', DEFAULT_MAX_USERS)
+
+    def get(self, user):
+        '''
+        Purpose: Get the graph entry of a user, loading it from the database on a miss.
+
+        Arguments:
+        user: User object or url_id of the user
+        '''
+        user_id = self._user_id(user)
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(user_id)
+                return cached[1]
+
+            self._loads[user_id] = self._loads.get(user_id, 0) + 1
+            generation = self._generations.get(user_id, 0)
+
+        entry = None
+        try:
+            entry = self._load(user_id)
+        finally:
+            with self._lock:
+                # an invalidation that landed while loading means the entry may already be stale
+                stale = self._generations.get(user_id, 0) != generation
+                self._loads[user_id] -= 1
+                if not self._loads[user_id]:
+                    del self._loads[user_id]
+                    self._generations.pop(user_id, None)
+
+                if entry is not None and not stale and not self.in_transaction():
+                    self._entries[user_id] = (now + self.ttl, entry)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_users:
+                        self._entries.popitem(last=False)
+
+        return entry
+
+    def in_transaction(self):
+        '''
+        Purpose: Whether reads are made inside a transaction. They may be rolled back, so they are never shared with
+        other requests.
+        '''
+        return connection.in_atomic_block
+
+    def _load(self, user_id):
+        return GraphEntry(
+            followees=frozenset(Follow.objects.filter(follower_id=user_id).values_list('followed_id', flat=True)),
+            friends=frozenset(Friendship.objects.filter(user_id=user_id).values_list('friend_id', flat=True)),
+            requested=frozenset(FollowRequest.objects.filter(requester_id=user_id).values_list('requestee_id', flat=True)),
+        )
+
+    def invalidate(self, *users):
+        '''
+        Purpose: Drop the cached entries of the given users.
+
+        Arguments:
+        users: User objects or url_ids whose relationships changed
+        '''
+        with self._lock:
+            for user in users:
+                user_id = self._user_id(user)
+                self._entries.pop(user_id, None)
+                if user_id in self._loads:
+                    self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def followees(self, user):
+        return self.get(user).followees
+
+    def friends(self, user):
+        return self.get(user).friends
+
+    def requested(self, user):
+        return self.get(user).requested
+
+    def is_following(self, user, other):
+        return self._user_id(other) in self.get(user).followees
+
+    def are_friends(self, user, other):
+        return self._user_id(other) in self.get(user).friends
+
+    def has_requested(self, user, other):
+        return self._user_id(other) in self.get(user).requested
+
+    def _user_id(self, user):
+        if isinstance(user, User):
+            return user.pk
+        return user
+
+social_graph = SocialGraphCache()
@@ -8,46 +8,26 @@ function startPollingAuthors() {
 }
 
 async function fetchAuthors() {
-    let allAuthors = [];
-    let page = 1;
-    const size = 50;
-
     const shouldPoll = await fetch('/chartreuse/github/polling/');
     const data = await shouldPoll.json();
     if (data.poll == "True") {
         console.log('Polling is enabled. Fetching authors...');
         try {
-            while (true) {
-                const response = await fetch(`/chartreuse/api/authors/?page=${page}&size=${size}`);
+            // the authors with a github link come a page at a time, only the id and github link are used
+            const githubAuthors = [];
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({github: 'true', fields: 'github'});
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetch(`/chartreuse/api/authors/batch/?${params}`);
                 if (!response.ok) throw new Error("Network response was not ok");
 
-                const data = await response.json();
-
-                const pageUsers = data.authors || [];
-                const filteredUserAttributes = pageUsers.map(user => ({
-                    type: "author",
-                    id: user.id,
-                    host: user.host,
-                    displayName: user.displayName,
-                    github: user.github,
-                    profileImage: user.profileImage,
-                    page: `${user.host}authors/${user.username}`
-                }));
-
-                allAuthors = allAuthors.concat(filteredUserAttributes);
-
-                if (pageUsers.length < size) break;
-
-                page++;
-            }
-
-            const authors = {
-                type: "authors",
-                authors: allAuthors
-            };
-            
+                const page = await response.json();
+                githubAuthors.push(...page.authors);
+                cursor = page.next;
+            } while (cursor);
 
-            authors.authors.forEach(author => {
+            githubAuthors.forEach(author => {
                 // check whether the users github url is valid or not with regex
                 const githubUrl = author.github;
 
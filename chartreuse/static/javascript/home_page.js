@@ -158,37 +158,76 @@ document.querySelectorAll('.comment-button').forEach(button => {
     });
 });
 
-document.querySelectorAll('.like-comment-button').forEach(button => {
-    button.addEventListener('click', function(event) {
+function addCommentLikeListeners(root) {
+    root.querySelectorAll('.like-comment-button').forEach(button => {
+        button.addEventListener('click', function(event) {
+            button.disabled = 'disabled';
+            const postId = this.getAttribute('data-post-id');
+            const userId = this.getAttribute('data-user-id');
+            const commentId = this.getAttribute('data-comment-id');
+            const url = `/chartreuse/comment/like/`;
+
+            fetch(url, {
+                method: 'POST',
+                headers: {
+                    'X-CSRFToken': csrftoken,  // Use the CSRF token from the cookie
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    post_id: postId,
+                    user_id: userId,
+                    comment_id: commentId
+                })
+            })
+            .then(response => response.json())
+            .then(data => {
+                console.log('Success:', data);
+                if (data.likes_count) {
+                    this.innerText = `${data.likes_count} likes`;  // Update the like count on the button
+                } else {
+                    console.error('Failed to like post:', data.error);
+                }
+                window.location.reload();  // Reload the page to update the like count
+            })
+            .catch(error => console.error('Error:', error));
+        });
+    });
+}
+
+addCommentLikeListeners(document);
+
+// Older comments of a post are fetched a page at a time and appended below the ones already shown
+document.querySelectorAll('.load-comments-button').forEach(button => {
+    button.addEventListener('click', function() {
         button.disabled = 'disabled';
         const postId = this.getAttribute('data-post-id');
-        const userId = this.getAttribute('data-user-id');
-        const commentId = this.getAttribute('data-comment-id');
-        const url = `/chartreuse/comment/like/`;
+        const cursor = this.getAttribute('data-cursor');
+        const url = `/chartreuse/comment/page/${postId}/?cursor=${encodeURIComponent(cursor)}`;
 
-        fetch(url, {
-            method: 'POST',
-            headers: {
-                'X-CSRFToken': csrftoken,  // Use the CSRF token from the cookie
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                post_id: postId,
-                user_id: userId,
-                comment_id: commentId
-            })
-        })
+        fetch(url)
         .then(response => response.json())
         .then(data => {
-            console.log('Success:', data);
-            if (data.likes_count) {
-                this.innerText = `${data.likes_count} likes`;  // Update the like count on the button
+            if (data.error) {
+                console.error('Failed to load comments:', data.error);
+                button.disabled = false;
+                return;
+            }
+            const page = document.createElement('template');
+            page.innerHTML = data.html;
+            addCommentLikeListeners(page.content);
+            document.getElementById('comments-section').appendChild(page.content);
+
+            if (data.next) {
+                button.setAttribute('data-cursor', data.next);
+                button.disabled = false;
             } else {
-                console.error('Failed to like post:', data.error);
+                button.remove();
             }
-            window.location.reload();  // Reload the page to update the like count
         })
-        .catch(error => console.error('Error:', error));
+        .catch(error => {
+            console.error('Error:', error);
+            button.disabled = false;
+        });
     });
 });
 
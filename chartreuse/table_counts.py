@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+# Default number of seconds a cached count stays fresh
+DEFAULT_TTL = 300
+
+# Default number of counts kept in memory before the least recently used are evicted
+DEFAULT_MAX_KEYS = 10000
+
+class TableCounts:
+    '''
+    Purpose: Per-process cache of row counts shown next to paginated listings, such as the number of authors
+    or the number of likes of a post.
+
+    Counting a whole table on every page is what makes deep listings slow, so each count is kept for a TTL and
+    dropped by the signals of this process when rows are added or removed. Other worker processes may show a
+    count that is off until their copy expires, which is fine for a total that is only displayed.
+    '''
+
+    def __init__(self, ttl=None, max_keys=None):
+        self._ttl = ttl
+        self._max_keys = max_keys
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'TABLE_COUNT_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def max_keys(self):
+        if self._max_keys is not None:
+            return self._max_keys
+        return getattr(settings, 'TABLE_COUNT_CACHE_MAX_KEYS', DEFAULT_MAX_KEYS)
+
+    def count(self, key, queryset):
+        '''
+        Purpose: Get the number of rows of a queryset, counting them only when the cached count is missing or stale.
+
+        Arguments:
+        key: name the count is cached under, the same key is given to invalidate
+        queryset: the rows to count
+
+        Returns:
+        the number of rows
+        '''
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(key)
+            if cached is not None and cached[0] > now:
+                self._counts.move_to_end(key)
+                return cached[1]
+
+        count = queryset.count()
+
+        if self.in_transaction():
+            return count
+
+        with self._lock:
+            self._counts[key] = (now + self.ttl, count)
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_keys:
+                self._counts.popitem(last=False)
+        return count
+
+    def invalidate(self, *keys):
+        '''
+        Purpose: Drop the cached counts of the given keys.
+
+        Arguments:
+        keys: names the counts were cached under
+        '''
+        with self._lock:
+            for key in keys:
+                self._counts.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+    def in_transaction(self):
+        '''
+        Purpose: Whether counts are made inside a transaction. They may be rolled back, so they are never shared
+        with other requests.
+        '''
+        return connection.in_atomic_block
+
+table_counts = TableCounts()
@@ -0,0 +1,139 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from ..models import User, Node, Post, InboxActivity, ProcessedActivity
+from ..activity_ledger import activity_hash, activity_key
+from ..inbox_queue import process_pending_activities
+from datetime import timedelta
+from io import StringIO
+import base64
+import json
+from urllib.parse import quote
+
+class ActivityLedgerTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://testserver/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        Node.objects.create(host='http://testserver/',username='abc',password='123',follow_status='INCOMING',status='ENABLED')
+        cls.creds = {'Authorization' : 'Basic ' + base64.b64encode(b'abc:123').decode('utf-8')}
+        cls.url = reverse('chartreuse:inbox',args=[quote(cls.recipient.url_id,safe='')])
+        cls.post_object = {
+            "type": "post",
+            "title": 'ETHAN TITLE',
+            "id": 'http://github.com/gjohnson/id',
+            "description": 'ETHAN DESCRIPTION',
+            "contentType": 'text/plain',
+            "content": 'This is ethans test post',
+            "author": {
+                "type": "author",
+                "id": 'http://github.com/gjohnson',
+                "page": 'fillerdata',
+                "host": 'http://github.com/gjohnson/host',
+                "displayName": 'ETHANAUTHOR',
+                "github": '',
+                "profileImage": 'https://profile.png'
+            },
+            "comments": {"type": "comments", "src": []},
+            "likes": {"type": "likes", "src": []},
+            "published": '2024-11-01T10:00:00+00:00',
+            "visibility": 'PUBLIC',
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_retried_activity_is_skipped(self):
+        first_response = self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        self.assertEqual(first_response.status_code,200)
+        self.assertEqual(ProcessedActivity.objects.filter(activity_id='http://github.com/gjohnson/id').count(),1)
+
+        # the retry is answered from the ledger before the post is looked up again
+        Post.objects.filter(url_id='http://github.com/gjohnson/id').update(title='CHANGED LOCALLY')
+        retry_response = self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+
+        self.assertEqual(retry_response.status_code,200)
+        self.assertEqual(json.loads(retry_response.content).get('status'),'Activity already processed')
+        self.assertEqual(Post.objects.get(url_id='http://github.com/gjohnson/id').title,'CHANGED LOCALLY')
+
+    def test_changed_activity_is_applied(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        updated_post = dict(self.post_object, title='NEW TITLE')
+        response = self.client.post(self.url, updated_post, format='json', headers=self.creds)
+
+        self.assertEqual(json.loads(response.content).get('status'),'Post added successfully')
+        self.assertEqual(Post.objects.get(url_id='http://github.com/gjohnson/id').title,'NEW TITLE')
+
+    def test_reverted_activity_is_applied(self):
+        updated_post = dict(self.post_object, title='NEW TITLE')
+        for activity in (self.post_object, updated_post, self.post_object):
+            response = self.client.post(self.url, activity, format='json', headers=self.creds)
+            self.assertEqual(json.loads(response.content).get('status'),'Post added successfully')
+
+        self.assertEqual(Post.objects.get(url_id='http://github.com/gjohnson/id').title,'ETHAN TITLE')
+        self.assertEqual(ProcessedActivity.objects.count(),1)
+
+    def test_expired_activity_is_applied_again(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        ProcessedActivity.objects.update(processed_at=timezone.now() - timedelta(days=2))
+
+        response = self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        self.assertEqual(json.loads(response.content).get('status'),'Post added successfully')
+
+    def test_prune_deletes_expired_activities(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        self.client.post(self.url, dict(self.post_object, id='http://github.com/gjohnson/other'), format='json', headers=self.creds)
+        ProcessedActivity.objects.filter(activity_id='http://github.com/gjohnson/id').update(processed_at=timezone.now() - timedelta(days=2))
+
+        call_command('prune_activity_ledger', stdout=StringIO())
+        self.assertEqual(list(ProcessedActivity.objects.values_list('activity_id', flat=True)),['http://github.com/gjohnson/other'])
+
+    def test_activities_without_id_are_not_keyed(self):
+        follow = {"type": "follow", "actor": {"id": 'http://github.com/gjohnson'}, "object": {"id": self.recipient.url_id}}
+
+        # following again after an unfollow is a new activity even though its payload is the same
+        self.assertIsNone(activity_key(follow))
+        self.assertEqual(activity_key(self.post_object).activity_type,'post')
+
+    def test_failed_activity_is_not_recorded(self):
+        invalid_post = dict(self.post_object, id='http://gith')
+        self.client.post(self.url, invalid_post, format='json', headers=self.creds)
+
+        self.assertFalse(ProcessedActivity.objects.exists())
+
+    @override_settings(INBOX_ASYNC=True)
+    def test_retried_activity_is_queued_once(self):
+        self.assertEqual(self.client.post(self.url, self.post_object, format='json', headers=self.creds).status_code,202)
+        # the retry arrives while the first delivery still waits for the worker
+        self.assertEqual(self.client.post(self.url, self.post_object, format='json', headers=self.creds).status_code,202)
+        self.assertEqual(InboxActivity.objects.count(),1)
+
+        process_pending_activities()
+        self.assertEqual(self.client.post(self.url, self.post_object, format='json', headers=self.creds).status_code,200)
+        self.assertEqual(InboxActivity.objects.count(),1)
+
+    @override_settings(INBOX_ASYNC=True, INBOX_MAX_ATTEMPTS=1)
+    def test_activity_failed_by_the_worker_is_accepted_again(self):
+        comment = {
+            "type": "comment",
+            "author": self.post_object["author"],
+            "comment": 'COMMENT',
+            "contentType": 'text/plain',
+            "published": '2024-11-01T10:00:00+00:00',
+            "id": 'http://github.com/gjohnson/idcomment',
+            "post": 'http://github.com/gjohnson/missing',
+        }
+        self.client.post(self.url, comment, format='json', headers=self.creds)
+        process_pending_activities()
+        self.assertEqual(InboxActivity.objects.get().status,'FAILED')
+        self.assertFalse(ProcessedActivity.objects.exists())
+
+        response = self.client.post(self.url, comment, format='json', headers=self.creds)
+        self.assertEqual(response.status_code,202)
+        self.assertEqual(InboxActivity.objects.filter(status='PENDING').count(),1)
+
+    def test_hash_ignores_key_order(self):
+        reordered = dict(reversed(list(self.post_object.items())))
+
+        self.assertEqual(activity_hash(reordered),activity_hash(self.post_object))
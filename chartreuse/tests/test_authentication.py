@@ -8,6 +8,7 @@ from ..views import checkIfRequestAuthenticated
 from requests import Request
 import json
 from django.contrib.auth.models import User as AuthUser
+from django.contrib.auth.hashers import check_password
 
 class AuthenticationTestCases(TestCase):
     @classmethod
@@ -182,3 +183,24 @@ class AuthenticationTestCases(TestCase):
 
 
 
+
+    def test_incoming_node_password_is_hashed(self):
+        node = Node.objects.get(pk=self.node.pk)
+
+        self.assertNotEqual(node.password,'123')
+        self.assertTrue(check_password('123',node.password))
+
+    def test_outgoing_node_password_is_not_hashed(self):
+        node = Node.objects.create(host='http://remote.herokuapp.com/',username='out',password='secret',follow_status='OUTGOING',status='ENABLED')
+
+        self.assertEqual(Node.objects.get(pk=node.pk).password,'secret')
+
+    def test_repeated_authentication_checks_are_cached_per_request(self):
+        request = Request(url='https://None',auth=('abc','123')).prepare()
+
+        with self.assertNumQueries(1):
+            first_response = checkIfRequestAuthenticated(request)
+            second_response = checkIfRequestAuthenticated(request)
+
+        self.assertEqual(first_response.status_code,200)
+        self.assertEqual(second_response.status_code,200)
@@ -0,0 +1,75 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from ..models import User
+
+class AuthorBatchTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.with_github = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Coder', host='http://testserver/chartreuse/api/', github='https://github.com/coder', profileImage='https://profile.png')
+        cls.without_github = User.objects.create(url_id='http://testserver/chartreuse/api/authors/2', displayName='Writer', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.remote = User.objects.create(url_id='http://remote/api/authors/7', displayName='Remote', host='http://remote/api/', profileImage='https://profile.png')
+        cls.url = reverse('chartreuse:user-batch')
+
+    def test_get_by_ids_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'id': [self.remote.url_id, '2', 'http://remote/api/authors/404']})
+
+        self.assertEqual(response.status_code,200)
+        authors = response.json()['authors']
+        self.assertEqual([author['id'] for author in authors],[self.remote.url_id,self.without_github.url_id])
+        self.assertEqual(authors[0],{
+            'type':'author',
+            'id':self.remote.url_id,
+            'host':'http://remote/api/',
+            'displayName':'Remote',
+            'github':None,
+            'profileImage':'https://profile.png',
+            'page':'http://remote/api/authors/' + self.remote.url_id,
+        })
+
+    def test_post_ids(self):
+        response = self.client.post(self.url, {'ids': [self.with_github.url_id, self.with_github.url_id]}, content_type='application/json')
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual([author['displayName'] for author in response.json()['authors']],['Coder'])
+
+    def test_github_filter(self):
+        response = self.client.get(self.url, {'id': [self.with_github.url_id, self.without_github.url_id], 'github': 'true'})
+        self.assertEqual([author['id'] for author in response.json()['authors']],[self.with_github.url_id])
+
+        # without ids every author with a github link is sent
+        authors = self.client.get(self.url, {'github': 'true', 'fields': 'github'}).json()['authors']
+        self.assertIn({'type':'author','id':self.with_github.url_id,'github':'https://github.com/coder'},authors)
+        self.assertTrue(all(author['github'] for author in authors))
+
+    def test_ids_are_required(self):
+        self.assertEqual(self.client.get(self.url).status_code,400)
+        self.assertEqual(self.client.post(self.url, {'ids': 'not a list'}, content_type='application/json').status_code,400)
+
+    @override_settings(AUTHOR_BATCH_MAX_IDS=1)
+    def test_too_many_ids(self):
+        response = self.client.get(self.url, {'id': ['1', '2']})
+        self.assertEqual(response.status_code,400)
+
+    @override_settings(AUTHOR_BATCH_MAX_IDS=2)
+    def test_github_authors_are_paged(self):
+        coders = [self.with_github] + [
+            User.objects.create(url_id=f'http://testserver/chartreuse/api/authors/{number}', displayName='Coder', host='http://testserver/chartreuse/api/', github=f'https://github.com/coder{number}', profileImage='https://profile.png')
+            for number in range(3, 6)
+        ]
+
+        seen = []
+        data = self.client.get(self.url, {'github': 'true', 'size': 100}).json()
+        # a page is never bigger than a batch of ids
+        self.assertEqual(len(data['authors']),2)
+        while True:
+            seen += [author['id'] for author in data['authors']]
+            if data['next'] is None:
+                break
+            data = self.client.get(self.url, {'github': 'true', 'cursor': data['next']}).json()
+
+        self.assertEqual(sorted(seen),sorted(coder.url_id for coder in coders))
+
+    def test_invalid_github_page(self):
+        self.assertEqual(self.client.get(self.url, {'github': 'true', 'cursor': 'not-a-cursor'}).status_code,400)
+        self.assertEqual(self.client.get(self.url, {'github': 'true', 'size': 0}).status_code,400)
@@ -0,0 +1,63 @@
+from django.test import TestCase, RequestFactory
+from ..models import User
+from ..author_resolver import author_resolver
+
+class AuthorResolverTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.known_author = User.objects.create(url_id='http://remote.com/api/authors/1', displayName='Known', host='http://remote.com/', profileImage='https://profile.png')
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def author_doc(self, url_id, displayName='Remote'):
+        return {
+            "type": "author",
+            "id": url_id,
+            "host": 'http://remote.com/',
+            "displayName": displayName,
+            "github": '',
+            "profileImage": 'https://profile.png'
+        }
+
+    def test_bulk_resolution(self):
+        docs = {f'http://remote.com/api/authors/{i}': self.author_doc(f'http://remote.com/api/authors/{i}') for i in range(1, 21)}
+
+        # one lookup for the misses and one insert for the new authors
+        with self.assertNumQueries(2):
+            authors = author_resolver.resolve(docs, self.request)
+
+        self.assertEqual(len(authors),20)
+        self.assertEqual(authors['http://remote.com/api/authors/1'].displayName,'Known')
+        self.assertEqual(User.objects.filter(url_id__startswith='http://remote.com/api/authors/').count(),20)
+
+    def test_known_authors_are_cached_per_request(self):
+        docs = {'http://remote.com/api/authors/1': self.author_doc('http://remote.com/api/authors/1')}
+        author_resolver.resolve(docs, self.request)
+
+        with self.assertNumQueries(0):
+            author = author_resolver.resolve_one('http://remote.com/api/authors/1', docs['http://remote.com/api/authors/1'], self.request)
+
+        self.assertEqual(author.displayName,'Known')
+
+    def test_returned_authors_are_copies(self):
+        doc = self.author_doc('http://remote.com/api/authors/1')
+        first = author_resolver.resolve_one('http://remote.com/api/authors/1', doc, self.request)
+        first.url_id = 'changed'
+
+        second = author_resolver.resolve_one('http://remote.com/api/authors/1', doc, self.request)
+        self.assertEqual(second.url_id,'http://remote.com/api/authors/1')
+        self.assertIsNot(first,second)
+
+    def test_invalid_author_is_skipped(self):
+        doc = self.author_doc('not a url')
+
+        self.assertIsNone(author_resolver.resolve_one('not a url', doc, self.request))
+        self.assertFalse(User.objects.filter(url_id='not a url').exists())
+
+    def test_unvalidated_author_is_added(self):
+        doc = dict(self.author_doc('http://remote.com/api/authors/2'), profileImage=None)
+        author = author_resolver.resolve_one('http://remote.com/api/authors/2', doc, self.request, validate=False)
+
+        self.assertEqual(author.profileImage,'')
+        self.assertTrue(User.objects.filter(url_id='http://remote.com/api/authors/2').exists())
@@ -0,0 +1,52 @@
+from django.test import TestCase
+from ..backfill import claim_backfill_job, enqueue_backfill, run_backfill_job
+from ..models import BackfillJob, Node, Post, User
+
+class BackfillTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.follower = User.objects.create(url_id='http://remote.com/api/authors/1', displayName='Follower', host='http://remote.com/api/', profileImage='https://profile.png')
+        cls.node = Node.objects.create(host='http://remote.com/api/', username='abc', password='123', follow_status='OUTGOING', status='ENABLED')
+        for number in range(1, 6):
+            Post.objects.create(url_id=f'{cls.author.url_id}/posts/{number}', title=f'Post {number}', description='Post', content='Post', user=cls.author)
+        Post.objects.create(url_id=f'{cls.author.url_id}/posts/6', title='Deleted', description='Post', content='Post', user=cls.author, visibility='DELETED')
+
+    def setUp(self):
+        self.pages = []
+
+    def record_page(self, job, documents, url, headers):
+        self.pages.append(([document['title'] for document in documents], url))
+        return len(documents), 0
+
+    def test_enqueue_does_not_send(self):
+        job = enqueue_backfill(self.author, self.follower, self.node)
+
+        self.assertEqual(job.status,'PENDING')
+        self.assertEqual(job.total_posts,5)
+        self.assertEqual(job.progress,0)
+
+    def test_job_pages_through_posts(self):
+        enqueue_backfill(self.author, self.follower, self.node)
+        job = claim_backfill_job()
+        self.assertEqual(job.status,'RUNNING')
+        self.assertIsNone(claim_backfill_job())
+
+        run_backfill_job(job, page_size=2, send_page=self.record_page)
+
+        self.assertEqual([titles for titles, _ in self.pages],[['Post 1', 'Post 2'], ['Post 3', 'Post 4'], ['Post 5']])
+        self.assertEqual(self.pages[0][1],'http://remote.com/api/authors/http%3A%2F%2Fremote.com%2Fapi%2Fauthors%2F1/inbox/')
+        job.refresh_from_db()
+        self.assertEqual(job.status,'DONE')
+        self.assertEqual(job.sent_posts,5)
+        self.assertEqual(job.progress,100)
+
+    def test_requeued_job_resumes_after_last_post(self):
+        job = enqueue_backfill(self.author, self.follower, self.node)
+        BackfillJob.objects.filter(pk=job.pk).update(last_post_id=Post.objects.get(title='Post 3').id, sent_posts=3)
+
+        run_backfill_job(claim_backfill_job(), send_page=self.record_page)
+
+        self.assertEqual(self.pages[0][0],['Post 4', 'Post 5'])
+        job.refresh_from_db()
+        self.assertEqual(job.sent_posts,5)
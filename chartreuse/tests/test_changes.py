@@ -0,0 +1,93 @@
+from datetime import timedelta
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from urllib.parse import quote
+from ..api_handling.changes import parse_since
+from ..models import Comment, Like, Post, User
+
+class ChangesTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.old_post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Old', description='Post', content='Post', user=cls.author)
+        cls.new_post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/2', title='New', description='Post', content='Post', user=cls.author)
+        cls.last_sync = timezone.now() - timedelta(hours=1)
+        Post.objects.filter(pk=cls.old_post.pk).update(updated_at=cls.last_sync - timedelta(days=1))
+        cls.author_id = quote(cls.author.url_id, safe='')
+
+    def test_parse_since(self):
+        factory = RequestFactory()
+        self.assertIsNone(parse_since(factory.get('/')))
+        self.assertEqual(parse_since(factory.get('/', {'since': '0'})).year,1970)
+        # an unencoded + of the offset arrives as a space
+        since = parse_since(factory.get('/?updated_after=2024-05-01T10:00:00 02:00'))
+        self.assertEqual(since.utcoffset(),timedelta(hours=2))
+        self.assertFalse(timezone.is_naive(parse_since(factory.get('/', {'since': '2024-05-01T10:00:00'}))))
+        with self.assertRaises(ValueError):
+            parse_since(factory.get('/', {'since': 'yesterday'}))
+
+    def test_posts_since(self):
+        response = self.client.get(reverse('chartreuse:posts', args=[self.author_id]), {'since': self.last_sync.isoformat()})
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual([post['title'] for post in response.json()['src']],['New'])
+
+    def test_posts_invalid_since(self):
+        response = self.client.get(reverse('chartreuse:posts', args=[self.author_id]), {'since': 'yesterday'})
+
+        self.assertEqual(response.status_code,400)
+
+    def test_like_touches_post(self):
+        Like.objects.create(user=self.author, post=self.old_post)
+
+        self.assertGreater(Post.objects.get(pk=self.old_post.pk).updated_at,self.last_sync)
+
+    def test_change_feed(self):
+        comment = Comment.objects.create(url_id=f'{self.author.url_id}/commented/1', user=self.author, post=self.new_post, comment='Comment')
+        like = Like.objects.create(user=self.author, post=self.new_post)
+        Post.objects.filter(pk=self.old_post.pk).update(visibility='DELETED', updated_at=timezone.now())
+
+        response = self.client.get(reverse('chartreuse:changes', args=[self.author_id]), {'since': self.last_sync.isoformat()})
+
+        self.assertEqual(response.status_code,200)
+        changes = response.json()['src']
+        self.assertEqual([(change['type'], change['id']) for change in changes],[
+            ('comment', comment.url_id),
+            ('like', f'{self.author.url_id}/liked/{like.id}'),
+            # the like bumped the post it is on
+            ('post', self.new_post.url_id),
+            ('post', self.old_post.url_id),
+        ])
+        self.assertEqual(changes[-1]['visibility'],'DELETED')
+
+        response = self.client.get(reverse('chartreuse:changes', args=[self.author_id]), {'since': response.json()['next_since']})
+        self.assertEqual(response.json()['src'],[])
+
+    def test_change_feed_size(self):
+        response = self.client.get(reverse('chartreuse:changes', args=[self.author_id]), {'size': 1})
+
+        self.assertEqual([change['id'] for change in response.json()['src']],[self.old_post.url_id])
+
+    def test_change_feed_cursor_keeps_changes_made_together(self):
+        comment = Comment.objects.create(url_id=f'{self.author.url_id}/commented/1', user=self.author, post=self.new_post, comment='Comment')
+        third_post = Post.objects.create(url_id=f'{self.author.url_id}/posts/3', title='Third', description='Post', content='Post', user=self.author)
+        moment = timezone.now()
+        Post.objects.update(updated_at=moment)
+        Comment.objects.update(updated_at=moment)
+
+        url = reverse('chartreuse:changes', args=[self.author_id])
+        seen = []
+        data = self.client.get(url, {'size': 1}).json()
+        while data['src']:
+            seen += [change['id'] for change in data['src']]
+            data = self.client.get(url, {'size': 1, 'cursor': data['next']}).json()
+
+        self.assertEqual(seen,[self.old_post.url_id, self.new_post.url_id, third_post.url_id, comment.url_id])
+        # the last cursor is kept to ask for later changes
+        self.assertIsNotNone(data['next'])
+
+    def test_change_feed_invalid_cursor(self):
+        response = self.client.get(reverse('chartreuse:changes', args=[self.author_id]), {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code,400)
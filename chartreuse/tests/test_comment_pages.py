@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.urls import reverse
+from urllib.parse import quote
+from ..models import Comment, Like, Post, User
+
+class CommentPageTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Post', content='Post', user=cls.author)
+        cls.likers = [
+            User.objects.create(url_id=f'http://testserver/chartreuse/api/authors/{number}', displayName=f'Liker {number}', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+            for number in range(2, 5)
+        ]
+        cls.comments = []
+        for number in range(1, 6):
+            commenter = cls.likers[number % 3]
+            comment = Comment.objects.create(url_id=f'{commenter.url_id}/commented/{number}', user=commenter, post=cls.post, comment=f'Comment {number}')
+            cls.comments.append(comment)
+            for liker in cls.likers[:number % 3 + 1]:
+                Like.objects.create(url_id=f'{liker.url_id}/liked/{number}', user=liker, comment=comment)
+        cls.comments_url = reverse('chartreuse:get_comments', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe='')])
+
+    def test_page_queries_do_not_grow_with_comments(self):
+        # author, post, count, the page with its authors and like counts, and the likes of the page
+        with self.assertNumQueries(5):
+            response = self.client.get(self.comments_url)
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(len(response.json()['src']),5)
+
+    def test_comment_documents(self):
+        data = self.client.get(self.comments_url).json()
+        self.assertEqual(data['count'],5)
+
+        first = data['src'][0]
+        comment = self.comments[0]
+        self.assertEqual(first['id'],comment.url_id)
+        self.assertEqual(first['author']['displayName'],comment.user.displayName)
+        self.assertEqual(first['post'],self.post.url_id)
+        self.assertEqual(first['likes']['count'],2)
+        self.assertEqual(
+            [(like['author']['id'], like['object']) for like in first['likes']['src']],
+            [(liker.url_id, comment.url_id) for liker in self.likers[:2]]
+        )
+
+    def test_single_comment(self):
+        comment = self.comments[2]
+        url = reverse('chartreuse:get_comment_by_cid', args=[quote(comment.url_id, safe='')])
+        # the version check of the conditional GET, the comment and its likes
+        with self.assertNumQueries(3):
+            data = self.client.get(url).json()
+
+        self.assertEqual(data['likes']['count'],1)
+        self.assertEqual(data['author']['id'],comment.user.url_id)
+
+    def test_authors_comments(self):
+        commenter = self.likers[1]
+        url = reverse('chartreuse:get_authors_comments', args=[quote(commenter.url_id, safe='')])
+        with self.assertNumQueries(4):
+            data = self.client.get(url).json()
+
+        self.assertEqual(data['count'],2)
+        self.assertEqual([comment['id'] for comment in data['src']],[f'{commenter.url_id}/commented/1', f'{commenter.url_id}/commented/4'])
+        self.assertTrue(all(comment['post'] == self.post.url_id for comment in data['src']))
@@ -0,0 +1,126 @@
+import gzip
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from ..middleware import CompressionMiddleware, accepted_encodings, brotli
+from ..models import Node
+from .. import node_client
+
+LARGE_DOCUMENT = {"type": "post", "content": "chartreuse " * 500}
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTestCases(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def respond(self, request, response):
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, br;q=0, deflate;q=0.5'),{'gzip', 'deflate'})
+        self.assertEqual(accepted_encodings(''),set())
+
+    def test_large_response_is_gzipped(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.respond(request, JsonResponse(LARGE_DOCUMENT))
+
+        self.assertEqual(response.headers['Content-Encoding'],'gzip')
+        self.assertIn('Accept-Encoding',response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.content)),LARGE_DOCUMENT)
+
+    def test_small_response_is_not_compressed(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.respond(request, JsonResponse({"type": "author"}))
+
+        self.assertNotIn('Content-Encoding',response.headers)
+
+    def test_images_are_not_compressed(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.respond(request, HttpResponse(b'\x89PNG' * 1000, content_type='image/png'))
+
+        self.assertNotIn('Content-Encoding',response.headers)
+
+    def test_streaming_response_is_compressed_in_chunks(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.respond(request, StreamingHttpResponse(iter([b'a' * 2000, b'b' * 2000])))
+
+        self.assertEqual(response.headers['Content-Encoding'],'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),b'a' * 2000 + b'b' * 2000)
+
+    @unittest.skipUnless(brotli, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        response = self.respond(request, JsonResponse(LARGE_DOCUMENT))
+
+        self.assertEqual(response.headers['Content-Encoding'],'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content)),LARGE_DOCUMENT)
+
+    def test_html_is_gzipped_with_padding(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        response = self.respond(request, HttpResponse(b'<p>chartreuse</p>' * 500, content_type='text/html; charset=utf-8'))
+
+        # brotli has no padding against BREACH, so pages are always left to GZipMiddleware
+        self.assertEqual(response.headers['Content-Encoding'],'gzip')
+        self.assertEqual(gzip.decompress(response.content),b'<p>chartreuse</p>' * 500)
+
+    def test_compressed_request_body(self):
+        body = json.dumps(LARGE_DOCUMENT).encode('utf-8')
+        request = self.factory.post('/', data=gzip.compress(body), content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        response = CompressionMiddleware(lambda request: HttpResponse(request.body, content_type='application/octet-stream'))(request)
+
+        self.assertEqual(response.content,body)
+        self.assertEqual(request.META['CONTENT_LENGTH'],str(len(body)))
+
+    @override_settings(COMPRESSION_MAX_REQUEST_BYTES=1000)
+    def test_compressed_request_body_too_large(self):
+        request = self.factory.post('/', data=gzip.compress(b'0' * 100000), content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+
+        self.assertEqual(self.respond(request, HttpResponse()).status_code,413)
+
+    def test_invalid_compressed_request_body(self):
+        request = self.factory.post('/', data=b'not gzip', content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        self.assertEqual(self.respond(request, HttpResponse()).status_code,400)
+
+        request = self.factory.post('/', data=b'{}', content_type='application/json', HTTP_CONTENT_ENCODING='compress')
+        self.assertEqual(self.respond(request, HttpResponse()).status_code,415)
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append((self.headers.get('Content-Encoding'), body))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressedRequestTestCases(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), RecordingHandler)
+        self.server.received = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.host = f'http://127.0.0.1:{self.server.server_port}/'
+        self.node = Node.objects.create(host=self.host, username='out', password='secret', follow_status='OUTGOING', status='ENABLED', compress_requests=True)
+
+    def test_bodies_are_compressed_for_nodes_that_accept_it(self):
+        node_client.post(self.host + 'inbox', node=self.node, json=LARGE_DOCUMENT)
+        node_client.post(self.host + 'inbox', node=self.node, json={"type": "like"})
+
+        encoding, body = self.server.received[0]
+        self.assertEqual(encoding,'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body)),LARGE_DOCUMENT)
+        # small bodies are not worth compressing
+        self.assertEqual(self.server.received[1],(None, b'{"type": "like"}'))
+
+    def test_bodies_are_not_compressed_by_default(self):
+        Node.objects.filter(pk=self.node.pk).update(compress_requests=False)
+        node_client.post(self.host + 'inbox', node=Node.objects.get(pk=self.node.pk), json=LARGE_DOCUMENT)
+
+        self.assertIsNone(self.server.received[0][0])
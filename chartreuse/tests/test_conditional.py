@@ -0,0 +1,127 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from django.test import TestCase
+from django.urls import reverse
+from urllib.parse import quote
+from ..models import Comment, Like, Post, User
+from ..node_client import ConditionalCache
+
+class ConditionalGetTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Post', content='Post', user=cls.author)
+        cls.author_url = reverse('chartreuse:user-detail', args=[quote(cls.author.url_id, safe='')])
+        cls.post_url = reverse('chartreuse:post', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe='')])
+
+    def test_unchanged_author_is_not_modified(self):
+        response = self.client.get(self.author_url)
+        self.assertEqual(response.status_code,200)
+        self.assertIn('ETag',response.headers)
+        self.assertIn('Last-Modified',response.headers)
+
+        response = self.client.get(self.author_url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code,304)
+        self.assertEqual(response.content,b'')
+
+    def test_changed_author_is_sent_again(self):
+        etag = self.client.get(self.author_url).headers['ETag']
+        self.author.displayName = 'Renamed'
+        self.author.save()
+
+        response = self.client.get(self.author_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.json()['displayName'],'Renamed')
+
+    def test_post_is_revalidated_against_its_likes(self):
+        response = self.client.get(self.post_url)
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(self.post_url, headers={'If-None-Match': etag}).status_code,304)
+
+        Like.objects.create(user=self.author, post=self.post)
+        self.assertEqual(self.client.get(self.post_url, headers={'If-None-Match': etag}).status_code,200)
+
+    def test_post_is_revalidated_against_embedded_authors(self):
+        commenter = User.objects.create(url_id='http://testserver/chartreuse/api/authors/2', displayName='Commenter', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        liker = User.objects.create(url_id='http://testserver/chartreuse/api/authors/3', displayName='Liker', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        comment = Comment.objects.create(url_id=f'{commenter.url_id}/commented/1', user=commenter, post=self.post, comment='Comment')
+        Like.objects.create(url_id=f'{liker.url_id}/liked/1', user=liker, comment=comment)
+
+        for author in (commenter, liker):
+            etag = self.client.get(self.post_url).headers['ETag']
+            author.displayName = 'Renamed'
+            author.save()
+            self.assertEqual(self.client.get(self.post_url, headers={'If-None-Match': etag}).status_code,200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.post_url).headers['Last-Modified']
+
+        self.assertEqual(self.client.get(self.post_url, headers={'If-Modified-Since': last_modified}).status_code,304)
+
+    def test_embedded_documents_ignore_validators(self):
+        # the posts list builds its author document in-process and must not get a 304 back for it
+        last_modified = self.client.get(self.author_url).headers['Last-Modified']
+        response = self.client.get(reverse('chartreuse:posts', args=[quote(self.author.url_id, safe='')]), headers={'If-Modified-Since': last_modified})
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.json()['src'][0]['author']['displayName'],'Author')
+
+class VersionedHandler(BaseHTTPRequestHandler):
+    '''
+    Serves one json document with an ETag, answering 304 when the client already has its version.
+    '''
+    def do_GET(self):
+        server = self.server
+        server.conditional_headers.append(self.headers.get('If-None-Match'))
+        etag = f'"{server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        body = json.dumps({'version': server.version}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class ConditionalCacheTestCases(TestCase):
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), VersionedHandler)
+        self.server.version = 1
+        self.server.conditional_headers = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/authors/1'
+        self.cache = ConditionalCache(max_entries=2)
+
+    def test_not_modified_reuses_body(self):
+        self.assertEqual(self.cache.get(self.url).json(),{'version': 1})
+
+        response = self.cache.get(self.url)
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.json(),{'version': 1})
+        self.assertEqual(self.server.conditional_headers,[None, '"1"'])
+
+    def test_changed_document_replaces_cached_one(self):
+        self.cache.get(self.url)
+        self.server.version = 2
+
+        self.assertEqual(self.cache.get(self.url).json(),{'version': 2})
+        self.assertEqual(self.cache.get(self.url).json(),{'version': 2})
+        self.assertEqual(self.server.conditional_headers,[None, '"1"', '"2"'])
+
+    def test_least_recently_used_is_dropped(self):
+        for number in range(3):
+            self.cache.get(f'{self.url}/{number}')
+        self.cache.get(f'{self.url}/0')
+
+        # only two responses are kept, so the first url is fetched without a validator again
+        self.assertIsNone(self.server.conditional_headers[-1])
@@ -0,0 +1,169 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..delivery import Delivery, DeliveryScheduler, backoff_delay, deliver, delivery_scheduler, record_failed_delivery, replay_dead_letters, retry_due_deliveries, send_delivery
+from ..models import Node, FailedDelivery, DeadLetterDelivery
+from django.utils import timezone
+import threading
+from datetime import timedelta
+from unittest import mock
+
+class DeliverySchedulerTestCases(SimpleTestCase):
+    def setUp(self):
+        self.node_a = Node(host='http://a.com/', username='a', password='a')
+        self.node_b = Node(host='http://b.com/', username='b', password='b')
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def record(self, delivery):
+        with self.lock:
+            self.sent.append(delivery.payload)
+
+    def test_round_robin_across_nodes(self):
+        scheduler = DeliveryScheduler(max_in_flight=1, per_node_limit=1, send=self.record)
+        for number in range(3):
+            scheduler.submit(Delivery(self.node_a, 'http://a.com/inbox', f'a{number}', {}))
+        scheduler.submit(Delivery(self.node_b, 'http://b.com/inbox', 'b0', {}))
+
+        self.assertTrue(scheduler.drain(timeout=5))
+        # node b does not wait behind every delivery queued for node a
+        self.assertLess(self.sent.index('b0'),self.sent.index('a2'))
+        self.assertEqual(sorted(self.sent),['a0','a1','a2','b0'])
+
+    def test_per_node_limit(self):
+        release = threading.Event()
+        in_flight = {'http://a.com/': 0, 'http://b.com/': 0}
+        peak = {'http://a.com/': 0, 'http://b.com/': 0}
+
+        def slow_send(delivery):
+            host = delivery.node.host
+            with self.lock:
+                in_flight[host] += 1
+                peak[host] = max(peak[host], in_flight[host])
+            release.wait(5)
+            with self.lock:
+                in_flight[host] -= 1
+                self.sent.append(delivery.payload)
+
+        scheduler = DeliveryScheduler(max_in_flight=4, per_node_limit=2, send=slow_send)
+        for number in range(6):
+            scheduler.submit(Delivery(self.node_a, 'http://a.com/inbox', f'a{number}', {}))
+        scheduler.submit(Delivery(self.node_b, 'http://b.com/inbox', 'b0', {}))
+
+        # the slow node only ever holds its own share of the senders, so node b still gets through
+        for _ in range(100):
+            with self.lock:
+                if peak['http://b.com/'] == 1:
+                    break
+            threading.Event().wait(0.01)
+        release.set()
+
+        self.assertTrue(scheduler.drain(timeout=5))
+        self.assertEqual(peak['http://a.com/'],2)
+        self.assertEqual(peak['http://b.com/'],1)
+        self.assertEqual(len(self.sent),7)
+
+    def test_full_queue_refuses_deliveries(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocking_send(delivery):
+            started.set()
+            release.wait(5)
+
+        scheduler = DeliveryScheduler(max_in_flight=1, per_node_limit=1, queue_size=1, send=blocking_send)
+
+        self.assertTrue(scheduler.submit(Delivery(self.node_a, 'http://a.com/inbox', 'a0', {})))
+        # once the first delivery is being sent the queue has room for exactly one more
+        self.assertTrue(started.wait(5))
+        self.assertTrue(scheduler.submit(Delivery(self.node_a, 'http://a.com/inbox', 'a1', {})))
+        self.assertFalse(scheduler.submit(Delivery(self.node_a, 'http://a.com/inbox', 'a2', {})))
+
+        release.set()
+        self.assertTrue(scheduler.drain(timeout=5))
+
+
+@override_settings(DELIVERY_MAX_ATTEMPTS=3, DELIVERY_RETRY_BASE_DELAY=10, DELIVERY_RETRY_MAX_DELAY=60)
+class DeliveryRetryTestCases(TestCase):
+    def setUp(self):
+        # nothing listens on port 1, so deliveries to it are refused right away
+        self.node = Node.objects.create(host='http://127.0.0.1:1/',username='out',password='secret',follow_status='OUTGOING',status='ENABLED')
+        self.delivery = Delivery(self.node, 'http://127.0.0.1:1/authors/1/inbox', {'type': 'post'}, {'Content-Type': 'application/json'})
+
+    def test_backoff_delay(self):
+        for attempts, delay in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+            self.assertGreaterEqual(backoff_delay(attempts),delay / 2)
+            self.assertLessEqual(backoff_delay(attempts),delay)
+
+    def test_failed_delivery_is_persisted(self):
+        send_delivery(self.delivery)
+
+        failed = FailedDelivery.objects.get()
+        self.assertEqual(failed.attempts,1)
+        self.assertEqual(failed.payload,{'type': 'post'})
+        self.assertGreater(failed.next_attempt_at,timezone.now())
+        self.assertIn('ConnectionError',failed.last_error)
+
+    def test_delivery_is_persisted_until_sent(self):
+        with mock.patch.object(delivery_scheduler, 'submit', return_value=True) as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                deliver(self.delivery)
+                # queued only once the row is committed
+                submit.assert_not_called()
+
+        outbox = FailedDelivery.objects.get()
+        self.assertEqual((outbox.attempts, outbox.payload),(0, {'type': 'post'}))
+        queued = submit.call_args.args[0]
+        self.assertEqual(queued.failed_delivery_id,outbox.pk)
+
+        with mock.patch('chartreuse.node_client.post', return_value=mock.Mock(status_code=200)):
+            send_delivery(queued)
+        self.assertFalse(FailedDelivery.objects.exists())
+
+    def test_delivery_lost_with_its_process_is_retried(self):
+        with mock.patch.object(delivery_scheduler, 'submit', return_value=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                deliver(self.delivery)
+
+        # the process holding the queued delivery died before sending it
+        with mock.patch.object(delivery_scheduler, 'submit', return_value=True) as submit:
+            self.assertEqual(retry_due_deliveries(),0)
+            FailedDelivery.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(retry_due_deliveries(),1)
+        self.assertEqual(submit.call_args.args[0].payload,{'type': 'post'})
+
+    def test_queued_delivery_sees_a_circuit_opened_later(self):
+        # the circuit opened after the delivery was queued with its node
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='OPEN', circuit_opened_at=timezone.now())
+        send_delivery(self.delivery)
+
+        self.assertIn('CircuitOpenError',FailedDelivery.objects.get().last_error)
+        self.assertEqual(Node.objects.get(pk=self.node.pk).consecutive_failures,0)
+
+    def test_dead_letter_after_max_attempts(self):
+        record_failed_delivery(self.delivery, 'HTTP 503')
+        failed = FailedDelivery.objects.get()
+        retry = self.delivery._replace(failed_delivery_id=failed.pk)
+
+        record_failed_delivery(retry, 'HTTP 503')
+        self.assertEqual(FailedDelivery.objects.get().attempts,2)
+
+        record_failed_delivery(retry, 'HTTP 502')
+        self.assertFalse(FailedDelivery.objects.exists())
+        dead_letter = DeadLetterDelivery.objects.get()
+        self.assertEqual(dead_letter.attempts,3)
+        self.assertEqual(dead_letter.last_error,'HTTP 502')
+
+    def test_rejected_delivery_is_dead_lettered_right_away(self):
+        record_failed_delivery(self.delivery, 'HTTP 404', retry=False)
+
+        self.assertFalse(FailedDelivery.objects.exists())
+        self.assertEqual(DeadLetterDelivery.objects.get().attempts,1)
+
+    def test_replay_dead_letters(self):
+        record_failed_delivery(self.delivery, 'HTTP 404', retry=False)
+
+        self.assertEqual(replay_dead_letters(DeadLetterDelivery.objects.all()),1)
+
+        failed = FailedDelivery.objects.get()
+        self.assertEqual(failed.attempts,0)
+        self.assertLessEqual(failed.next_attempt_at,timezone.now())
+        self.assertFalse(DeadLetterDelivery.objects.exists())
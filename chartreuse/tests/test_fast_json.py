@@ -0,0 +1,59 @@
+import datetime
+import json
+from decimal import Decimal
+from django.http import JsonResponse
+from django.test import SimpleTestCase, override_settings
+from .. import fast_json
+from ..fast_json import FastJsonResponse
+
+DOCUMENT = {
+    "type": "post",
+    "id": "http://testserver/chartreuse/api/authors/1/posts/1",
+    "page": "http://testserver/chartreuse/api/authors/zoë",
+    "title": "Café ☕",
+    "published": datetime.datetime(2024, 11, 1, 10, 0, 0, 123456, tzinfo=datetime.timezone.utc),
+    "count": Decimal("2"),
+}
+
+EXPECTED = {
+    "type": "post",
+    "id": "http://testserver/chartreuse/api/authors/1/posts/1",
+    "page": "http://testserver/chartreuse/api/authors/zoë",
+    "title": "Café ☕",
+    "published": "2024-11-01T10:00:00.123456Z",
+    "count": "2",
+}
+
+class FastJsonTestCases(SimpleTestCase):
+    def test_encodes_datetimes_and_decimals(self):
+        response = FastJsonResponse(DOCUMENT)
+
+        self.assertIsInstance(response, JsonResponse)
+        self.assertEqual(response['Content-Type'],'application/json')
+        self.assertEqual(json.loads(response.content),EXPECTED)
+
+    @override_settings(FAST_JSON_BACKEND='json')
+    def test_standard_library_writes_the_same_json(self):
+        self.assertFalse(fast_json.use_orjson())
+        self.assertEqual(json.loads(FastJsonResponse(DOCUMENT).content),EXPECTED)
+
+    def test_backends_agree(self):
+        with override_settings(FAST_JSON_BACKEND='json'):
+            stdlib = fast_json.dumps(DOCUMENT)
+        self.assertEqual(fast_json.dumps(DOCUMENT),stdlib)
+        # urls are written as is, not escaped
+        self.assertIn('"http://testserver/chartreuse/api/authors/zoë"'.encode('utf-8'),stdlib)
+
+    def test_safe(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse(["not", "a", "dict"])
+        self.assertEqual(json.loads(FastJsonResponse(["a"], safe=False).content),["a"])
+
+    def test_status_and_invalid_json(self):
+        self.assertEqual(FastJsonResponse({"error": "Post does not exist."}, status=404).status_code,404)
+        with self.assertRaises(ValueError):
+            fast_json.loads(b"{not json")
+
+    def test_unknown_types_are_rejected(self):
+        with self.assertRaises(TypeError):
+            fast_json.dumps({"value": object()})
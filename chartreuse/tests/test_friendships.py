@@ -0,0 +1,141 @@
+from django.test import TestCase
+from django.core.management import call_command
+from io import StringIO
+from unittest import mock
+from ..models import User, Follow, FollowRequest, Friendship
+from ..social_graph import social_graph
+from ..view.follow_utils import are_friends, get_friend_ids, is_following, has_requested_follow
+
+class FriendshipTestCases(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.greg = User.objects.create(url_id='http://localhost/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://localhost/chartreuse/api/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        cls.john = User.objects.create(url_id='http://localhost/chartreuse/api/authors/2', displayName='John Smith', host='http://localhost/chartreuse/api/', profileImage='https://i.imgur.com/1234.jpeg')
+
+    @classmethod
+    def tearDownClass(cls):
+        return super().tearDownClass()
+
+    def test_one_sided_follow_is_not_friendship(self):
+        '''
+        This tests that a single follow does not create a friendship.
+        '''
+        Follow.objects.create(follower=self.greg, followed=self.john)
+
+        self.assertFalse(Friendship.objects.exists())
+        self.assertFalse(are_friends(self.greg, self.john))
+
+    def test_mutual_follow_creates_friendship(self):
+        '''
+        This tests that following back creates the friendship in both directions.
+        '''
+        Follow.objects.create(follower=self.greg, followed=self.john)
+        Follow.objects.create(follower=self.john, followed=self.greg)
+
+        self.assertEqual(Friendship.objects.count(), 2)
+        self.assertTrue(are_friends(self.greg, self.john))
+        self.assertTrue(are_friends(self.john, self.greg))
+        self.assertEqual(get_friend_ids(self.greg), {self.john.url_id})
+
+    def test_unfollow_removes_friendship(self):
+        '''
+        This tests that either side unfollowing removes the friendship.
+        '''
+        Follow.objects.create(follower=self.greg, followed=self.john)
+        Follow.objects.create(follower=self.john, followed=self.greg)
+
+        Follow.objects.filter(follower=self.john, followed=self.greg).delete()
+
+        self.assertFalse(Friendship.objects.exists())
+        self.assertFalse(are_friends(self.greg, self.john))
+
+    def test_rebuild_friendships(self):
+        '''
+        This tests that the rebuild command restores the friendship table from the follows.
+        '''
+        Follow.objects.create(follower=self.greg, followed=self.john)
+        Follow.objects.create(follower=self.john, followed=self.greg)
+        Friendship.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_friendships', stdout=out)
+
+        self.assertEqual(Friendship.objects.count(), 2)
+        self.assertTrue(are_friends(self.greg, self.john))
+        self.assertIn('Rebuilt 1 friendships.', out.getvalue())
+
+class SocialGraphCacheTestCases(TestCase):
+    '''
+    The graph cache only keeps entries loaded outside of a transaction, so these tests treat the per-test
+    transaction of TestCase as if there were none.
+    '''
+    def setUp(self):
+        social_graph.clear()
+        self.addCleanup(social_graph.clear)
+        patcher = mock.patch.object(social_graph, 'in_transaction', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.greg = User.objects.create(url_id='http://localhost/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://localhost/chartreuse/api/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        self.john = User.objects.create(url_id='http://localhost/chartreuse/api/authors/2', displayName='John Smith', host='http://localhost/chartreuse/api/', profileImage='https://i.imgur.com/1234.jpeg')
+
+    def test_cached_lookups(self):
+        '''
+        This tests that repeated visibility checks are answered from memory.
+        '''
+        Follow.objects.create(follower=self.greg, followed=self.john)
+
+        with self.assertNumQueries(3):
+            self.assertTrue(is_following(self.greg, self.john))
+
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.greg, self.john))
+            self.assertFalse(are_friends(self.greg, self.john))
+            self.assertFalse(has_requested_follow(self.greg, self.john))
+
+    def test_follow_changes_invalidate(self):
+        '''
+        This tests that follow and follow request changes invalidate the cached entries.
+        '''
+        self.assertFalse(has_requested_follow(self.john, self.greg))
+        follow_request = FollowRequest.objects.create(requester=self.john, requestee=self.greg)
+        self.assertTrue(has_requested_follow(self.john, self.greg))
+
+        follow_request.delete()
+        Follow.objects.create(follower=self.greg, followed=self.john)
+        Follow.objects.create(follower=self.john, followed=self.greg)
+        self.assertFalse(has_requested_follow(self.john, self.greg))
+        self.assertTrue(are_friends(self.greg, self.john))
+
+        Follow.objects.filter(follower=self.greg, followed=self.john).delete()
+        self.assertFalse(are_friends(self.john, self.greg))
+        self.assertFalse(is_following(self.greg, self.john))
+
+    def test_entry_invalidated_during_load_is_not_cached(self):
+        '''
+        This tests that an entry is not cached when its user is invalidated while it is being loaded.
+        '''
+        load = social_graph._load
+
+        def load_then_follow(user_id):
+            entry = load(user_id)
+            Follow.objects.create(follower=self.greg, followed=self.john)
+            return entry
+
+        with mock.patch.object(social_graph, '_load', side_effect=load_then_follow):
+            self.assertFalse(is_following(self.greg, self.john))
+        self.assertTrue(is_following(self.greg, self.john))
+
+    def test_invalidated_again_on_commit(self):
+        '''
+        This tests that follow changes invalidate the cached entries again once they commit.
+        '''
+        with self.captureOnCommitCallbacks() as callbacks:
+            Follow.objects.create(follower=self.greg, followed=self.john)
+        self.assertTrue(is_following(self.greg, self.john))
+
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(3):
+            self.assertTrue(is_following(self.greg, self.john))
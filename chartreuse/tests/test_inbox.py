@@ -8,6 +8,8 @@ import json
 from django.contrib.auth.models import User as AuthUser
 from datetime import datetime
 from urllib.parse import quote
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 class AuthenticationTestCases(TestCase):
     @classmethod
@@ -800,3 +802,76 @@ class AuthenticationTestCases(TestCase):
 
 
   
+
+    def test_new_post_with_many_comments_bulk(self):
+        comment_author = lambda i: {
+            "type": "author",
+            "id": f'http://github.com/gjohnson/commenter/{i % 10}',
+            "page": 'whateverpage',
+            "host": 'http://github.com/gjohnson/host',
+            "displayName": 'comment author',
+            "github": '',
+            "profileImage": 'https://profile.png',
+        }
+        comments = [{
+            "type": "comment",
+            "author": comment_author(i),
+            "comment": f'comment {i}',
+            "contentType": 'text/plain',
+            "published": '2024-11-01T10:00:00+00:00',
+            "id": f'http://github.com/gjohnson/comment/{i}',
+            "post": 'http://github.com/gjohnson/id',
+            "likes": {"type": "likes", "src": [{
+                "type": "like",
+                "author": comment_author(i + 1),
+                "published": '2024-11-02T10:00:00+00:00',
+                "id": f'http://github.com/gjohnson/commentlike/{i}',
+                "object": f'http://github.com/gjohnson/comment/{i}',
+            }]},
+        } for i in range(200)]
+        # an invalid comment is skipped rather than failing the whole post
+        comments.append(dict(comments[0], id='not a url'))
+
+        postObject = {
+                "type": "post",
+                "title": 'ETHAN TITLE',
+                "id": 'http://github.com/gjohnson/id',
+                "description": 'ETHAN DESCRIPTION',
+                "contentType": 'text/plain',
+                "content": 'This is ethans test post',
+                "author": {
+                    "type": "author",
+                    "id": 'http://github.com/gjohnson',
+                    "page": 'fillerdata',
+                    "host": 'http://github.com/gjohnson/host',
+                    "displayName": 'ETHANAUTHOR',
+                    "github": '',
+                    "profileImage": 'https://profile.png'
+                },
+                "comments":{
+                    "type": "comments",
+                    "src": comments
+                },
+                "likes": {
+                    "types": "likes",
+                    "src": []
+                },
+                "published": '2024-10-31T10:00:00+00:00',
+                "visibility": 'PUBLIC',
+            }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('chartreuse:inbox',args=[quote('http://f24-project-chartreuse-b4b2bcc83d87.herokuapp.com/chartreuse/api/authors/1',safe='')]), postObject, content_type='application/json',headers=self.creds)
+
+        self.assertEqual(response.status_code,200)
+        self.assertLess(len(queries),30)
+
+        post = Post.objects.get(url_id='http://github.com/gjohnson/id')
+        self.assertEqual(post.published.isoformat(),'2024-10-31T10:00:00+00:00')
+        self.assertEqual(Comment.objects.filter(post=post).count(),200)
+        self.assertEqual(Like.objects.filter(comment__post=post).count(),200)
+        self.assertEqual(User.objects.filter(url_id__startswith='http://github.com/gjohnson/commenter/').count(),10)
+
+        comment = Comment.objects.get(url_id='http://github.com/gjohnson/comment/5')
+        self.assertEqual(comment.dateCreated.isoformat(),'2024-11-01T10:00:00+00:00')
+        self.assertEqual(Like.objects.get(comment=comment).dateCreated.isoformat(),'2024-11-02T10:00:00+00:00')
@@ -0,0 +1,112 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import User, Node, Post, Like
+import base64
+import json
+from urllib.parse import quote
+
+class InboxBatchTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://testserver/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        Node.objects.create(host='http://testserver/',username='abc',password='123',follow_status='INCOMING',status='ENABLED')
+        cls.creds = {'Authorization' : 'Basic ' + base64.b64encode(b'abc:123').decode('utf-8')}
+        cls.url = reverse('chartreuse:inbox',args=[quote(cls.recipient.url_id,safe='')])
+        cls.remote_author = {
+            "type": "author",
+            "id": 'http://github.com/gjohnson',
+            "page": 'fillerdata',
+            "host": 'http://github.com/gjohnson/host',
+            "displayName": 'ETHANAUTHOR',
+            "github": '',
+            "profileImage": 'https://profile.png'
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post_object(self, number):
+        return {
+            "type": "post",
+            "title": f'POST {number}',
+            "id": f'http://github.com/gjohnson/posts/{number}',
+            "description": 'ETHAN DESCRIPTION',
+            "contentType": 'text/plain',
+            "content": 'This is ethans test post',
+            "author": self.remote_author,
+            "comments": {"type": "comments", "src": []},
+            "likes": {"type": "likes", "src": []},
+            "published": '2024-11-01T10:00:00+00:00',
+            "visibility": 'PUBLIC',
+        }
+
+    def test_array_of_activities(self):
+        like_object = {
+            "type": "like",
+            "author": self.remote_author,
+            "published": '2024-11-01T11:00:00+00:00',
+            "id": 'http://github.com/gjohnson/likeid',
+            "object": 'http://github.com/gjohnson/posts/1'
+        }
+        response = self.client.post(self.url, [self.post_object(1), self.post_object(2), like_object], format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,200)
+        items = json.loads(response.content)['items']
+        self.assertEqual([item['status_code'] for item in items],[200,200,200])
+        self.assertEqual(items[0]['id'],'http://github.com/gjohnson/posts/1')
+        self.assertEqual(items[0]['status'],'Post added successfully')
+
+        self.assertEqual(Post.objects.filter(url_id__startswith='http://github.com/gjohnson/posts/').count(),2)
+        self.assertTrue(Like.objects.filter(post__url_id='http://github.com/gjohnson/posts/1').exists())
+
+    def test_repeated_like_is_not_rejected(self):
+        like_object = {
+            "type": "like",
+            "author": self.remote_author,
+            "published": '2024-11-01T11:00:00+00:00',
+            "id": 'http://github.com/gjohnson/likeid',
+            "object": 'http://github.com/gjohnson/posts/1'
+        }
+        # the same author liking the post again under a new id
+        repeated_like = dict(like_object, id='http://github.com/gjohnson/likeid2')
+        response = self.client.post(self.url, [self.post_object(1), like_object, repeated_like], format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,200)
+        items = json.loads(response.content)['items']
+        self.assertEqual([item['status_code'] for item in items],[200,200,200])
+        self.assertEqual(items[2]['status'],'Already liked')
+        self.assertEqual(Like.objects.filter(post__url_id='http://github.com/gjohnson/posts/1').count(),1)
+
+    def test_ordered_collection(self):
+        collection = {"type": "OrderedCollection", "orderedItems": [self.post_object(1), self.post_object(2)]}
+        response = self.client.post(self.url, collection, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(len(json.loads(response.content)['items']),2)
+        self.assertEqual(Post.objects.filter(url_id__startswith='http://github.com/gjohnson/posts/').count(),2)
+
+    def test_rejected_item_does_not_affect_others(self):
+        invalid_post = dict(self.post_object(2), id='http://gith')
+        comment_no_post = {
+            "type": "comment",
+            "author": self.remote_author,
+            "comment": 'NEW COMMENT HI',
+            "contentType": 'text/plain',
+            "published": '2024-11-01T10:00:00+00:00',
+            "id": 'http://github.com/gjohnson/idcomment',
+            "post": 'http://github.com/gjohnson/missing',
+        }
+        response = self.client.post(self.url, [self.post_object(1), invalid_post, comment_no_post, "not an activity"], format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,200)
+        items = json.loads(response.content)['items']
+        self.assertEqual([item['status_code'] for item in items],[200,400,404,400])
+        self.assertIsNotNone(items[1].get('error'))
+        self.assertEqual(list(Post.objects.values_list('url_id',flat=True)),['http://github.com/gjohnson/posts/1'])
+
+    def test_batch_requires_authentication(self):
+        response = self.client.post(self.url, [self.post_object(1)], format='json')
+
+        self.assertEqual(response.status_code,401)
+        self.assertFalse(Post.objects.exists())
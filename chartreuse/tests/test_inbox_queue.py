@@ -0,0 +1,186 @@
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import User, Node, Post, Like, InboxActivity
+from ..inbox_queue import activity_object_key, claim_pending_activities, process_pending_activities
+import base64
+import json
+from urllib.parse import quote
+
+@override_settings(INBOX_ASYNC=True)
+class InboxQueueTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://testserver/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        Node.objects.create(host='http://testserver/',username='abc',password='123',follow_status='INCOMING',status='ENABLED')
+        cls.creds = {'Authorization' : 'Basic ' + base64.b64encode(b'abc:123').decode('utf-8')}
+        cls.url = reverse('chartreuse:inbox',args=[quote(cls.recipient.url_id,safe='')])
+        cls.remote_author = {
+            "type": "author",
+            "id": 'http://github.com/gjohnson',
+            "page": 'fillerdata',
+            "host": 'http://github.com/gjohnson/host',
+            "displayName": 'ETHANAUTHOR',
+            "github": '',
+            "profileImage": 'https://profile.png'
+        }
+        cls.post_object = {
+            "type": "post",
+            "title": 'ETHAN TITLE',
+            "id": 'http://github.com/gjohnson/id',
+            "description": 'ETHAN DESCRIPTION',
+            "contentType": 'text/plain',
+            "content": 'This is ethans test post',
+            "author": cls.remote_author,
+            "comments": {"type": "comments", "src": []},
+            "likes": {"type": "likes", "src": []},
+            "published": '2024-11-01T10:00:00+00:00',
+            "visibility": 'PUBLIC',
+        }
+        cls.like_object = {
+            "type": "like",
+            "author": cls.remote_author,
+            "published": '2024-11-01T11:00:00+00:00',
+            "id": 'http://github.com/gjohnson/likeid',
+            "object": 'http://github.com/gjohnson/id'
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_activity_is_queued_with_202(self):
+        response = self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,202)
+        self.assertEqual(json.loads(response.content).get('status'),'Activity queued')
+        self.assertFalse(Post.objects.filter(url_id='http://github.com/gjohnson/id').exists())
+
+        activity = InboxActivity.objects.get()
+        self.assertEqual(activity.status,'PENDING')
+        self.assertEqual(activity.activity_type,'post')
+        self.assertEqual(activity.object_key,'http://github.com/gjohnson/id')
+        self.assertEqual(activity.recipient,self.recipient)
+
+    def test_unauthorized_activity_is_not_queued(self):
+        response = self.client.post(self.url, self.post_object, format='json')
+
+        self.assertEqual(response.status_code,401)
+        self.assertFalse(InboxActivity.objects.exists())
+
+    def test_unknown_type_is_rejected(self):
+        response = self.client.post(self.url, {"type": "dislike"}, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,400)
+        self.assertFalse(InboxActivity.objects.exists())
+
+    def test_activities_are_applied_in_order(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        self.client.post(self.url, self.like_object, format='json', headers=self.creds)
+
+        self.assertEqual(process_pending_activities(),2)
+        self.assertEqual(process_pending_activities(),0)
+
+        post = Post.objects.get(url_id='http://github.com/gjohnson/id')
+        self.assertTrue(Like.objects.filter(post=post,user_id='http://github.com/gjohnson').exists())
+        self.assertFalse(InboxActivity.objects.exclude(status='DONE').exists())
+
+    def missing_post_comment(self):
+        return {
+            "type": "comment",
+            "author": self.remote_author,
+            "comment": 'NEW COMMENT HI',
+            "contentType": 'text/plain',
+            "published": '2024-11-01T10:00:00+00:00',
+            "id": 'http://github.com/gjohnson/idcomment',
+            "post": 'http://github.com/gjohnson/missing',
+        }
+
+    @override_settings(INBOX_MAX_ATTEMPTS=1)
+    def test_failed_activity_is_recorded(self):
+        self.client.post(self.url, self.missing_post_comment(), format='json', headers=self.creds)
+
+        process_pending_activities()
+
+        activity = InboxActivity.objects.get()
+        self.assertEqual(activity.status,'FAILED')
+        self.assertEqual(activity.status_code,404)
+        self.assertIsNotNone(activity.processed_at)
+
+    def test_missing_object_is_retried(self):
+        self.client.post(self.url, self.missing_post_comment(), format='json', headers=self.creds)
+
+        process_pending_activities()
+        activity = InboxActivity.objects.get()
+        self.assertEqual(activity.status,'PENDING')
+        self.assertEqual(activity.status_code,404)
+        self.assertEqual(activity.attempts,1)
+        self.assertGreater(activity.next_attempt_at,timezone.now())
+        # not due yet
+        self.assertEqual(process_pending_activities(),0)
+
+        # the post arrives, and the retried comment is applied once due
+        self.client.post(self.url, {**self.post_object, "id": 'http://github.com/gjohnson/missing'}, format='json', headers=self.creds)
+        self.assertEqual(process_pending_activities(),1)
+        InboxActivity.objects.filter(pk=activity.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(process_pending_activities(),1)
+        self.assertFalse(InboxActivity.objects.exclude(status='DONE').exists())
+
+    def test_update_waits_for_an_earlier_update_being_retried(self):
+        self.client.post(self.url, {**self.post_object, "title": 'FIRST'}, format='json', headers=self.creds)
+        self.client.post(self.url, {**self.post_object, "title": 'SECOND'}, format='json', headers=self.creds)
+        first, second = InboxActivity.objects.order_by('id')
+
+        with mock.patch('chartreuse.view.inbox.process_activity', side_effect=DatabaseError('locked')):
+            self.assertEqual(process_pending_activities(),1)
+        self.assertEqual(InboxActivity.objects.get(pk=first.pk).status,'PENDING')
+        # the later update was given back without counting as an attempt
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.attempts),('PENDING', 0))
+
+        # it is not applied while the earlier update waits for its retry
+        self.assertEqual(process_pending_activities(),0)
+
+        InboxActivity.objects.filter(pk=first.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(process_pending_activities(),2)
+        self.assertEqual(Post.objects.get(url_id='http://github.com/gjohnson/id').title,'SECOND')
+
+    def test_update_waits_for_an_earlier_update_claimed_elsewhere(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+        self.client.post(self.url, {**self.post_object, "title": 'SECOND'}, format='json', headers=self.creds)
+        self.client.post(self.url, self.like_object, format='json', headers=self.creds)
+
+        self.assertEqual(len(claim_pending_activities(batch_size=1)),1)
+        # only the like is claimed, the second update waits for the first
+        self.assertEqual([activity.activity_type for activity in claim_pending_activities()],['like'])
+
+    def test_claimed_activities_are_not_claimed_twice(self):
+        self.client.post(self.url, self.post_object, format='json', headers=self.creds)
+
+        self.assertEqual(len(claim_pending_activities()),1)
+        # an overlapping pass finds nothing to apply
+        self.assertEqual(process_pending_activities(),0)
+        self.assertEqual(InboxActivity.objects.get().status,'RUNNING')
+
+        # the claim of a worker that died times out and the activity is claimed again
+        InboxActivity.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(process_pending_activities(),1)
+        activity = InboxActivity.objects.get()
+        self.assertEqual(activity.status,'DONE')
+        self.assertEqual(activity.attempts,2)
+
+    @override_settings(INBOX_ASYNC=False)
+    def test_command_drains_once_when_not_async(self):
+        out = StringIO()
+        call_command('process_inbox', stdout=out)
+        self.assertIn('Processed 0 inbox activities.', out.getvalue())
+
+    def test_object_key(self):
+        self.assertEqual(activity_object_key(self.post_object),'http://github.com/gjohnson/id')
+        self.assertEqual(activity_object_key(self.like_object),'http://github.com/gjohnson/id')
+        self.assertEqual(activity_object_key({"type": "follow", "object": {"id": 'http://testserver/a/1'}}),'http://testserver/a/1')
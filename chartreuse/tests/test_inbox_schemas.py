@@ -0,0 +1,81 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import User, Node, Post
+from ..inbox_schemas import validate_document
+import base64
+import json
+from urllib.parse import quote
+
+class InboxSchemaTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipient = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Greg Johnson', host='http://testserver/', profileImage='https://i.imgur.com/k7XVwpB.jpeg')
+        Node.objects.create(host='http://testserver/',username='abc',password='123',follow_status='INCOMING',status='ENABLED')
+        cls.creds = {'Authorization' : 'Basic ' + base64.b64encode(b'abc:123').decode('utf-8')}
+        cls.url = reverse('chartreuse:inbox',args=[quote(cls.recipient.url_id,safe='')])
+        cls.like_object = {
+            "type": "like",
+            "author": {
+                "type": "author",
+                "id": 'http://github.com/gjohnson/like',
+                "host": 'http://github.com/gjohnson/host',
+                "displayName": 'ETHANLIKE',
+                "github": '',
+                "profileImage": 'https://profile.png',
+            },
+            "published": '2024-11-01T10:00:00+00:00',
+            "id": 'http://github.com/gjohnson/likeid',
+            "object": 'http://github.com/gjohnson/id'
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_valid_like(self):
+        self.assertEqual(validate_document(self.like_object),[])
+
+    def test_structured_errors(self):
+        like_object = dict(self.like_object, author={"type": "author"})
+        del like_object['published']
+
+        errors = validate_document(like_object)
+
+        self.assertIn({'path': '', 'message': "'published' is a required property"},errors)
+        self.assertIn({'path': 'author', 'message': "'id' is a required property"},errors)
+
+    def test_invalid_activity_is_rejected_without_writes(self):
+        post_object = {
+            "type": "post",
+            "title": 'ETHAN TITLE',
+            "id": 'http://github.com/gjohnson/id',
+            "description": 'ETHAN DESCRIPTION',
+            "contentType": 'text/plain',
+            "content": 'This is ethans test post',
+            "author": self.like_object['author'],
+            "published": '2024-11-01T10:00:00+00:00',
+            "visibility": 'SECRET',
+        }
+        users_before = User.objects.count()
+
+        with self.assertNumQueries(2):
+            # only the recipient lookup and the node credential check
+            response = self.client.post(self.url, post_object, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,400)
+        data = json.loads(response.content)
+        self.assertEqual(data['error'],'Invalid JSON Format')
+        self.assertEqual(data['details'][0]['path'],'visibility')
+        self.assertEqual(User.objects.count(),users_before)
+        self.assertFalse(Post.objects.exists())
+
+    def test_unknown_type(self):
+        response = self.client.post(self.url, {"type": "dislike"}, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,400)
+
+    @override_settings(INBOX_MAX_PAYLOAD_BYTES=100)
+    def test_oversized_payload(self):
+        response = self.client.post(self.url, self.like_object, format='json', headers=self.creds)
+
+        self.assertEqual(response.status_code,413)
@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase, TestCase
+from ..like_coalescer import LikeCoalescer
+from ..models import User, Post, Like
+import threading
+
+class RecordingCoalescer(LikeCoalescer):
+    def __init__(self, debounce):
+        super().__init__(send=None, debounce=debounce)
+        self.flushed = []
+        self.flushed_event = threading.Event()
+
+    def _flush(self, key):
+        self.flushed.append(key)
+        self.flushed_event.set()
+
+class LikeDebounceTestCases(SimpleTestCase):
+    def test_rapid_toggles_are_coalesced(self):
+        coalescer = RecordingCoalescer(debounce=0.05)
+        for _ in range(5):
+            coalescer.toggled('http://a.com/api/authors/1', post_id=1)
+
+        self.assertTrue(coalescer.flushed_event.wait(5))
+        # give any stale timers the chance to fire before checking they were cancelled
+        threading.Event().wait(0.1)
+        self.assertEqual(coalescer.flushed,[('http://a.com/api/authors/1', 1, None)])
+        self.assertEqual(coalescer.pending(),0)
+
+    def test_objects_are_debounced_separately(self):
+        coalescer = RecordingCoalescer(debounce=0.05)
+        coalescer.toggled('http://a.com/api/authors/1', post_id=1)
+        coalescer.toggled('http://a.com/api/authors/1', comment_id=1)
+
+        for _ in range(100):
+            if len(coalescer.flushed) == 2:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(sorted(coalescer.flushed, key=str),[('http://a.com/api/authors/1', 1, None), ('http://a.com/api/authors/1', None, 1)])
+
+class LikeDeliveryTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/', profileImage='https://profile.png')
+        cls.post = Post.objects.create(title='Post', description='Post', content='Post', user=cls.author)
+
+    def setUp(self):
+        self.sent = []
+        self.coalescer = LikeCoalescer(send=self.sent.append, debounce=0)
+
+    def test_final_like_is_delivered(self):
+        like = Like.objects.create(user=self.author, post=self.post)
+        self.coalescer.toggled(self.author.url_id, post_id=self.post.id)
+
+        self.assertEqual(len(self.sent),1)
+        self.assertEqual(self.sent[0].pk,like.pk)
+        self.assertEqual(self.sent[0].url_id,f'{self.author.url_id}/liked/{like.pk}')
+
+    def test_unlike_is_not_delivered(self):
+        self.coalescer.toggled(self.author.url_id, post_id=self.post.id)
+
+        self.assertEqual(self.sent,[])
@@ -0,0 +1,139 @@
+import base64
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from unittest import mock
+from urllib.parse import quote
+from ..models import Comment, Like, Node, Post, User
+from ..table_counts import table_counts
+
+def create_author(number):
+    return User.objects.create(url_id=f'http://testserver/chartreuse/api/authors/{number}', displayName=f'Author {number}', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+
+class LikePageTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_author(1)
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Post', content='Post', user=cls.author)
+        cls.comment = Comment.objects.create(url_id=f'{cls.author.url_id}/commented/1', user=cls.author, post=cls.post, comment='Comment')
+        cls.likers = [create_author(number) for number in range(2, 14)]
+        for liker in cls.likers:
+            Like.objects.create(url_id=f'{liker.url_id}/liked/1', user=liker, post=cls.post)
+        for liker in cls.likers[:3]:
+            Like.objects.create(url_id=f'{liker.url_id}/liked/2', user=liker, comment=cls.comment)
+
+        cls.post_likes_url = reverse('chartreuse:post_likes', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe='')])
+        cls.comment_likes_url = reverse('chartreuse:comment_likes', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe=''), quote(cls.comment.url_id, safe='')])
+
+    def setUp(self):
+        table_counts.clear()
+
+    def test_post_likes_have_their_own_authors(self):
+        data = self.client.get(self.post_likes_url, {'size': 5}).json()
+
+        self.assertEqual(data['count'],12)
+        self.assertEqual(data['size'],5)
+        self.assertEqual([like['author']['id'] for like in data['src']],[liker.url_id for liker in self.likers[:5]])
+        self.assertTrue(all(like['object'] == self.post.url_id for like in data['src']))
+        self.assertIsNotNone(data['next'])
+
+    def test_page_queries_do_not_grow_with_likes(self):
+        # author, post, the page with the authors of its likes, and the count
+        with self.assertNumQueries(4):
+            response = self.client.get(self.post_likes_url, {'size': 100})
+
+        self.assertEqual(len(response.json()['src']),12)
+        self.assertIsNone(response.json()['next'])
+
+    def test_cursor_walk_matches_pages(self):
+        first = self.client.get(self.post_likes_url, {'size': 5}).json()
+        second = self.client.get(self.post_likes_url, {'size': 5, 'page': 2}).json()
+        after_first = self.client.get(self.post_likes_url, {'size': 5, 'cursor': first['next']}).json()
+
+        self.assertEqual(second['src'],after_first['src'])
+        self.assertEqual(self.client.get(self.post_likes_url, {'page': 100}).json()['src'],[])
+
+    def test_page_size_is_bounded(self):
+        with self.settings(LIKES_MAX_PAGE_SIZE=4):
+            data = self.client.get(self.post_likes_url, {'size': 1000}).json()
+        self.assertEqual(data['size'],4)
+        self.assertEqual(len(data['src']),4)
+
+    def test_invalid_page(self):
+        self.assertEqual(self.client.get(self.post_likes_url, {'size': 'all'}).status_code,400)
+        self.assertEqual(self.client.get(self.post_likes_url, {'page': 0}).status_code,400)
+        self.assertEqual(self.client.get(self.post_likes_url, {'cursor': 'not-a-cursor'}).status_code,400)
+
+    def test_comment_likes(self):
+        data = self.client.get(self.comment_likes_url).json()
+
+        self.assertEqual(data['count'],3)
+        self.assertEqual(data['id'],f'{self.comment.url_id}/likes/')
+        self.assertEqual([like['author']['id'] for like in data['src']],[liker.url_id for liker in self.likers[:3]])
+        self.assertTrue(all(like['object'] == self.comment.url_id for like in data['src']))
+
+    def test_user_likes(self):
+        liker = self.likers[0]
+        url = reverse('chartreuse:get_liked', args=[quote(liker.url_id, safe='')])
+        # user, the page with the liked posts and comments, and the count
+        with self.assertNumQueries(3):
+            data = self.client.get(url).json()
+
+        self.assertEqual(data['count'],2)
+        self.assertEqual([like['object'] for like in data['src']],[self.post.url_id, self.comment.url_id])
+        self.assertTrue(all(like['author']['id'] == liker.url_id for like in data['src']))
+
+class LikeCountsTestCases(TestCase):
+    '''
+    Counts are only cached outside of a transaction, so these tests treat the per-test transaction of TestCase as if
+    there were none.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_author(1)
+        cls.liker = create_author(2)
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Post', content='Post', user=cls.author)
+        Like.objects.create(url_id=f'{cls.author.url_id}/liked/1', user=cls.author, post=cls.post)
+        cls.url = reverse('chartreuse:post_likes', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe='')])
+
+    def setUp(self):
+        table_counts.clear()
+        self.addCleanup(table_counts.clear)
+        patcher = mock.patch.object(table_counts, 'in_transaction', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_count_is_cached_until_a_like_is_added(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).json()['count'],1)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        Like.objects.create(url_id=f'{self.liker.url_id}/liked/1', user=self.liker, post=self.post)
+        self.assertEqual(self.client.get(self.url).json()['count'],2)
+
+    def test_likes_of_a_delivered_post_invalidate_counts(self):
+        Node.objects.create(host='http://testserver/',username='abc',password='123',follow_status='INCOMING',status='ENABLED')
+        # an author already known from an earlier delivery, so its liked count can be cached beforehand
+        liker = User.objects.create(url_id='http://liker.example.com/api/authors/5', displayName='Liker', host='http://liker.example.com/api/', profileImage='https://profile.png')
+        liked_url = reverse('chartreuse:get_liked', args=[quote(liker.url_id, safe='')])
+        authors_url = reverse('chartreuse:user-list')
+        self.assertEqual(self.client.get(liked_url).json()['count'],0)
+        authors = self.client.get(authors_url).json()['count']
+
+        remote = {"type": "author", "id": 'http://remote.example.com/api/authors/9', "page": 'page', "host": 'http://remote.example.com/api/', "displayName": 'Remote', "github": '', "profileImage": 'https://profile.png'}
+        liker_doc = {"type": "author", "id": liker.url_id, "page": 'page', "host": liker.host, "displayName": liker.displayName, "github": '', "profileImage": 'https://profile.png'}
+        post = {
+            "type": "post", "title": 'Post', "id": 'http://remote.example.com/api/authors/9/posts/1', "description": 'Post', "contentType": 'text/plain',
+            "content": 'Post', "author": remote, "published": '2024-11-01T10:00:00+00:00', "visibility": 'PUBLIC',
+            "comments": {"type": "comments", "src": []},
+            "likes": {"type": "likes", "src": [{"type": "like", "author": liker_doc, "published": '2024-11-01T11:00:00+00:00', "id": f'{liker.url_id}/liked/9', "object": 'http://remote.example.com/api/authors/9/posts/1'}]},
+        }
+        inbox_url = reverse('chartreuse:inbox', args=[quote(self.author.url_id, safe='')])
+        response = self.client.post(inbox_url, post, content_type='application/json', headers={'Authorization': 'Basic ' + base64.b64encode(b'abc:123').decode('utf-8')})
+        self.assertEqual(response.status_code,200,response.content)
+
+        # the likes and the author were inserted in bulk, without their post_save receivers
+        self.assertEqual(self.client.get(liked_url).json()['count'],1)
+        self.assertEqual(self.client.get(authors_url).json()['count'],authors + 1)
@@ -0,0 +1,48 @@
+import base64
+from django.test import RequestFactory, TestCase
+from unittest import mock
+from ..models import Node
+from ..node_auth import NodeCredentialVerifier
+
+def basic(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode('ascii')
+
+class NodeCredentialVerifierTestCases(TestCase):
+    '''
+    Verified headers are only cached outside of a transaction, so these tests treat the per-test transaction of
+    TestCase as if there were none.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        cls.node = Node.objects.create(host='http://node.example.com/', username='node', password='secret', follow_status='INCOMING', status='ENABLED')
+
+    def setUp(self):
+        self.verifier = NodeCredentialVerifier(ttl=60, max_entries=2)
+        patcher = mock.patch.object(self.verifier, 'in_transaction', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def verify(self, authorization):
+        return self.verifier.verify(self.factory.get('/'), authorization)
+
+    def test_verified_header_is_cached(self):
+        self.assertEqual(self.verify(basic('node', 'secret')),self.node.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.verify(basic('node', 'secret')),self.node.id)
+
+    def test_failed_checks_are_not_cached(self):
+        for attempt in range(5):
+            self.assertIsNone(self.verify(basic('node', f'wrong {attempt}')))
+        self.assertEqual(len(self.verifier._verified),0)
+
+    def test_cache_is_bounded(self):
+        Node.objects.create(host='http://other.example.com/', username='other', password='secret', follow_status='INCOMING', status='ENABLED')
+        Node.objects.create(host='http://third.example.com/', username='third', password='secret', follow_status='INCOMING', status='ENABLED')
+        for username in ('node', 'other', 'third'):
+            self.assertIsNotNone(self.verify(basic(username, 'secret')))
+
+        self.assertEqual(len(self.verifier._verified),2)
+        # the least recently used header was evicted and is checked again
+        with self.assertNumQueries(1):
+            self.assertEqual(self.verify(basic('node', 'secret')),self.node.id)
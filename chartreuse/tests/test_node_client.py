@@ -0,0 +1,101 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from ..models import Node
+from .. import node_client
+from ..node_client import CircuitOpenError
+import requests
+
+# nothing listens on port 1, so requests to it are refused right away
+DEAD_HOST = 'http://127.0.0.1:1/'
+
+@override_settings(NODE_CIRCUIT_FAILURE_THRESHOLD=2, NODE_CIRCUIT_COOLDOWN=60)
+class NodeClientTestCases(TestCase):
+    def setUp(self):
+        self.node = Node.objects.create(host=DEAD_HOST,username='out',password='secret',follow_status='OUTGOING',status='ENABLED')
+
+    def test_node_for_url(self):
+        self.assertEqual(node_client.node_for_url(DEAD_HOST + 'api/authors/1/inbox'),self.node)
+        self.assertIsNone(node_client.node_for_url('http://elsewhere.com/api/'))
+
+    def test_node_for_url_prefers_the_longest_host(self):
+        nested = Node.objects.create(host=DEAD_HOST + 'api/',username='out',password='secret',follow_status='OUTGOING',status='ENABLED')
+        Node.objects.create(host='http://127.0.0.1:1/api/authors/',username='off',password='secret',follow_status='OUTGOING',status='DISABLED')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(node_client.node_for_url(DEAD_HOST + 'api/authors/1/inbox'),nested)
+        # an underscore in a host is not a wildcard
+        Node.objects.create(host='http://a_b.com/',username='out',password='secret',follow_status='OUTGOING',status='ENABLED')
+        self.assertIsNone(node_client.node_for_url('http://axb.com/api/'))
+
+    def test_failures_open_the_circuit(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                node_client.get(DEAD_HOST + 'api/authors/')
+
+        node = Node.objects.get(pk=self.node.pk)
+        self.assertEqual(node.consecutive_failures,2)
+        self.assertEqual(node.circuit_state,'OPEN')
+        self.assertIsNotNone(node.circuit_opened_at)
+
+        # open circuits fail fast without contacting the node
+        with self.assertRaises(CircuitOpenError):
+            node_client.get(DEAD_HOST + 'api/authors/', node=node)
+        self.assertEqual(Node.objects.get(pk=self.node.pk).consecutive_failures,2)
+
+    @override_settings(NODE_CIRCUIT_COOLDOWN=0)
+    def test_failed_trial_request_reopens_the_circuit(self):
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='OPEN', consecutive_failures=2)
+        node = Node.objects.get(pk=self.node.pk)
+
+        with self.assertRaises(requests.exceptions.ConnectionError) as raised:
+            node_client.get(DEAD_HOST, node=node)
+        self.assertNotIsInstance(raised.exception,CircuitOpenError)
+
+        node = Node.objects.get(pk=self.node.pk)
+        self.assertEqual(node.circuit_state,'OPEN')
+        self.assertEqual(node.consecutive_failures,3)
+
+    def test_half_open_circuit_allows_a_single_trial(self):
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='OPEN', circuit_opened_at=None)
+        first = Node.objects.get(pk=self.node.pk)
+        second = Node.objects.get(pk=self.node.pk)
+
+        self.assertTrue(node_client.allow_request(first))
+        self.assertFalse(node_client.allow_request(second))
+        self.assertEqual(Node.objects.get(pk=self.node.pk).circuit_state,'HALF_OPEN')
+
+    def test_abandoned_trial_is_retried_after_the_cooldown(self):
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='HALF_OPEN', circuit_opened_at=timezone.now())
+        self.assertFalse(node_client.allow_request(self.node))
+
+        Node.objects.filter(pk=self.node.pk).update(circuit_opened_at=timezone.now() - timedelta(seconds=61))
+        self.assertTrue(node_client.allow_request(self.node))
+        self.assertFalse(node_client.allow_request(Node.objects.get(pk=self.node.pk)))
+
+    def test_stale_node_reads_the_stored_circuit(self):
+        stale = Node.objects.get(pk=self.node.pk)
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='OPEN', circuit_opened_at=timezone.now())
+
+        self.assertFalse(node_client.allow_request(stale))
+        self.assertEqual(stale.circuit_state,'OPEN')
+
+    def test_success_closes_the_circuit_and_tracks_latency(self):
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='HALF_OPEN', consecutive_failures=4)
+
+        node_client.record_success(self.node, 100)
+        node_client.record_success(self.node, 200)
+
+        node = Node.objects.get(pk=self.node.pk)
+        self.assertEqual(node.circuit_state,'CLOSED')
+        self.assertEqual(node.consecutive_failures,0)
+        self.assertAlmostEqual(node.latency_ewma_ms,120)
+
+    def test_reset_circuit(self):
+        Node.objects.filter(pk=self.node.pk).update(circuit_state='OPEN', consecutive_failures=7)
+
+        node_client.reset_circuit(self.node)
+
+        node = Node.objects.get(pk=self.node.pk)
+        self.assertEqual(node.circuit_state,'CLOSED')
+        self.assertEqual(node.consecutive_failures,0)
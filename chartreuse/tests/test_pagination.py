@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from unittest import mock
+from ..models import User
+from ..pagination import decode_cursor, encode_cursor
+from ..table_counts import table_counts
+
+class AuthorListPaginationTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(1, 13):
+            User.objects.create(url_id=f'http://testserver/chartreuse/api/authors/{number}', displayName=f'Author {number}', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.url = reverse('chartreuse:user-list')
+
+    def setUp(self):
+        table_counts.clear()
+
+    def walk(self, size):
+        ids = []
+        cursor = None
+        while True:
+            params = {'size': size, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).json()
+            ids += [author['id'] for author in data['authors']]
+            cursor = data['next']
+            if cursor is None:
+                return ids
+
+    def test_cursor_walk_is_stable_and_complete(self):
+        ids = self.walk(5)
+        self.assertEqual(len(ids),len(set(ids)))
+        self.assertEqual(set(ids),set(User.objects.values_list('url_id', flat=True)))
+
+        # authors are listed oldest first, in creation order
+        created = [f'http://testserver/chartreuse/api/authors/{number}' for number in range(1, 13)]
+        self.assertEqual([url_id for url_id in ids if url_id in created],created)
+
+    def test_page_numbers_still_work(self):
+        first = self.client.get(self.url, {'size': 5, 'page': 1}).json()
+        second = self.client.get(self.url, {'size': 5, 'page': 2}).json()
+        after_first = self.client.get(self.url, {'size': 5, 'cursor': first['next']}).json()
+
+        self.assertEqual(second['authors'],after_first['authors'])
+        self.assertEqual(self.client.get(self.url, {'page': 100}).json()['authors'],[])
+
+    def test_count(self):
+        self.assertEqual(self.client.get(self.url, {'size': 5}).json()['count'],User.objects.count())
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code,400)
+        self.assertEqual(self.client.get(self.url, {'cursor': encode_cursor(['yesterday', 'x'])}).status_code,400)
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor([1, 'http://testserver/a'])),[1, 'http://testserver/a'])
+        with self.assertRaises(ValueError):
+            decode_cursor('e30')
+
+class TableCountsTestCases(TestCase):
+    '''
+    Counts are only cached outside of a transaction, so these tests treat the per-test transaction of TestCase as if
+    there were none.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+
+    def setUp(self):
+        table_counts.clear()
+        self.addCleanup(table_counts.clear)
+        patcher = mock.patch.object(table_counts, 'in_transaction', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_author_count_is_cached(self):
+        url = reverse('chartreuse:user-list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url).json()
+
+        self.assertEqual(data['count'],User.objects.count())
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_new_author_invalidates_count(self):
+        before = table_counts.count("authors", User.objects.all())
+        User.objects.create(url_id='http://testserver/chartreuse/api/authors/2', displayName='New', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+
+        with self.assertNumQueries(1):
+            self.assertEqual(table_counts.count("authors", User.objects.all()),before + 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(table_counts.count("authors", User.objects.all()),before + 1)
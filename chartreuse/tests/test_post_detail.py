@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User as AuthUser
+from django.test import TestCase
+from django.urls import reverse
+from urllib.parse import quote
+from ..models import Comment, Follow, Like, Post, User
+from ..social_graph import social_graph
+from ..view import post_utils
+
+class PostDetailTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        cls.viewer_auth = AuthUser.objects.create_user(username='viewer', password='viewer-password')
+        cls.viewer = User.objects.create(user=cls.viewer_auth, url_id='http://testserver/chartreuse/api/authors/2', displayName='Viewer', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+        Follow.objects.create(follower=cls.viewer, followed=cls.author)
+
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Post', content='Post', contentType='text/plain', user=cls.author)
+        cls.friends_post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/2', title='Friends', description='Friends', content='Friends', contentType='text/plain', visibility='FRIENDS', user=cls.author)
+        Like.objects.create(url_id=f'{cls.viewer.url_id}/liked/1', user=cls.viewer, post=cls.post)
+
+        cls.commenters = [
+            User.objects.create(url_id=f'http://testserver/chartreuse/api/authors/{number}', displayName=f'Commenter {number}', host='http://testserver/chartreuse/api/', profileImage='https://profile.png')
+            for number in range(3, 6)
+        ]
+        for number in range(1, 7):
+            commenter = cls.commenters[number % 3]
+            comment = Comment.objects.create(url_id=f'{commenter.url_id}/commented/{number}', user=commenter, post=cls.post, comment=f'Comment {number}')
+            for liker in cls.commenters[:number % 3]:
+                Like.objects.create(url_id=f'{liker.url_id}/liked/{number}', user=liker, comment=comment)
+
+    def setUp(self):
+        social_graph.clear()
+        self.client.force_login(self.viewer_auth)
+
+    def url(self, post):
+        return reverse('chartreuse:view-post', args=[quote(post.url_id, safe='')])
+
+    def test_queries_do_not_grow_with_comments(self):
+        # session, auth user, the post with its author and like count, the viewer, the viewer's follows, friends and
+        # requests, and the comments with their authors and like counts
+        with self.assertNumQueries(8):
+            response = self.client.get(self.url(self.post))
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.context['post'].likes_count,1)
+        self.assertEqual(response.context['post'].following_status,"Following")
+        self.assertEqual(len(response.context['comments']),6)
+
+    def test_comments_newest_first_with_like_counts(self):
+        comments = self.client.get(self.url(self.post)).context['comments']
+
+        self.assertEqual([comment.comment for comment in comments],[f'Comment {number}' for number in range(6, 0, -1)])
+        self.assertEqual([comment.likes_count for comment in comments],[number % 3 for number in range(6, 0, -1)])
+
+    def test_first_page_of_comments(self):
+        with self.settings(POST_COMMENTS_PAGE_SIZE=4):
+            response = self.client.get(self.url(self.post))
+
+        self.assertEqual(len(response.context['comments']),4)
+        self.assertIsNotNone(response.context['comments_next'])
+
+    def test_friends_post_redirects_non_friends(self):
+        response = self.client.get(self.url(self.friends_post))
+        self.assertRedirects(response, '/chartreuse/homepage', fetch_redirect_response=False)
+
+        self.client.logout()
+        response = self.client.get(self.url(self.friends_post))
+        self.assertRedirects(response, '/chartreuse/homepage', fetch_redirect_response=False)
+
+    def test_public_post_for_anonymous_viewer(self):
+        self.client.logout()
+        response = self.client.get(self.url(self.post))
+
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.context['post'].following_status,"Sign up to follow!")
+
+    def test_missing_post(self):
+        response = self.client.get(reverse('chartreuse:view-post', args=[quote('http://testserver/chartreuse/api/authors/1/posts/404', safe='')]))
+        self.assertEqual(response.status_code,404)
+
+    def comment_page_url(self, post):
+        return reverse('chartreuse:comment_page', args=[quote(post.url_id, safe='')])
+
+    def test_load_more_walks_every_comment(self):
+        with self.settings(POST_COMMENTS_PAGE_SIZE=4):
+            response = self.client.get(self.url(self.post))
+            shown = [comment.comment for comment in response.context['comments']]
+            cursor = response.context['comments_next']
+
+            # session, auth user, the post, the viewer, the viewer's follows, friends and requests, and the comments
+            with self.assertNumQueries(8):
+                data = self.client.get(self.comment_page_url(self.post), {'cursor': cursor}).json()
+
+        self.assertIsNone(data['next'])
+        # the rest of the comments, in the order their cards appear
+        cards = {data['html'].find(f'>Comment {number}</p>'): f'Comment {number}' for number in range(1, 7)}
+        shown += [comment for position, comment in sorted(cards.items()) if position != -1]
+        self.assertEqual(shown,[f'Comment {number}' for number in range(6, 0, -1)])
+        self.assertIn('2 likes', data['html'])
+
+    def test_load_more_invalid_cursor(self):
+        response = self.client.get(self.comment_page_url(self.post), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code,400)
+
+    def test_load_more_hides_friends_posts(self):
+        response = self.client.get(self.comment_page_url(self.friends_post))
+        self.assertEqual(response.status_code,403)
+
+class ProfileImageTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='https://node.herokuapp.com/chartreuse/api/authors/1', displayName='Author', host='https://node.herokuapp.com/chartreuse/api/', profileImage='https://profile.png')
+        Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Image', description='Image', content='aW1hZ2U=', contentType='image/png;base64', user=cls.author)
+
+    def test_image_post_is_resolved(self):
+        pfp_url = f'{self.author.url_id}/posts/1/image'
+        with self.assertNumQueries(1):
+            self.assertEqual(post_utils.get_image_post(pfp_url),'data:image/png;base64;charset=utf-8;base64, aW1hZ2U=')
+
+        missing = f'{self.author.url_id}/posts/2/image'
+        images = post_utils.get_images_post([pfp_url, missing, 'https://profile.png'])
+        self.assertEqual(images[pfp_url],post_utils.get_image_post(pfp_url))
+        self.assertTrue(images[missing].endswith('/static/images/default_pfp_1.png'))
+        self.assertEqual(images['https://profile.png'],'https://profile.png')
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from urllib.parse import quote
+from ..models import Comment, Like, Post, User
+
+class SparseFieldsTestCases(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(url_id='http://testserver/chartreuse/api/authors/1', displayName='Author', host='http://testserver/chartreuse/api/', github='https://github.com/author', profileImage='https://profile.png')
+        cls.post = Post.objects.create(url_id=f'{cls.author.url_id}/posts/1', title='Post', description='Description', content='Content', user=cls.author)
+        Comment.objects.create(url_id=f'{cls.author.url_id}/commented/1', user=cls.author, post=cls.post, comment='Comment')
+        Like.objects.create(url_id=f'{cls.author.url_id}/liked/1', user=cls.author, post=cls.post)
+        cls.posts_url = reverse('chartreuse:posts', args=[quote(cls.author.url_id, safe='')])
+        cls.post_url = reverse('chartreuse:post', args=[quote(cls.author.url_id, safe=''), quote(cls.post.url_id, safe='')])
+        cls.author_url = reverse('chartreuse:user-detail', args=[quote(cls.author.url_id, safe='')])
+
+    def test_excluded_sections_are_not_returned(self):
+        response = self.client.get(self.posts_url, {'exclude': 'comments,likes,content'})
+        self.assertEqual(response.status_code,200)
+
+        post = response.json()['src'][0]
+        self.assertEqual(post['title'],'Post')
+        self.assertEqual(post['author']['displayName'],'Author')
+        for field in ('comments','likes','content'):
+            self.assertNotIn(field,post)
+
+    def test_excluded_sections_are_not_queried(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.posts_url, {'exclude': 'comments,likes,content'})
+
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('chartreuse_comment',sql)
+        self.assertNotIn('chartreuse_like',sql)
+        self.assertNotIn('"content"',sql)
+
+    def test_fields_keeps_type_and_id(self):
+        response = self.client.get(self.post_url, {'fields': 'title'})
+        self.assertEqual(response.status_code,200)
+        self.assertEqual(response.json(),{'type':'post','title':'Post','id':self.post.url_id})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(self.posts_url, {'fields': 'title,secret'})
+        self.assertEqual(response.status_code,400)
+
+    def test_full_document_by_default(self):
+        post = self.client.get(self.post_url).json()
+        self.assertEqual(post['comments']['count'],1)
+        self.assertEqual(post['likes']['count'],1)
+        self.assertEqual(post['content'],'Content')
+
+    def test_author_fields(self):
+        response = self.client.get(self.author_url, {'fields': 'github'})
+        self.assertEqual(response.json(),{'type':'author','id':self.author.url_id,'github':'https://github.com/author'})
+
+        authors = self.client.get(reverse('chartreuse:user-list'), {'fields': 'github'}).json()['authors']
+        self.assertIn({'type':'author','id':self.author.url_id,'github':'https://github.com/author'},authors)
+        self.assertTrue(all(set(author) == {'type','id','github'} for author in authors))
+
+    def test_author_fields_do_not_change_embedded_author(self):
+        # the post builds its author document in-process from the same request
+        post = self.client.get(self.post_url, {'fields': 'author'}).json()
+        self.assertEqual(post['author']['displayName'],'Author')
@@ -1,6 +1,8 @@
 from django.urls import path, re_path
 from .api_handling import users, likes, images, github, friends, posts, comments
-from .api_handling import followers, follow_requests
+from .api_handling import followers, follow_requests, changes
+from .api_handling.conditional import conditional, user_version, post_version, comment_version, like_version
+from .api_handling.sparse_fields import sparse, AUTHOR_FIELDS
 from django.conf import settings
 from django.conf.urls.static import static
 from chartreuse.views import  error, test
@@ -19,6 +21,7 @@ urlpatterns = [
     re_path(r"comment/$",comment_utils.add_comment,name="add_comment"),
     re_path(r"comment/(?P<comment_id>.+)/delete/$",comment_utils.delete_comment,name="delete_comment"),
     re_path(r"comment/like/$",comment_utils.like_comment,name="like_comment"),
+    re_path(r"comment/page/(?P<post_id>https?.+\w)/$",post_view.load_more_comments,name="comment_page"),
 
     # Inbox URL
     path("api/authors/<str:user_id>/inbox", inbox.inbox, name="inbox"),
@@ -28,22 +31,25 @@ urlpatterns = [
     re_path(r"api/authors/(?P<user_id>.+\w)/posts/(?P<post_id>.+\w)/comments/(?P<comment_id>.+\w)/likes/$", likes.LikeViewSet.as_view({'get': 'get_comment_likes'}), name="comment_likes"),
     # re_path(r"api/authors/(?P<user_id>.+\w)/posts/(?P<post_id>.+\w)/likes/$", likes.LikeViewSet.get_post_likes, name="post_likes"),
     re_path(r"api/authors/(?P<user_id>.+\w)/posts/(?P<post_id>.+\w)/likes/$", likes.LikeViewSet.as_view({'get': 'get_post_likes'}), name="post_likes"),
-    re_path(r"api/authors/(?P<user_id>https?.+\w)/liked/(?P<like_id>https?.+\w)/$", likes.LikeViewSet.get_like, name="get_like_object"),
+    re_path(r"api/authors/(?P<user_id>https?.+\w)/liked/(?P<like_id>https?.+\w)/$", conditional(like_version)(likes.LikeViewSet.get_like), name="get_like_object"),
     re_path(r"api/authors/(?P<user_id>.*\w)/liked/$", likes.LikeViewSet.user_likes, name="get_liked"),
 
     # Comment URLs 
     re_path(r"api/authors/(?P<user_id>.+\w)/posts/(?P<post_id>.+\w)/comments/add/$", comments.CommentViewSet.as_view({'post': 'create_comment'}), name="create_comment"),
-    re_path(r"api/authors/(?P<user_id>https?.+\w)/posts/(?P<post_id>https?.+\w)/comment/(?P<comment_id>.+)/$", comments.CommentViewSet.get_comment, name="get_comment"),
+    re_path(r"api/authors/(?P<user_id>https?.+\w)/posts/(?P<post_id>https?.+\w)/comment/(?P<comment_id>.+)/$", conditional(comment_version)(comments.CommentViewSet.get_comment), name="get_comment"),
     re_path(r"api/comment/(?P<comment_id>.+)/remove/$", comments.CommentViewSet.as_view({"delete":"delete_comment"}), name="delete_comment"), 
-    re_path(r"api/comment/(?P<comment_id>.+)/$", comments.CommentViewSet.get_comment, name="get_comment_by_cid"), 
+    re_path(r"api/comment/(?P<comment_id>.+)/$", conditional(comment_version)(comments.CommentViewSet.get_comment), name="get_comment_by_cid"), 
     re_path(r"api/authors/(?P<user_id>.+\w)/posts/(?P<post_id>.+\w)/comments/$", comments.CommentViewSet.as_view({'get': 'get_comments'}), name="get_comments"),
     re_path(r"api/posts/(?P<post_id>.+\w)/comments/$", comments.CommentViewSet.as_view({'get': 'get_comments'}), name="get_comments_by_pid"),
     re_path(r"api/authors/(?P<user_id>.*\w)/commented/$", comments.CommentViewSet.as_view({'get': "get_authors_comments", 'post': "create_comment"}), name="get_authors_comments"),
-    re_path(r"api/authors/(?P<user_id>.+\w)/commented/(?P<comment_id>.+)/$", comments.CommentViewSet.get_comment, name="get_commented"),
-    re_path(r"api/commented/(?P<comment_id>.+)/$", comments.CommentViewSet.get_comment, name="get_commented_by_cid"), 
+    re_path(r"api/authors/(?P<user_id>.+\w)/commented/(?P<comment_id>.+)/$", conditional(comment_version)(comments.CommentViewSet.get_comment), name="get_commented"),
+    re_path(r"api/commented/(?P<comment_id>.+)/$", conditional(comment_version)(comments.CommentViewSet.get_comment), name="get_commented_by_cid"), 
+
+    # Change feed URL
+    re_path(r"api/authors/(?P<user_id>.+\w)/changes/$", changes.ChangeFeedViewSet.as_view({'get': 'get_changes'}), name="changes"),
 
     # Post URLs
-    re_path(r"api/authors/(?P<user_id>https?.+\w)/posts/(?P<post_id>https?.+\w)/$", posts.PostViewSet.as_view({"get": "get_post", "delete": "remove_post", "put": "update"}), name="post"),
+    re_path(r"api/authors/(?P<user_id>https?.+\w)/posts/(?P<post_id>https?.+\w)/$", conditional(post_version)(posts.PostViewSet.as_view({"get": "get_post", "delete": "remove_post", "put": "update"})), name="post"),
     re_path(r"api/authors/(?P<user_id>.+\w)/posts", posts.PostViewSet.as_view({"get": "get_posts", "post": "create_post"}), name="posts"),
     re_path(r"api/post-exists/$", post_utils.check_duplicate_post, name="check_duplicate_post"),
 
@@ -55,7 +61,8 @@ urlpatterns = [
     
     # Author URLs
     path("api/author/login/", users.UserViewSet.login_user, name="login_user"),
-    re_path(r"api/authors/(?P<pk>.*\w)/$", users.UserViewSet.as_view({'put': 'update', 'delete': 'destroy', 'get': 'retrieve'}), name="user-detail"),
+    path("api/authors/batch/", users.UserViewSet.as_view({'get': 'batch', 'post': 'batch'}), name="user-batch"),
+    re_path(r"api/authors/(?P<pk>.*\w)/$", conditional(user_version)(sparse(AUTHOR_FIELDS)(users.UserViewSet.as_view({'put': 'update', 'delete': 'destroy', 'get': 'retrieve'}))), name="user-detail"),
     path("api/authors/", users.UserViewSet.as_view({'post': 'create', 'get': 'list'}), name="user-list"),
     
     # Follow Request API URLs
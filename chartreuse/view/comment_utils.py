@@ -2,10 +2,15 @@ import json
 from urllib.parse import quote, unquote
 
 from chartreuse.models import Comment, Like, Post, User, Node, Follow
+from chartreuse.api_handling.likes import likes_count
+from chartreuse.pagination import keyset_page
+from django.conf import settings
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 import requests
-from .post_utils import send_like_to_inbox
+from chartreuse import node_client
+from chartreuse.delivery import Delivery, deliver
+from .post_utils import like_coalescer
 
 def add_comment(request):
     try:
@@ -36,20 +41,29 @@ def add_comment(request):
         return JsonResponse({'error': str(e)}, status=500)
     
 
-def get_comments(post_id):
+# Comments are shown newest first, with the id breaking ties between comments made in the same instant
+COMMENT_ORDERING = ('-dateCreated', '-id')
+
+def get_comments(post, cursor=None, size=None):
     '''
-    Purpose: Get all comments for a post
+    Purpose: Get a page of the comments on a post, newest first, with their authors and like counts loaded in one query
 
     Arguments:
-        request: Request object
-        post_id: The id of the post object
+        post: The Post object, or the id of the post object
+        cursor: The next cursor of the previous page, None for the first page
+        size: The number of comments on the page, POST_COMMENTS_PAGE_SIZE by default
+
+    Returns:
+        (comments, next_cursor) tuple, next_cursor is None on the last page. Raises ValueError for an invalid cursor.
     '''
-    post_id = unquote(post_id)
-    post = Post.objects.filter(url_id=post_id).first()
+    if not isinstance(post, Post):
+        post = Post.objects.filter(url_id=unquote(post)).first()
+    if size is None:
+        size = getattr(settings, 'POST_COMMENTS_PAGE_SIZE', 20)
 
-    comments = Comment.objects.filter(post=post).order_by('-dateCreated')
+    comments = Comment.objects.filter(post=post).select_related('user').annotate(likes_count=likes_count('comment'))
 
-    return comments
+    return keyset_page(comments, COMMENT_ORDERING, size, cursor=cursor)
 
 def like_comment(request):
     """
@@ -75,12 +89,13 @@ def like_comment(request):
         like = Like.objects.filter(user=user, comment=comment).first()
 
         if like:
-            send_like_to_inbox(like.url_id)
             like.delete()
         else:
             like = Like.objects.create(user=user, comment=comment)
             like.save()
-            send_like_to_inbox(like.url_id)
+
+        # rapid toggles are coalesced so only the final state is delivered
+        like_coalescer.toggled(user.url_id, comment_id=comment.id)
 
         data = {
             "likes_count": get_comment_likes(unquote(comment_id)).count()
@@ -165,7 +180,7 @@ def send_comment_to_inbox(comment_url_id):
     base_url = f"{comment.user.host}authors/"
     comments_json_url = f"{base_url}{quote(comment.post.user.url_id, safe='')}/posts/{quote(comment.post.url_id, safe='')}/comment/{quote(comment.url_id, safe='')}/"
 
-    comments_response = requests.get(comments_json_url)
+    comments_response = node_client.get(comments_json_url)
     comments_json = comments_response.json()
 
     for node in node_objs:
@@ -173,8 +188,6 @@ def send_comment_to_inbox(comment_url_id):
 
             
             node_copy = Node.objects.get(host=node,follow_status='OUTGOING')
-            username = node_copy.username
-            password = node_copy.password
 
             url = node
             
@@ -187,10 +200,7 @@ def send_comment_to_inbox(comment_url_id):
                 "X-Original-Host": comment.user.host
             }
 
-        # send to inbox
-        try:
-            requests.post(url, headers=headers, json=comments_json, auth=(username, password))
-        except Exception as e:
-            return JsonResponse({'error': 'Failed to send comment to inbox.'})
+            # queue for the inbox, failed deliveries are retried later
+            deliver(Delivery(node_copy, url, comments_json, headers))
     
     return JsonResponse({'status': 'Comment sent to inbox successfully.'})
\ No newline at end of file
@@ -1,9 +1,11 @@
 from django.shortcuts import redirect, get_object_or_404
 from chartreuse.models import User,Node
+from chartreuse.author_resolver import author_resolver
 from django.views.generic.list import ListView
 from django.http import HttpResponseNotAllowed
 from urllib.parse import unquote, quote
 import requests
+from chartreuse import node_client
 import base64
 import json
 
@@ -95,7 +97,11 @@ class DiscoverAuthorListView(ListView):
             "X-Original-Host": user_object.host
         }
 
-        response = requests.get(url, params=params, auth=(username,password), headers=headers)       
+        try:
+            response = node_client.get(url, node=node, params=params, auth=(username,password), headers=headers)
+        except requests.exceptions.RequestException:
+            # node is down or its circuit is open
+            return []
         
         if response.status_code != 200:
             return []
@@ -118,32 +124,22 @@ class DiscoverAuthorListView(ListView):
         
         '''
 
-        author_list = []
-
+        author_docs = {}
         for author in authors:
-
             url_id = author.get('id')
-
             if url_id != None:
-                node_author_queryset = User.objects.filter(url_id=url_id)
-
-                if node_author_queryset.exists():
-                    remote_author = node_author_queryset[0]
-                    remote_author.url_id = quote(remote_author.url_id,safe='')
-                    author_list.append(remote_author)
-                else:
-                    # author has not be discovered by our node yet, so must be appended to user database.
-                    remote_author = User.objects.create(
-                        url_id = url_id,
-                        displayName = author.get('displayName',''),
-                        host = author.get('host'),
-                        github = author.get('github',''),
-                        profileImage = author.get('profileImage',''),
-                    )
-
-                    remote_author.url_id = quote(remote_author.url_id,safe='')
-
-                    author_list.append(remote_author)
+                author_docs.setdefault(url_id, author)
+
+        # authors that have not been discovered by our node yet are appended to the user database in one query
+        known_authors = author_resolver.resolve(author_docs, request=self.request, validate=False)
+
+        author_list = []
+        for url_id in author_docs:
+            remote_author = known_authors.get(url_id)
+            if remote_author is None:
+                continue
+            remote_author.url_id = quote(remote_author.url_id,safe='')
+            author_list.append(remote_author)
 
         return author_list
     
@@ -1,6 +1,6 @@
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.models import User as AuthUser
-from chartreuse.models import User,Follow
+from chartreuse.models import User,Follow,Friendship
 from django.views.generic.detail import DetailView
 from urllib.parse import unquote, quote
 from django.http import Http404, HttpResponse
@@ -118,18 +118,8 @@ class FollowListDetailView(DetailView):
         Arguments:
         user: The User Model object to find the followers for
         '''
-        user_follows = Follow.objects.filter(follower=user)
-        user_followed_by = Follow.objects.filter(followed=user)
-        friends = list()
-        for author in user_follows:
-            author = author.followed
-            for author2 in user_followed_by:
-                author2 = author2.follower
-                if author.url_id== author2.url_id:
-                    friends.append(author)
-                    break
-        
-        return friends
+        friendships = Friendship.objects.filter(user=user).select_related('friend')
+        return [friendship.friend for friendship in friendships]
         
 
 
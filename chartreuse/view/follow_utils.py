@@ -1,10 +1,14 @@
 import json
 from urllib.parse import unquote,quote
 
-from chartreuse.models import Follow, FollowRequest, Post, User, Node
+from chartreuse.models import Follow, FollowRequest, Friendship, Post, User, Node
+from chartreuse.social_graph import social_graph
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 import requests
+from chartreuse import node_client
 
 def get_followed(author_id):
     '''
@@ -23,7 +27,7 @@ def get_followed(author_id):
     author = get_object_or_404(User, url_id=decoded_author_id)
     
     # Get all followers for the author
-    followed = Follow.objects.filter(follower=author)
+    followed = Follow.objects.filter(follower=author).select_related('followed')
 
     followed_list = []
     
@@ -34,6 +38,90 @@ def get_followed(author_id):
 
     return followed_list
 
+def are_friends(user, other):
+    '''
+    Checks whether two users follow each other, answered from the social graph cache.
+
+    Parameters:
+        user: User object (or url_id) of the first user.
+        other: User object (or url_id) of the second user.
+
+    Returns:
+        True if the users are friends, False otherwise.
+    '''
+    return social_graph.are_friends(user, other)
+
+def is_following(user, other):
+    '''
+    Checks whether a user follows another user, answered from the social graph cache.
+
+    Parameters:
+        user: User object (or url_id) of the follower.
+        other: User object (or url_id) of the followed user.
+
+    Returns:
+        True if user follows other, False otherwise.
+    '''
+    return social_graph.is_following(user, other)
+
+def has_requested_follow(user, other):
+    '''
+    Checks whether a user has a pending follow request to another user, answered from the social graph cache.
+
+    Parameters:
+        user: User object (or url_id) of the requester.
+        other: User object (or url_id) of the requestee.
+
+    Returns:
+        True if the follow request is pending, False otherwise.
+    '''
+    return social_graph.has_requested(user, other)
+
+def get_friend_ids(user):
+    '''
+    Retrieves the url_ids of every friend of a user from the social graph cache.
+
+    Parameters:
+        user: User object (or url_id) whose friends are being retrieved.
+
+    Returns:
+        A set of friend url_ids.
+    '''
+    return social_graph.friends(user)
+
+def get_requested_ids(user):
+    '''
+    Retrieves the url_ids of every user a user has a pending follow request to from the social graph cache.
+
+    Parameters:
+        user: User object (or url_id) who sent the follow requests.
+
+    Returns:
+        A set of requestee url_ids.
+    '''
+    return social_graph.requested(user)
+
+def rebuild_friendships():
+    '''
+    Rebuilds the friendship table from the Follow table.
+
+    Returns:
+        The number of friendship rows written (two per friendship).
+    '''
+    mutual_follows = Follow.objects.filter(
+        Exists(Follow.objects.filter(follower=OuterRef('followed'), followed=OuterRef('follower')))
+    ).values_list('follower_id', 'followed_id')
+
+    with transaction.atomic():
+        Friendship.objects.all().delete()
+        friendships = Friendship.objects.bulk_create(
+            [Friendship(user_id=follower, friend_id=followed) for follower, followed in mutual_follows],
+            ignore_conflicts=True
+        )
+
+    social_graph.clear()
+    return len(friendships)
+
 def send_follow_request(request):
     """
     Sends a follow request to a user.
@@ -110,7 +198,7 @@ def send_follow_request(request):
 
                 url = f"{post_author.host}authors/{quote(author_username,safe='')}/inbox"
                 try:
-                    requests.post(url, headers=headers, json=data, auth=auth)
+                    node_client.post(url, node=node, headers=headers, json=data, auth=auth)
                     follow_request_status = "Sent Follow Request"
                     new_follow = Follow.objects.create(followed=post_author,follower=user)
                 except: 
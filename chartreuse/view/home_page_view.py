@@ -3,9 +3,10 @@ from chartreuse.models import User, Follow, Like, FollowRequest, Node
 from django.views.generic.detail import DetailView
 from urllib.parse import quote
 from chartreuse.view.post_utils import get_all_public_posts, get_posts, get_image_post,prepare_posts
-from chartreuse.view.follow_utils import get_followed
+from chartreuse.view.follow_utils import get_followed, get_friend_ids, get_requested_ids
 from django.core.paginator import Paginator
 import requests
+from chartreuse import node_client
 
 
 class FeedDetailView(DetailView):
@@ -46,9 +47,9 @@ class FeedDetailView(DetailView):
             public_posts = get_all_public_posts().exclude(user=current_user_model)
 
             following_url_ids = [user.url_id for user in following]
+            friend_url_ids = get_friend_ids(current_user_model)
 
-            follow_requests = FollowRequest.objects.filter(requester=current_user_model)
-            follow_request_url_ids = [follow_request.requestee.url_id for follow_request in follow_requests]
+            follow_request_url_ids = get_requested_ids(current_user_model)
 
             reposts = public_posts.filter(contentType='repost')
             needed_reposts = reposts.filter(user__url_id__in=following_url_ids)
@@ -83,7 +84,7 @@ class FeedDetailView(DetailView):
                     url = f"{follower.url_id}/followers/{quote(current_user_model.url_id,safe='')}"
 
                     try:
-                        response = requests.get(url,auth=auth)
+                        response = node_client.get(url,node=node,auth=auth)
                         if response.status_code == 404:
                             unconfirmed_follows.add(follower.url_id)
                             continue
@@ -98,10 +99,7 @@ class FeedDetailView(DetailView):
                 unlisted_posts = get_posts(follower.url_id, 'UNLISTED')
                 posts.extend(unlisted_posts)
 
-                is_following = Follow.objects.filter(follower=current_user_model, followed=follower.url_id).exists()
-                is_followed = Follow.objects.filter(follower=follower.url_id, followed=current_user_model).exists()
-
-                if (is_following and is_followed):
+                if follower.url_id in friend_url_ids:
                     friends_posts = get_posts(follower.url_id, 'FRIENDS')
                     posts.extend(friends_posts)
 
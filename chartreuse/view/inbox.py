@@ -1,15 +1,29 @@
 from urllib.parse import unquote
 from ..models import Like, User, Post, Comment, FollowRequest, Follow
 from ..views import Host, checkIfRequestAuthenticated
-import json
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from .. import fast_json
+from ..fast_json import FastJsonResponse
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework import serializers
 from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
-from django.core.exceptions import ValidationError
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.db import DatabaseError, transaction
+from django.conf import settings
+from ..inbox_queue import ACTIVITY_TYPES, enqueue_activity
+from ..activity_ledger import activity_key, activity_ledger
+from ..author_resolver import author_resolver
+from ..signals import like_count_keys
+from ..table_counts import table_counts
+from ..inbox_schemas import validate_document
+
+# Default largest inbox request body accepted, in bytes
+DEFAULT_MAX_PAYLOAD_BYTES = 2621440
+
+# Error message returned for each activity type that fails schema validation, kept the same as the per-field checks used
+SCHEMA_ERROR_MESSAGES = {'post': 'Invalid JSON Format', 'comment': 'Invalid JSON Format', 'like': 'Invalid JSON format', 'follow': 'Invalid JSON format'}
 
 def create_user_url_id(request, id):
     id = unquote(id)
@@ -33,7 +47,9 @@ def create_user_url_id(request, id):
         "\n\n**When to use:** Use this endpoint when sending new posts, comments, likes, or follow requests "
         "to a remote author's inbox for further processing."
         "\n\n**How to use:** Send a POST request with the remote author's `user_id` in the URL path and a valid JSON payload "
-        "specifying the `type` (e.g., 'post', 'comment', 'like', or 'follow') along with the required data."
+        "specifying the `type` (e.g., 'post', 'comment', 'like', or 'follow') along with the required data. "
+        "Several activities can be sent at once as a JSON array or a collection with `items`/`orderedItems`, they are applied in order "
+        "in one transaction and the response lists the status of each activity."
         "\n\n**Why to use:** This endpoint provides a centralized mechanism to handle interactions with a remote author's "
         "inbox, ensuring consistency in the database."
         "\n\n**Why not to use:** Avoid using this endpoint for retrieving data or if the required data format is unavailable."
@@ -64,6 +80,15 @@ def create_user_url_id(request, id):
             )
             
         ),
+        202: OpenApiResponse(
+            description="Activity queued for processing, only returned when INBOX_ASYNC is enabled.",
+            response=inline_serializer(
+                name="AcceptedResponse",
+                fields={
+                "status": serializers.CharField(default="Activity queued")
+            }
+            )
+        ),
         400: OpenApiResponse(
             description="Invalid request format.",
             response=inline_serializer(
@@ -73,6 +98,15 @@ def create_user_url_id(request, id):
                 }
             )
         ),
+        413: OpenApiResponse(
+            description="Request body is larger than INBOX_MAX_PAYLOAD_BYTES.",
+            response=inline_serializer(
+                name="PayloadTooLargeResponse",
+                fields={
+                    "error": serializers.CharField(default="Payload too large")
+                }
+            )
+        ),
         401: OpenApiResponse(
             description="Unauthorized request.",
             response=inline_serializer(
@@ -98,29 +132,164 @@ def create_user_url_id(request, id):
 @permission_classes([AllowAny])
 @authentication_classes([SessionAuthentication])
 def inbox(request, user_id):
-    
+
+    # reject oversized payloads before reading them
+    max_payload_bytes = getattr(settings, 'INBOX_MAX_PAYLOAD_BYTES', DEFAULT_MAX_PAYLOAD_BYTES)
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_payload_bytes:
+        return FastJsonResponse({'error':'Payload too large'},status=413)
+
     try:
-        data = json.loads(request.body.decode('utf-8'))
+        body = request.body
+    except RequestDataTooBig:
+        return FastJsonResponse({'error':'Payload too large'},status=413)
+    if len(body) > max_payload_bytes:
+        return FastJsonResponse({'error':'Payload too large'},status=413)
+
+    try:
+        data = fast_json.loads(body)
     except:
-        return JsonResponse({'error':'Invalid JSON Format'},status=400)
+        return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
 
     decoded_url_id = create_user_url_id(request, user_id)
     author = User.objects.filter(url_id=decoded_url_id).first()
     if author is None:
-        return JsonResponse({"error": f"Author,{user_id},not found"}, status=404)
+        return FastJsonResponse({"error": f"Author,{user_id},not found"}, status=404)
 
     # check request headers
     authorization = request.headers.get('Authorization')
     if authorization is None:
-        return JsonResponse({"error": "Unauthorized"}, status=401)
+        return FastJsonResponse({"error": "Unauthorized"}, status=401)
     
     authorization_response = checkIfRequestAuthenticated(request)
     if authorization_response.status_code != 200:
         return authorization_response
     
-    if data.get('type') is None:
-        return JsonResponse({'error':'Invalid JSON Format'},status=400)
+    # a json array or a collection of activities is applied as one batch
+    batch = get_batch_items(data)
+    if batch is not None:
+        return process_batch(author, batch, request)
 
+    if data.get('type') is None:
+        return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+
+    return handle_activity(author, data, request)
+
+def get_batch_items(data):
+    '''
+    Purpose: Get the activities of a batched inbox delivery.
+
+    Arguments:
+    data: the parsed json body of the inbox request
+
+    Returns:
+    the list of activities when data is a json array or a collection with items or orderedItems, otherwise None
+    '''
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and data.get('type') not in ACTIVITY_TYPES:
+        items = data.get('orderedItems', data.get('items'))
+        if isinstance(items, list):
+            return items
+    return None
+
+def handle_activity(author, data, request=None):
+    '''
+    Purpose: Skip, queue or apply a single inbox activity.
+
+    Arguments:
+    author: the User whose inbox received the activity
+    data: the parsed json activity, which must have a type field
+    request: the inbox request, shares its known authors between activities
+
+    Returns:
+    JsonResponse describing the outcome of the activity
+    '''
+    # malformed activities are rejected before any database access
+    errors = validate_document(data)
+    if errors:
+        return FastJsonResponse({'error':SCHEMA_ERROR_MESSAGES.get(data.get('type'),'Invalid JSON Format'),'details':errors},status=400)
+
+    # peers retry deliveries, skip activities that were already applied
+    ledger_key = activity_key(data)
+    if activity_ledger.seen(ledger_key):
+        return FastJsonResponse({"status": "Activity already processed"},status=200)
+
+    if getattr(settings, 'INBOX_ASYNC', False):
+        # only the shape is checked here, the worker applies the activity later (see inbox_queue.py)
+        enqueue_activity(author, data, ledger_key)
+        return FastJsonResponse({"status": "Activity queued"},status=202)
+
+    response = process_activity(data, request)
+    if response is None:
+        # process_activity only falls through for an activity it has no handler for
+        return FastJsonResponse({'error':'Activity could not be applied'},status=400)
+    if response.status_code < 400:
+        activity_ledger.record(ledger_key)
+    return response
+
+class ActivityRejected(Exception):
+    '''
+    Raised inside a batch item's savepoint to roll back whatever the rejected activity wrote.
+    '''
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+def process_batch(author, items, request=None):
+    '''
+    Purpose: Apply a batch of inbox activities in order inside a single transaction.
+
+    Every activity runs in its own savepoint, so a rejected activity is rolled back without affecting the others.
+
+    Arguments:
+    author: the User whose inbox received the batch
+    items: list of json activities
+    request: the inbox request
+
+    Returns:
+    JsonResponse with the status of every activity, in the order they were sent
+    '''
+    results = []
+    with transaction.atomic():
+        for item in items:
+            if not isinstance(item, dict) or item.get('type') is None:
+                response = FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+            else:
+                try:
+                    with transaction.atomic():
+                        response = handle_activity(author, item, request)
+                        if response is None:
+                            response = FastJsonResponse({'error':'Activity could not be applied'},status=400)
+                        if response.status_code >= 400:
+                            raise ActivityRejected(response)
+                except ActivityRejected as rejected:
+                    response = rejected.response
+                    author_resolver.forget_request(request)
+                except (DatabaseError, ValidationError, KeyError, TypeError, AttributeError):
+                    response = FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+                    author_resolver.forget_request(request)
+
+            result = {'id': item.get('id') if isinstance(item, dict) else None, 'status_code': response.status_code}
+            result.update(fast_json.loads(response.content))
+            results.append(result)
+
+    return FastJsonResponse({"type": "inbox", "items": results},status=200)
+
+def process_activity(data, request=None):
+    '''
+    Purpose: Apply a single inbox activity (post, comment, like or follow) to the database.
+
+    Arguments:
+    data: the parsed json activity, which must have a type field
+    request: the inbox request if there is one, used to cache the authors it resolves
+
+    Returns:
+    JsonResponse describing the outcome of the activity
+    '''
     if (data["type"] == "post"):
         try:
             title = data["title"]
@@ -134,7 +303,7 @@ def inbox(request, user_id):
             published = data["published"]
             visibility = data["visibility"]
         except KeyError:
-            return JsonResponse({'error':'Invalid JSON Format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
 
         # check whether we need to add this post or update it or delete it
         post = Post.objects.filter(url_id=post_id).first()
@@ -143,135 +312,93 @@ def inbox(request, user_id):
         try:
             author_id = unquote(author["id"])
         except KeyError:
-            return JsonResponse({'error':'Author missing ID field'},status=400)
-        author = discover_author(author_id,author)
-
-        if author is None:
-            return JsonResponse({'error':'Invalid JSON Format'},status=400)
+            return FastJsonResponse({'error':'Author missing ID field'},status=400)
 
         if post is None:
-            # create a new post
+            # validate the post and everything nested in it before touching the database
+            new_post = Post(title=title, url_id=post_id, description=description, contentType=contentType, content=content, published=published, visibility=visibility)
             try:
-                new_post = Post.objects.create(title=title, url_id=post_id, description=description, contentType=contentType, content=content, user=author, published=published, visibility=visibility)
-                new_post.published = published
-                new_post.save()
-                new_post.full_clean()
+                new_post.full_clean(exclude=['user'], validate_unique=False, validate_constraints=False)
             except ValidationError:
-                new_post.delete()
-                return JsonResponse({'error':'Invalid JSON Format'},status=400)
-            
+                return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
 
-            # add comment objects
-            post_comments = comments.get('src',[])
-            
-            for post_comment in post_comments:
-                try:
-                    comment_author = post_comment["author"]
-                    comment = post_comment["comment"]
-                    contentType = post_comment["contentType"]
-                    comment_id = post_comment["id"]
-                    post = post_comment["post"]
-                    published = post_comment["published"]
-                    likes = post_comment.get('likes',{})
-                except KeyError:
-                    continue
-                
-                try:
-                    comment_author_id = unquote(comment_author["id"])
-                except KeyError:
-                    continue
+            author_docs = {author_id: author}
+            post_comments = parse_comments(comments.get('src',[]), author_docs)
+            post_likes = parse_likes(data.get("likes",{}).get('src',[]), author_docs)
 
-                comment_author = discover_author(comment_author_id,post_comment['author'])
-                if comment_author is None:
-                    continue
+            authors = author_resolver.prepare(author_docs, request)
+            if authors.get(author_id) is None:
+                return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
 
-                try:
-                    new_comment = Comment.objects.create(user=comment_author, url_id=comment_id, comment=comment, contentType=contentType, post=new_post)
-                    new_comment.dateCreated = published
-                    new_comment.save()
-                    new_comment.full_clean()
-                except ValidationError:
-                    new_comment.delete()
-                    continue
+            with transaction.atomic():
+                author_resolver.save(authors, request)
+                new_post.user = authors[author_id]
+                # published is auto_now_add, so the remote timestamp has to be written after the insert
+                published = new_post.published
+                new_post.save()
+                new_post.published = published
+                new_post.save(update_fields=['published'])
 
-                
-                
-                # add comment likes
-                comment_likes = post_comment.get('likes',{})
-                comments_src = comment_likes.get('src',[])
-                for comment_like in comments_src:
-                    try:
-                        like_author = comment_like["author"]
-                        published = comment_like["published"]
-                        like_id = comment_like["id"]
-                        post = comment_like["object"]
-                    except KeyError:
+                new_comments = []
+                new_comment_likes = []
+                for new_comment, comment_author_id, comment_likes in post_comments:
+                    if authors.get(comment_author_id) is None:
                         continue
-                    
-                    try:
-                        like_author_id = unquote(like_author["id"])
-                    except KeyError:
+                    new_comment.user = authors[comment_author_id]
+                    new_comment.post = new_post
+                    new_comments.append(new_comment)
+                    new_comment_likes.append(comment_likes)
+
+                remote_timestamps = [(new_comment, new_comment.dateCreated) for new_comment in new_comments]
+                Comment.objects.bulk_create(new_comments)
+
+                new_likes = []
+                for new_comment, comment_likes in zip(new_comments, new_comment_likes):
+                    for new_like, like_author_id in comment_likes:
+                        if authors.get(like_author_id) is None:
+                            continue
+                        new_like.user = authors[like_author_id]
+                        new_like.comment = new_comment
+                        new_likes.append(new_like)
+
+                # an author can only like a post once
+                post_like_authors = set()
+                for new_like, like_author_id in post_likes:
+                    if authors.get(like_author_id) is None or like_author_id in post_like_authors:
                         continue
-                    like_author = discover_author(like_author_id,comment_like['author'])
+                    post_like_authors.add(like_author_id)
+                    new_like.user = authors[like_author_id]
+                    new_like.post = new_post
+                    new_likes.append(new_like)
 
-                    if like_author is None:
-                        continue
-                    
-                    try:
-                        new_like = Like.objects.create(user=like_author, url_id=like_id, comment=new_comment)
-                        new_like.dateCreated = published
-                        new_like.save()
-                        new_like.full_clean()
-                    except ValidationError:
-                        new_like.delete()
-                        continue
-                    
-                   
+                remote_timestamps += [(new_like, new_like.dateCreated) for new_like in new_likes]
+                Like.objects.bulk_create(new_likes)
 
-            # add like objects
-            
-            post_likes = data.get("likes",{})
-            for post_like in post_likes.get('src',[]):
-                try:
-                    author_id = post_like["author"]['id']
-                except KeyError:
-                    continue
+                # dateCreated is auto_now_add as well, so bulk_create stamped every row with the current time, restore the remote timestamps in bulk
+                for created_object, published in remote_timestamps:
+                    created_object.dateCreated = published
+                Comment.objects.bulk_update(new_comments, ['dateCreated'])
+                Like.objects.bulk_update(new_likes, ['dateCreated'])
 
-                # check to see whether the author has been discovered yet or not!
-                current_author = discover_author(author_id,post_like['author'])
-                if current_author is None:
-                    continue
-                try:
-                    published = post_like["published"]
-                    like_id = post_like["id"]
-                    post = post_like["object"]
-                except KeyError:
-                    continue
-                
-                try:
-                    new_like = Like.objects.create(user=current_author, url_id=like_id, post=new_post)
-                    new_like.dateCreated = published
-                    new_like.save()
-                    new_like.full_clean()
-                except ValidationError:
-                    new_like.delete()
-                    continue
-                    
+                # bulk_create skips the post_save receivers, so the cached like counts are dropped here
+                table_counts.invalidate(*{key for new_like in new_likes for key in like_count_keys(new_like)})
 
         else:
+            if discover_author(author_id,author,request) is None:
+                return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+
+            post.visibility = visibility
+            post.title = title
+            post.description = description
+            post.contentType = contentType
+            post.content = content
             try:
-                post.visibility = visibility
-                post.title = title
-                post.description = description
-                post.contentType = contentType
-                post.content = content
-                post.save()
-                post.full_clean()
+                post.full_clean(validate_unique=False, validate_constraints=False)
             except ValidationError:
-                post.delete()
-                JsonResponse({'error':'Invalid JSON Format'},status=400)
+                return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+            post.save()
                     
-        return JsonResponse({"status": "Post added successfully"},status=200)
+        return FastJsonResponse({"status": "Post added successfully"},status=200)
 
     elif (data["type"] == "comment"):
         try:
@@ -282,39 +409,45 @@ def inbox(request, user_id):
             post = data["post"]
             published = data["published"]
         except KeyError:
-            return JsonResponse({'error':'Invalid JSON Format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
         likes = data.get("likes",{})
         # add this new comment if it does not exist, if it exists, then delete it
 
         try:
             comment_author_id = unquote(comment_author["id"])
         except KeyError:
-            return JsonResponse({'error':'Invalid JSON Format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
         
-        comment_author = discover_author(comment_author_id,comment_author)
+        comment_author = discover_author(comment_author_id,comment_author,request)
         if comment_author is None:
-            return JsonResponse({'error':'Invalid JSON Format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
         
         new_post = Post.objects.filter(url_id=post).first()
 
         if new_post is None:
-            return JsonResponse({'error':'Post does not exist'},status=404)
+            return FastJsonResponse({'error':'Post does not exist'},status=404)
 
         # check whether comment already exists
         comment = Comment.objects.filter(comment=comment_text, user=comment_author, post=new_post).first()
 
         if comment is None:
+            comment = Comment(user=comment_author, comment=comment_text, url_id=comment_id, contentType=contentType, post=new_post, dateCreated=published)
             try:
-                comment = Comment.objects.create(user=comment_author, comment=comment_text, url_id=comment_id, contentType=contentType, post=new_post)
-                comment.dateCreated = published
-                comment.save()
-                comment.full_clean()
+                comment.full_clean(validate_unique=False, validate_constraints=False)
             except ValidationError:
-                comment.delete()
-                return JsonResponse({'error':'Invalid JSON Format'},status=400)
+                return FastJsonResponse({'error':'Invalid JSON Format'},status=400)
+            save_with_date_created(comment)
 
-        # add comment likes
+        # add comment likes, resolving all of their authors at once
         comment_likes = likes.get('src',[])
+        like_author_docs = {}
+        for comment_like in comment_likes:
+            try:
+                like_author_docs.setdefault(unquote(comment_like["author"]["id"]), comment_like["author"])
+            except (KeyError, TypeError):
+                continue
+        like_authors = author_resolver.resolve(like_author_docs, request)
+
         for comment_like in comment_likes:
             try:
                 like_author = comment_like["author"]
@@ -329,7 +462,7 @@ def inbox(request, user_id):
             except KeyError:
                 continue
 
-            like_author = discover_author(like_author_id,like_author)
+            like_author = like_authors.get(like_author_id)
 
             if like_author is None:
                 continue
@@ -339,16 +472,14 @@ def inbox(request, user_id):
             like = Like.objects.filter(user=like_author, url_id=like_id, comment=comment).first()
 
             if like is None:
+                new_like = Like(user=like_author, url_id=like_id, comment=comment, dateCreated=published)
                 try:
-                    new_like = Like.objects.create(user=like_author, url_id=like_id, comment=comment)
-                    new_like.dateCreated = published
-                    new_like.save()
-                    new_like.full_clean()
+                    new_like.full_clean(validate_unique=False, validate_constraints=False)
                 except ValidationError:
-                    new_like.delete()
                     continue
+                save_with_date_created(new_like)
 
-        return JsonResponse({"status": "Comment added successfully"})
+        return FastJsonResponse({"status": "Comment added successfully"})
         
     elif (data["type"] == "like"):
         try:
@@ -357,17 +488,17 @@ def inbox(request, user_id):
             like_id = data["id"]
             object_id = data["object"]
         except KeyError:
-            return JsonResponse({'error':"Invalid JSON format"},status=400)
+            return FastJsonResponse({'error':"Invalid JSON format"},status=400)
         # add the like if it does not exist, if it exists, delete the like
         try:
             author_id = unquote(author["id"])
         except KeyError:
-            return JsonResponse({'error':"Invalid JSON format"},status=400)
+            return FastJsonResponse({'error':"Invalid JSON format"},status=400)
         
-        author = discover_author(author_id,author)
+        author = discover_author(author_id,author,request)
 
         if author is None:
-            return JsonResponse({'error':"Invalid JSON format"},status=400)
+            return FastJsonResponse({'error':"Invalid JSON format"},status=400)
         
 
         post = Post.objects.filter(url_id=object_id).first()
@@ -381,110 +512,163 @@ def inbox(request, user_id):
         if object_type == "post":
             like = Like.objects.filter(user=author, post=post).first()
             if like is None:
+                new_like = Like(user=author, url_id=like_id, post=post, dateCreated=published)
                 try:
-                    new_like = Like.objects.create(user=author, url_id=like_id, post=post)
-                    new_like.dateCreated = published
-                    new_like.save()
-                    new_like.full_clean()
-                    return JsonResponse({"status": "Like added successfully"})
+                    new_like.full_clean(validate_unique=False, validate_constraints=False)
                 except ValidationError:
-                    new_like.delete()
-                    return JsonResponse({'error':'Invalid JSON format'},status=400)
+                    return FastJsonResponse({'error':'Invalid JSON format'},status=400)
+                save_with_date_created(new_like)
+                return FastJsonResponse({"status": "Like added successfully"})
+            # an author can only like an object once, a repeated like is not an error
+            return FastJsonResponse({"status": "Already liked"},status=200)
 
         else:
             comment = Comment.objects.filter(url_id=object_id).first()
             if comment is None:
-                return JsonResponse({"error":'Object to like does not exist'},status=404)
+                return FastJsonResponse({"error":'Object to like does not exist'},status=404)
             like = Like.objects.filter(user=author, comment=comment).first()
             if like is None:
+                new_like = Like(user=author, url_id=like_id, comment=comment, dateCreated=published)
                 try:
-                    new_like = Like.objects.create(user=author, url_id=like_id, comment=comment)
-                    new_like.dateCreated = published
-                    new_like.save()
-                    new_like.full_clean()
-                    return JsonResponse({"status": "Like added successfully"})
+                    new_like.full_clean(validate_unique=False, validate_constraints=False)
                 except ValidationError:
-                    new_like.delete()
-                    return JsonResponse({'error':'Invalid JSON format'},status=400)
-       
-            
+                    return FastJsonResponse({'error':'Invalid JSON format'},status=400)
+                save_with_date_created(new_like)
+                return FastJsonResponse({"status": "Like added successfully"})
+            # an author can only like an object once, a repeated like is not an error
+            return FastJsonResponse({"status": "Already liked"},status=200)
+
 
     elif (data["type"] == "follow"):
         try:
             actor = data["actor"]
             object_to_follow = data["object"]
         except KeyError:
-            return JsonResponse({'error':'Invalid JSON format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON format'},status=400)
 
         try:
-            author_queryset = User.objects.filter(url_id=unquote(actor['id'])).first()
+            actor_id = unquote(actor['id'])
         except:
-            return JsonResponse({'error':'Missing object id field'})
+            return FastJsonResponse({'error':'Missing object id field'})
 
-        if not author_queryset:
-            # discovered a new author to add to database...
-
-            # November 14, 2024: Asked Agent: CHAT GPT, why we may be getting null constraints failed when we have nullability allowed, chatgpt recommended setting the value explicitly to null or
-            # maybe migrations we not applied.
-            try:
-                remote_author = User.objects.create(
-                    user = None,
-                    url_id = unquote(actor['id']),
-                    displayName = actor.get('displayName',''),
-                    host = actor.get('host',''),
-                    github = actor.get('github',''),
-                    profileImage = actor.get('profileImage',''),
-                )
-                remote_author.full_clean()
-            except ValidationError:
-                remote_author.delete()
-                return JsonResponse({'error':'Invalid JSON format'},status=400)
-        else:
-            remote_author = author_queryset
+        # discovers the actor if it is a new author
+        remote_author = discover_author(actor_id,actor,request)
+        if remote_author is None:
+            return FastJsonResponse({'error':'Invalid JSON format'},status=400)
 
         # check if either a follow already exists or a follow request is already sent to them...
 
         try:
-            follower = User.objects.get(pk=unquote(actor["id"]))
+            follower = remote_author
             followed = User.objects.filter(pk=unquote(object_to_follow["id"])).first()
             if followed is None:
-                return JsonResponse({'error':'User to follow does not exist'},status=404)
+                return FastJsonResponse({'error':'User to follow does not exist'},status=404)
             
         except KeyError:
-            return JsonResponse({'error':'Invalid JSON format'},status=400)
+            return FastJsonResponse({'error':'Invalid JSON format'},status=400)
 
 
         follow_queryset = Follow.objects.filter(followed=followed,follower=follower)
         follow_request_queryset = FollowRequest.objects.filter(requester=remote_author,requestee=followed)
         if follow_queryset.exists() or follow_request_queryset.exists():
             # no need to send duplicate request.
-            return JsonResponse({"status": "Follow request sent successfully"},status=200)
+            return FastJsonResponse({"status": "Follow request sent successfully"},status=200)
 
         # add the follow request if it does not exist, if it exists, delete the follow request
         new_follow_request = FollowRequest.objects.create(requester=remote_author, requestee=followed)
         new_follow_request.save()
     
-        return JsonResponse({"status": "Follow request sent successfully"},status=200)
+        return FastJsonResponse({"status": "Follow request sent successfully"},status=200)
     
-def discover_author(url_id,json_obj):
-
-    author_queryset = User.objects.filter(url_id=url_id)
-    if not author_queryset.exists():
+def save_with_date_created(instance):
+    '''
+    Purpose: Insert a validated Comment or Like, keeping the remote dateCreated that auto_now_add would overwrite.
+
+    Arguments:
+    instance: the unsaved Comment or Like
+    '''
+    published = instance.dateCreated
+    instance.save()
+    instance.dateCreated = published
+    instance.save(update_fields=['dateCreated'])
+
+def parse_likes(like_docs, author_docs):
+    '''
+    Purpose: Build unsaved, validated Like objects from the src list of a likes object, skipping malformed likes.
+
+    Arguments:
+    like_docs: list of like json objects
+    author_docs: dict of author url_id to author json object, the author of every valid like is added to it
+
+    Returns:
+    list of (Like, author url_id) tuples
+    '''
+    likes = []
+    for like_doc in like_docs:
         try:
-            current_author = User.objects.create(
-                url_id = url_id,
-                displayName = json_obj.get('displayName'),
-                host = json_obj.get('host'),
-                github = json_obj.get('github'),
-                profileImage = json_obj.get('profileImage')
-            )
-            # CHATGPT (OpenAI) citation. on November 26, 2024, asked: "why is my validation not being checked, and does the create method check for validation",
-            # To which chat gpt said my test data urls in test_inpox.py were incorrect and that calling full_clean will validate the items.
-            current_author.full_clean()
+            like_author = like_doc["author"]
+            published = like_doc["published"]
+            like_id = like_doc["id"]
+            like_doc["object"]
+            like_author_id = unquote(like_author["id"])
+        except (KeyError, TypeError):
+            continue
+
+        new_like = Like(url_id=like_id, dateCreated=published)
+        try:
+            new_like.full_clean(exclude=['user', 'post', 'comment'], validate_unique=False, validate_constraints=False)
         except ValidationError:
-            current_author.delete()
-            return None
-    else:
-        current_author = author_queryset[0]
-    return current_author
+            continue
+
+        author_docs.setdefault(like_author_id, like_author)
+        likes.append((new_like, like_author_id))
+    return likes
+
+def parse_comments(comment_docs, author_docs):
+    '''
+    Purpose: Build unsaved, validated Comment objects and their likes from the src list of a comments object, skipping malformed comments.
 
+    Arguments:
+    comment_docs: list of comment json objects
+    author_docs: dict of author url_id to author json object, the author of every valid comment and like is added to it
+
+    Returns:
+    list of (Comment, author url_id, list of (Like, author url_id)) tuples
+    '''
+    comments = []
+    for comment_doc in comment_docs:
+        try:
+            comment_author = comment_doc["author"]
+            comment = comment_doc["comment"]
+            contentType = comment_doc["contentType"]
+            comment_id = comment_doc["id"]
+            comment_doc["post"]
+            published = comment_doc["published"]
+            comment_author_id = unquote(comment_author["id"])
+        except (KeyError, TypeError):
+            continue
+
+        new_comment = Comment(url_id=comment_id, comment=comment, contentType=contentType, dateCreated=published)
+        try:
+            new_comment.full_clean(exclude=['user', 'post'], validate_unique=False, validate_constraints=False)
+        except ValidationError:
+            continue
+
+        author_docs.setdefault(comment_author_id, comment_author)
+        comment_likes = parse_likes(comment_doc.get('likes',{}).get('src',[]), author_docs)
+        comments.append((new_comment, comment_author_id, comment_likes))
+    return comments
+
+def discover_author(url_id,json_obj,request=None):
+    '''
+    Purpose: Get the User of a remote author, adding it to the database if it has not been discovered yet.
+
+    Arguments:
+    url_id: the url_id (FQID) of the author
+    json_obj: the author json object
+    request: the current request, used to cache known authors
+
+    Returns:
+    the User, or None if the author json object is invalid
+    '''
+    return author_resolver.resolve_one(url_id, json_obj, request)
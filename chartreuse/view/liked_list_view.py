@@ -5,6 +5,7 @@ from django.views.generic.detail import DetailView
 from urllib.parse import unquote, quote
 from django.http import Http404, HttpResponse
 from django.core.exceptions import PermissionDenied
+from .follow_utils import are_friends
 
 class LikedListDetailView(DetailView):
     """
@@ -30,9 +31,7 @@ class LikedListDetailView(DetailView):
         current_auth_user = self.request.user
         current_user_model = get_object_or_404(User,user=current_auth_user)
         
-        is_following = Follow.objects.filter(follower=current_user_model, followed=post.user).exists()
-        is_followed = Follow.objects.filter(follower=post.user, followed=current_user_model).exists()
-        friends = (is_following and is_followed)
+        friends = are_friends(current_user_model, post.user)
         
         if (not friends and (post.visibility == "FRIENDS") and (post.user != current_user_model)):
             return redirect('/chartreuse/homepage')
@@ -14,7 +14,9 @@ from rest_framework import serializers
 from rest_framework.decorators import action, api_view
 import requests
 from requests.auth import HTTPBasicAuth
-from requests.exceptions import ChunkedEncodingError
+from chartreuse import node_client
+from chartreuse.delivery import Delivery, deliver
+from chartreuse.like_coalescer import LikeCoalescer
 from django.urls import reverse
 
 def get_post_likes(post_id):
@@ -103,8 +105,6 @@ def send_post_to_inbox(post_url_id):
     
     for node in nodes:
         host = node.host
-        username = node.username
-        password = node.password
 
         url = host
         
@@ -112,7 +112,7 @@ def send_post_to_inbox(post_url_id):
 
         base_url = f"{post.user.host}authors/"
         post_json_url = f"{base_url}{quote(post.user.url_id, safe='')}/posts/{quote(post.url_id, safe='')}/"
-        post_response = requests.get(post_json_url)
+        post_response = node_client.get(post_json_url)
         post_json = post_response.json()
         print(post_json,'ETHANS POST JSON FRIENDS')
 
@@ -129,15 +129,8 @@ def send_post_to_inbox(post_url_id):
                     "X-Original-Host": post.user.host
                 }
 
-                # send to inbox
-                try:
-                    requests.post(full_url, headers=headers, json=post_json, auth=(username, password))
-                    # Resource: https://stackoverflow.com/questions/16511337/correct-way-to-try-except-using-python-requests-module
-                    # Stack Overflow Post: 'correct way to try/except using Python requests module'
-                    # Purpose: Learned how to import the ChunckedEncodingError as defined...
-                    # Hint for importing requests.exceptions as seen by: Jonathon Reinhart's Answer on May 12, 2013
-                except ChunkedEncodingError: # some kind of chunked error that occurs if user is gone...
-                    continue
+                # queue for the inbox, the delivery scheduler sends it without holding up this request and retries it if it fails
+                deliver(Delivery(node, full_url, post_json, headers))
 
 @csrf_exempt
 def update_post(request, post_id):
@@ -420,13 +413,13 @@ def like_post(request):
         like = Like.objects.filter(user=user, post=post).first()
 
         if like:
-            send_like_to_inbox(like.url_id)
             like.delete()
         else:
             newLike = Like.objects.create(user=user, post=post)
             newLike.save()
 
-            send_like_to_inbox(newLike.url_id)
+        # rapid toggles are coalesced so only the final state is delivered
+        like_coalescer.toggled(user.url_id, post_id=post.id)
 
         data = {
             "likes_count": get_post_likes(unquote(post_id)).count()
@@ -435,8 +428,7 @@ def like_post(request):
     else:
         pass
 
-def send_like_to_inbox(like_url_id):
-    like = Like.objects.get(url_id=like_url_id)
+def send_like_to_inbox(like):
     # send this to the inbox of other nodes
     if like.comment is None or like.comment == '':
         obj_hostname = like.post.user.host
@@ -521,7 +513,7 @@ def send_like_to_inbox(like_url_id):
     base_url = f"{like.user.host}authors/"
     likes_json_url = f"{base_url}{quote(like.user.url_id, safe='')}/liked/{quote(like.url_id, safe='')}/"
 
-    likes_response = requests.get(likes_json_url)
+    likes_response = node_client.get(likes_json_url)
     likes_json = likes_response.json()
 
     for node in node_objs:
@@ -529,9 +521,6 @@ def send_like_to_inbox(like_url_id):
         
         node_copy = Node.objects.get(host=node,follow_status='OUTGOING')
         for to_send_id in node_objs[node]:
-        
-            username = node_copy.username
-            password = node_copy.password
 
             url = node
             
@@ -543,15 +532,14 @@ def send_like_to_inbox(like_url_id):
                 "Content-Type": "application/json; charset=utf-8",
                 "X-Original-Host": like.user.host
             }
-            
-        # send to inbox
-        try:
-            requests.post(url, headers=headers, json=likes_json, auth=(username, password))
-        except Exception as e:
-            return JsonResponse({'error': 'Failed to send comment to inbox.'})
+
+            # queue for the inbox, failed deliveries are retried later
+            deliver(Delivery(node_copy, url, likes_json, headers))
 
     return JsonResponse({"status": "Like added successfully"})
 
+like_coalescer = LikeCoalescer(send_like_to_inbox)
+
 def get_all_public_posts():
     '''
     Retrieves all public posts.
@@ -620,28 +608,57 @@ def check_duplicate_post(request):
         return JsonResponse({'error': 'Invalid request method.'}, status=400)
     
 def get_image_post(pfp_url):
-    print(pfp_url,'heyyy')
+    '''
+    Purpose: Resolve a profile image url, an url of an image post of this node is replaced by the image it holds.
+
+    Arguments:
+        pfp_url: the profile image url
+
+    Returns:
+        the image to show, the default profile picture when the image post is missing
+    '''
+    return get_images_post([pfp_url])[pfp_url]
+
+def get_images_post(pfp_urls):
+    '''
+    Purpose: Resolve many profile image urls, replacing the urls of image posts of this node by the images they hold and
+    loading every image post they point at in one query.
+
+    Arguments:
+        pfp_urls: iterable of profile image urls
+
+    Returns:
+        dict mapping each of the urls to the image to show
+    '''
     pattern = r"(?P<host>https?:\/\/.+?herokuapp\.com)(\/chartreuse\/api)?\/authors\/(?P<author_serial>\d+)\/posts\/(?P<post_serial>\d+)\/image"
-    match = re.search(pattern, pfp_url)
+    images = {}
+    wanted = {}
+    for pfp_url in set(pfp_urls):
+        match = re.search(pattern, pfp_url or '')
+        if match:
+            author_id = f"{match.group('host')}/chartreuse/api/authors/{match.group('author_serial')}"
+            wanted[pfp_url] = (author_id, f"{author_id}/posts/{match.group('post_serial')}")
+        else:
+            images[pfp_url] = pfp_url
 
-    if match:
-        host = match.group("host")
-        author_serial = match.group("author_serial")
-        post_serial = match.group("post_serial")
-        author = User.objects.filter(url_id=f"{host}/chartreuse/api/authors/{author_serial}").first()
-        pfp_post = Post.objects.filter(user=author, url_id=f"{host}/chartreuse/api/authors/{author_serial}/posts/{post_serial}").first()
+    if not wanted:
+        return images
 
-        if pfp_post and pfp_post.content and pfp_post.contentType in ['image/jpeg;base64', 'image/png;base64', 'image/webp', 'image/jpg;base64']:
+    pfp_posts = {
+        pfp_post.url_id: pfp_post
+        for pfp_post in Post.objects.filter(url_id__in=[post_id for _, post_id in wanted.values()]).only('url_id', 'user', 'content', 'contentType')
+    }
+    for pfp_url, (author_id, post_id) in wanted.items():
+        pfp_post = pfp_posts.get(post_id)
+        if pfp_post and pfp_post.user_id == author_id and pfp_post.content and pfp_post.contentType in ['image/jpeg;base64', 'image/png;base64', 'image/webp', 'image/jpg;base64']:
             if not pfp_post.content.startswith('data:'):
-                pfp_url = f"data:{pfp_post.contentType};charset=utf-8;base64, {pfp_post.content}"
+                images[pfp_url] = f"data:{pfp_post.contentType};charset=utf-8;base64, {pfp_post.content}"
             else:
-                pfp_url = pfp_post.content
+                images[pfp_url] = pfp_post.content
         else:
-            pfp_url = f"{Host.host}/static/images/default_pfp_1.png"
-        return pfp_url
-    else:
-        return pfp_url
-    
+            images[pfp_url] = f"{Host.host}/static/images/default_pfp_1.png"
+    return images
+
 def prepare_posts(posts):
     '''
     Purpose: to add the current like count to the post and percent encode their ids to allow for navigation to the post.
@@ -1,143 +1,206 @@
-from django.shortcuts import get_object_or_404
+from collections import namedtuple
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.views.generic.detail import DetailView
-from chartreuse.models import Post, Like, Follow, User, FollowRequest
+from chartreuse.models import Post, User
+from chartreuse.api_handling.likes import likes_count
+from chartreuse.social_graph import social_graph
 from urllib.parse import quote, unquote
-from django.shortcuts import redirect
+from django.shortcuts import get_object_or_404, redirect
 from . import comment_utils, post_utils
 
+PostDetail = namedtuple('PostDetail', ['post', 'visible', 'context'])
+
+def load_viewer(request):
+    '''
+    Purpose: Load the author viewing a page and their social graph entry, which answers the friend, following and
+    pending checks of the page
+
+    Arguments:
+        request: Request object
+
+    Returns:
+        (viewer, graph) tuple, both None for anonymous viewers
+    '''
+    if not request.user.is_authenticated:
+        return None, None
+    viewer = User.objects.filter(user=request.user).first()
+    if viewer is None:
+        return None, None
+    return viewer, social_graph.get(viewer)
+
+def can_view_post(post, viewer, graph):
+    '''
+    Purpose: Check whether a viewer may see a post, friends only posts are shown to the author and their friends
+
+    Arguments:
+        post: The Post object
+        viewer: The User object of the viewer, None for anonymous viewers
+        graph: The social graph entry of the viewer
+
+    Returns:
+        True if the post can be shown
+    '''
+    if post.visibility != 'FRIENDS':
+        return True
+    return viewer is not None and (post.user_id == viewer.pk or post.user_id in graph.friends)
+
+def prepare_comments(comments, viewer, images=None):
+    '''
+    Purpose: Prepare a page of comments for the comment cards, resolving the profile images of their authors,
+    marking the viewer's own comments and percent encoding their ids
+
+    Arguments:
+        comments: The Comment objects, with their users loaded
+        viewer: The User object of the viewer, None for anonymous viewers
+        images: Profile images already resolved by get_images_post, resolved here when not given
+    '''
+    if images is None:
+        images = post_utils.get_images_post([comment.user.profileImage for comment in comments])
+    for comment in comments:
+        comment.user.profileImage = images[comment.user.profileImage]
+        if viewer is not None and comment.user_id == viewer.pk:
+            comment.is_author = True
+        comment.url_id = quote(comment.url_id, safe='')
+
+def load_post_detail(request, post_id):
+    '''
+    Purpose: Load everything the post detail page shows in a fixed number of queries: the post with its author and
+    like count, the viewer and their relationship to the author, and the first page of comments with their authors
+    and like counts.
+
+    Arguments:
+        request: Request object
+        post_id: The id of the post object
+
+    Returns:
+        PostDetail with the requested post, whether the viewer may see it and the context of the page, or None when
+        the post does not exist
+    '''
+    posts = Post.objects.select_related('user').annotate(likes_count=likes_count('post'))
+    requested = posts.filter(url_id=post_id).first()
+    if requested is None:
+        return None
+
+    viewer, graph = load_viewer(request)
+    if not can_view_post(requested, viewer, graph):
+        return PostDetail(requested, False, {})
+
+    if requested.contentType == "repost":
+        post = posts.get(url_id=unquote(requested.content))
+        post.repost = True
+        post.repost_user = requested.user
+        post.repost_url = requested.url_id
+        post.repost_time = requested.published
+        post_owner = requested.user
+        repost = True
+    else:
+        post = requested
+        post_owner = post.user
+        repost = False
+
+    if viewer is None:
+        post.following_status = "Sign up to follow!"
+    elif post.user_id in graph.followees:
+        post.following_status = "Following"
+    elif post.user_id in graph.requested:
+        post.following_status = "Pending"
+    else:
+        post.following_status = "Follow"
+
+    context = {}
+    comments = []
+    if not repost:
+        comments, context['comments_next'] = comment_utils.get_comments(post)
+        context['comments'] = comments
+
+    # every profile image on the page is resolved together
+    owners = list({id(owner): owner for owner in (post.user, post_owner)}.values())
+    images = post_utils.get_images_post([owner.profileImage for owner in owners] + [comment.user.profileImage for comment in comments])
+    for owner in owners:
+        owner.profileImage = images[owner.profileImage]
+    prepare_comments(comments, viewer, images)
+
+    user_url_quoted = quote(post.user.url_id, safe='')
+    post.url_id = quote(post.url_id, safe='')
+
+    if (post.contentType != "text/plain") and (post.contentType != "text/markdown"):
+        if not post.content.startswith('data:'):
+            post.content = f"data:{post.contentType};charset=utf-8;base64, {post.content}"
+        post.has_image = True
+
+    context['post'] = post
+    context['logged_in'] = request.user.is_authenticated
+    if viewer is not None and post.user_id == viewer.pk:
+        context['is_author'] = True
+    if repost and viewer is not None and post_owner.pk == viewer.pk:
+        context['repost_author'] = True
+    context['user_details'] = viewer
+    context['user_url_quoted'] = user_url_quoted
+
+    return PostDetail(requested, True, context)
+
+def load_more_comments(request, post_id):
+    '''
+    Purpose: Serve the next page of comments of the post detail page, for its "Load more comments" button
+
+    Arguments:
+        request: Request object, with the next cursor of the page shown last as cursor
+        post_id: The id of the post object
+
+    Returns:
+        JsonResponse with the rendered comment cards under html and the cursor of the following page under next,
+        which is null once every comment is shown
+    '''
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed.'}, status=405)
+
+    post = get_object_or_404(Post.objects.select_related('user'), url_id=unquote(post_id))
+    viewer, graph = load_viewer(request)
+    if not can_view_post(post, viewer, graph):
+        return JsonResponse({'error': 'Post not visible.'}, status=403)
+
+    try:
+        comments, next_cursor = comment_utils.get_comments(post, cursor=request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    prepare_comments(comments, viewer)
+
+    post.url_id = quote(post.url_id, safe='')
+    html = render_to_string('layouts/comment_list.html', {'comments': comments, 'post': post, 'user_details': viewer}, request=request)
+
+    return JsonResponse({'html': html, 'next': next_cursor})
+
 class PostDetailView(DetailView):
     '''
     Purpose: Serves a detailed view of a single post that the user has access to.
 
-    Inherits From: DetailView 
+    Inherits From: DetailView
     '''
     model = Post
     template_name = "view_post.html"
     context_object_name = "post"
 
     def get(self, request, *args, **kwargs):
-      
-        
-        post_id = unquote(self.kwargs['post_id'])
-
-        post = get_object_or_404(Post,url_id=post_id)
+        self.detail = load_post_detail(request, unquote(self.kwargs['post_id']))
+        if self.detail is None:
+            raise Http404("No post matches the given query.")
 
-        if not self.request.user.is_authenticated and post.visibility == 'FRIENDS':
+        if not self.detail.visible:
             return redirect('/chartreuse/homepage')
-        
-        current_auth_user = self.request.user
-        current_user_model = User.objects.get(user=current_auth_user)
-        post_owner = post.user
-        is_following = Follow.objects.filter(follower=current_user_model, followed=post.user).exists()
 
-        is_followed = Follow.objects.filter(follower=post.user, followed=current_user_model).exists()
-        friends = (is_followed and is_following)
-        if (not friends and (post.visibility == "FRIENDS") and (post_owner != current_user_model)):
-            return redirect('/chartreuse/homepage')
-        
         return super().get(request, *args, **kwargs)
 
-
     def get_object(self):
         """
-        Retrieve the post object based on the URL parameter 'url_id'.
+        Retrieve the post object loaded by get, based on the URL parameter 'post_id'.
         """
-        url_id = self.kwargs.get('post_id')
-        url_id = unquote(url_id)
-        post = Post.objects.filter(url_id=url_id).first()
-        return post
+        return self.detail.post
 
     def get_context_data(self, **kwargs):
         '''
-        Builds the context data for rendering the post detail page.
+        Builds the context data for rendering the post detail page from the loaded post detail.
         '''
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-
-        if post.contentType == "repost":
-            post = self.prepare_repost(post)
-            post_owner = post.repost_user
-            repost = True
-        else:
-            post.likes_count = Like.objects.filter(post=post).count()
-            post_owner = post.user
-            repost = False
-        
-        current_user_model = None
-
-        if self.request.user.is_authenticated:
-            current_user = self.request.user
-            current_user_model = get_object_or_404(User, user=current_user)
-
-            is_following = Follow.objects.filter(follower=current_user_model, followed=post.user).exists()
-            requested_follow = FollowRequest.objects.filter(requester=current_user_model, requestee=post.user).exists()
-            if (is_following):
-                post.following_status = "Following"
-            elif (requested_follow):
-                post.following_status = "Pending"
-            else:
-                post.following_status = "Follow"
-
-            is_followed = Follow.objects.filter(follower=post.user, followed=current_user_model).exists()
-        
-            #if ((not is_followed) and (not is_following) and (post.visibility == "FRIENDS") and (post_owner != current_user_model)):
-                #return redirect('/chartreuse/homepage')
-            
-        else:
-            post.following_status = "Sign up to follow!"
-
-        post.url_id = quote(post.url_id, safe='')
-
-        
-        if (post.contentType != "text/plain") and (post.contentType != "text/markdown"):
-            if not post.content.startswith('data:'):
-                post.content = f"data:{post.contentType};charset=utf-8;base64, {post.content}"
-            post.has_image = True
-
-        post_owner.profileImage = post_utils.get_image_post(post_owner.profileImage)
-
-        # get post comments
-        if not repost:
-            comments = comment_utils.get_comments(post.url_id)
-            for comment in comments:
-                comment.user.profileImage = post_utils.get_image_post(comment.user.profileImage)
-                if ((self.request.user.is_authenticated) and (comment.user.url_id == current_user_model.url_id)):
-                    comment.is_author = True
-                comment.url_id = quote(comment.url_id, safe='')
-                comment.likes_count = Like.objects.filter(comment=comment).count()
-
-            context['comments'] = comments
-
-        context['post'] = post
-        context['logged_in'] = self.request.user.is_authenticated
-        if (post.user == current_user_model):
-            context['is_author'] = True
-        
-        if (repost and post_owner==current_user_model):
-            context['repost_author'] = True
-        context['user_details'] = current_user_model
-        context['user_url_quoted'] = quote(post.user.url_id, safe='')
-
+        context.update(self.detail.context)
         return context
-    
-    def prepare_repost(self,post):
-
-        post.content = unquote(post.content)
-        original_post = Post.objects.get(url_id=post.content)
-
-        repost_time = post.published
-                
-                
-        repost_user = post.user
-        repost_url = post.url_id
-
-        post = original_post
-
-        post.repost = True
-        post.repost_user = repost_user
-        post.repost_url = repost_url
-        post.likes_count = Like.objects.filter(post=original_post).count()
-        post.repost_time = repost_time
-        post.user.profileImage = post_utils.get_image_post(post.user.profileImage)
-        return post
-
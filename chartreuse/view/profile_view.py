@@ -4,8 +4,11 @@ from django.views.generic.detail import DetailView
 from django.http import HttpResponseNotAllowed
 from urllib.parse import unquote, quote
 from . import post_utils
+from .follow_utils import are_friends, is_following, has_requested_follow
 from ..views import Host
 import requests
+from chartreuse import node_client
+from chartreuse.backfill import enqueue_backfill
 
 def follow_accept(request,followed,follower):
 
@@ -34,9 +37,8 @@ def follow_accept(request,followed,follower):
             if not node_queryset.exists():
                 return redirect('chartreuse:profile',url_id=quote(followed,safe=''))
 
-            # case of remote follow
-            remote_posts = Post.objects.filter(user=followed_user).exclude(contentType='repost').exclude(visibility='DELETED')
-            send_posts_to_remote(remote_posts,followed_user,following_user,node_queryset[0])
+            # case of remote follow, the run_backfills worker sends the existing posts so accepting returns straight away
+            enqueue_backfill(followed_user,following_user,node_queryset[0])
 
         follow = Follow(follower=following_user,followed=followed_user) # create the new follow!
         follow.save()
@@ -46,33 +48,6 @@ def follow_accept(request,followed,follower):
     
     return HttpResponseNotAllowed(["POST"])
 
-def send_posts_to_remote(posts,local_user,remote_user,node):
-    remote_endpoint = quote(remote_user.url_id,safe='')
-    url = f"{remote_user.host}authors/{remote_endpoint}/inbox/"
-
-    username = node.username
-    password = node.password
-
-    headers = {
-                "Content-Type": "application/json; charset=utf-8"
-            }
-    auth = (username,password)
-
-    for post in posts:
-        # get the full representation of the post
-        response = requests.get(f"{local_user.host}authors/{quote(local_user.url_id,safe='')}/posts/{quote(post.url_id,safe='')}/")
-        if response.status_code != 200:
-            continue
-
-        
-        post_obj = response.json()
-        
-        try:
-            requests.post(url,headers=headers,json=post_obj,auth=auth)
-        except:
-            continue
-    
-
 def follow_reject(request,followed,follower):
     '''
     Purpose: View to interact with the follow requests database by rejecting a follow request and not processing it into a follow!!
@@ -176,7 +151,7 @@ def profile_follow_request(request,requestee,requester):
             }
 
             try:
-                requests.post(url, headers=headers, json=data, auth=(username, password))
+                node_client.post(url, node=remote_node, headers=headers, json=data, auth=(username, password))
             except:
                 return redirect("chartreuse:profile",url_id=quote(requestee,safe=''))
             
@@ -252,21 +227,16 @@ class ProfileDetailView(DetailView):
             else:
                 context['viewer_id'] = quote(current_user_model.url_id,safe='')
                 # check if the user if following or not...
-                follow = Follow.objects.filter(follower=current_user_model,followed=user)
-                if follow.count() == 0:
+                if not is_following(current_user_model,user):
                     context['is_following'] = False
                     post_access = "public"
                     # check if a follow request has been sent or not!
-                    follow_request  = FollowRequest.objects.filter(requestee=user,requester=current_user_model)
-                    if follow_request.count() > 0:
-                        context['sent_request'] = True
-                    else:
-                        context['sent_request'] = False
+                    context['sent_request'] = has_requested_follow(current_user_model,user)
                 else:
                     context['is_following'] = True
                     post_access = "unlisted"
                     # check if the user is following them back or not! (friends)
-                    if Follow.objects.filter(followed=current_user_model,follower=user).exists():
+                    if are_friends(current_user_model,user):
                         context['follow_relationship'] = "Friends"
                         post_access = "all"
                     else:
@@ -336,8 +306,7 @@ class ProfileDetailView(DetailView):
             current_user_model = get_object_or_404(User,user=current_auth_user)
 
             # check to see if current user IS actually still following on their local node, (nodes can be out of date with following lists)
-            follow = Follow.objects.filter(followed=user,follower=current_user_model)
-            if not follow.exists():
+            if not is_following(current_user_model,user):
                 posts = Post.objects.filter(visibility="PUBLIC",user=user)
                 posts = [post for post in posts]
                 posts = sorted(posts, key=lambda post: post.published, reverse=True)
@@ -362,7 +331,7 @@ class ProfileDetailView(DetailView):
             url = f"{user.url_id}/followers/{quote(current_user_model.url_id,safe='')}"
 
             try:
-                response = requests.get(url,auth=auth)
+                response = node_client.get(url,node=remote_node,auth=auth)
             except:
                 posts = Post.objects.filter(visibility="PUBLIC",user=user)
                 posts = [post for post in posts]
@@ -380,9 +349,7 @@ class ProfileDetailView(DetailView):
             # this is case when remote node and local node both agree they are FOLLOWING this remote node!
             
             # check to see if the remote author is following this author, if thats the case then they are friends, otherwise they are not friends!
-            follow = Follow.objects.filter(follower=user,followed=current_user_model)
-
-            if follow.exists(): # friends
+            if are_friends(current_user_model,user): # friends
                 posts = Post.objects.filter(user=user).exclude(visibility='DELETED')
             else: # only local node following remote node...
                 posts = Post.objects.filter(visibility='PUBLIC',user=user) | Post.objects.filter(visibility='UNLISTED')
@@ -1,5 +1,6 @@
 from django.http import JsonResponse
 from .models import Node, User
+from .node_auth import node_verifier
 from django.shortcuts import render
 import base64
 import json
@@ -34,18 +35,12 @@ def checkIfRequestAuthenticated(request):
         return JsonResponse({"error": f"Missing or invalid Authorization header"}, status=401)
 
     try:
-        # Decode the Base64-encoded credentials
-        decoded_bytes = base64.b64decode(authentication.split(" ")[1])
-        decoded_str = decoded_bytes.decode('utf-8')  # Convert bytes to string
-        auth = decoded_str.split(":")
-        username = auth[0]
-        password = auth[1]
-    except (IndexError, base64.binascii.Error, UnicodeDecodeError):
+        # Verify the Base64-encoded credentials against the hashed node passwords (cached per request and per process)
+        node_id = node_verifier.verify(request, authentication)
+    except ValueError:
         return JsonResponse({"error": "Invalid authentication format"}, status=401)
 
-    node = Node.objects.filter(username=username, password=password, follow_status="INCOMING", status="ENABLED")
-    if len(node) == 0:
-        
+    if node_id is None:
         return JsonResponse({"error": "Unauthorized"}, status=401)
 
     
@@ -58,6 +58,7 @@ REST_FRAMEWORK = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'chartreuse.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -170,3 +171,90 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Seconds a user's cached follow/friend/follow request ids stay fresh in each process (chartreuse/social_graph.py)
+SOCIAL_GRAPH_CACHE_TTL = 60
+
+# Seconds a verified node Authorization header is trusted by each process before its hash is checked again, and the
+# number of verified headers kept (chartreuse/node_auth.py)
+NODE_AUTH_CACHE_TTL = 30
+NODE_AUTH_CACHE_MAX_ENTRIES = 1000
+
+# When True the inbox only checks auth and the activity type, queues the activity and answers 202,
+# the process_inbox management command applies it afterwards (chartreuse/inbox_queue.py). Enabling it
+# needs a `worker: python manage.py process_inbox --workers 4` process, which is left out of the Procfile.
+INBOX_ASYNC = False
+
+# Times a queued activity whose object is missing is tried before it is left FAILED, and seconds a claimed
+# activity stays with its worker before another worker may claim it (chartreuse/inbox_queue.py)
+INBOX_MAX_ATTEMPTS = 5
+INBOX_CLAIM_TIMEOUT = 300
+
+# Number of recently processed inbox activities each process keeps in memory to answer retries, and seconds a
+# processed activity is remembered before prune_activity_ledger deletes it (chartreuse/activity_ledger.py)
+INBOX_LEDGER_MEMORY_SIZE = 10000
+INBOX_LEDGER_TTL = 86400
+
+# Seconds a known remote author stays cached by each process before it is looked up again (chartreuse/author_resolver.py)
+AUTHOR_CACHE_TTL = 300
+
+# Largest inbox request body accepted in bytes, bigger deliveries are answered with 413 before they are parsed (chartreuse/view/inbox.py)
+INBOX_MAX_PAYLOAD_BYTES = 2621440
+
+# Circuit breaker for outgoing nodes (chartreuse/node_client.py): failures in a row that open a node's circuit,
+# seconds an open circuit fails fast before a trial request, and seconds to wait on a node before giving up
+NODE_CIRCUIT_FAILURE_THRESHOLD = 5
+NODE_CIRCUIT_COOLDOWN = 60
+NODE_REQUEST_TIMEOUT = 10
+
+# Outbound inbox deliveries (chartreuse/delivery.py): deliveries sent at once in total and to a single node,
+# and deliveries a single node may have waiting before new ones are refused
+DELIVERY_MAX_IN_FLIGHT = 8
+DELIVERY_PER_NODE_LIMIT = 2
+DELIVERY_QUEUE_SIZE = 1000
+
+# Seconds a queued delivery may take to be sent before retry_deliveries sends it again, in case its process died (chartreuse/delivery.py)
+DELIVERY_SEND_TIMEOUT = 300
+
+# Failed deliveries are retried with jittered exponential backoff starting at DELIVERY_RETRY_BASE_DELAY seconds and capped at
+# DELIVERY_RETRY_MAX_DELAY seconds, after DELIVERY_MAX_ATTEMPTS attempts they are dead lettered (chartreuse/delivery.py)
+DELIVERY_MAX_ATTEMPTS = 8
+DELIVERY_RETRY_BASE_DELAY = 30
+DELIVERY_RETRY_MAX_DELAY = 3600
+
+# Seconds a like toggle waits for further toggles before only its final state is delivered, 0 delivers straight away
+# (chartreuse/like_coalescer.py)
+LIKE_DELIVERY_DEBOUNCE = 2
+
+# Number of posts built and sent per batch when backfilling a newly accepted remote follower (chartreuse/backfill.py)
+BACKFILL_PAGE_SIZE = 50
+
+# Remote GET responses kept per process to revalidate with If-None-Match / If-Modified-Since, and the largest body
+# in bytes that is kept (chartreuse/node_client.py)
+NODE_CONDITIONAL_CACHE_SIZE = 512
+NODE_CONDITIONAL_CACHE_MAX_BYTES = 1048576
+
+# Responses smaller than COMPRESSION_MIN_SIZE bytes are sent uncompressed, brotli (when installed) uses
+# COMPRESSION_BROTLI_QUALITY, and compressed request bodies may expand to COMPRESSION_MAX_REQUEST_BYTES
+# (chartreuse/middleware.py)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_MAX_REQUEST_BYTES = 2621440
+
+# Largest number of author ids one batch author lookup accepts (chartreuse/api_handling/users.py)
+AUTHOR_BATCH_MAX_IDS = 500
+
+# Json encoder used for api responses and inbox bodies, 'orjson' when it is installed or 'json' for the standard
+# library (chartreuse/fast_json.py)
+FAST_JSON_BACKEND = 'orjson'
+
+# Seconds a row count shown next to a paginated listing is cached for, and the number of counts kept
+# (chartreuse/table_counts.py)
+TABLE_COUNT_CACHE_TTL = 300
+TABLE_COUNT_CACHE_MAX_KEYS = 10000
+
+# Largest number of likes sent in one page of a likes listing (chartreuse/api_handling/likes.py)
+LIKES_MAX_PAGE_SIZE = 100
+
+# Number of comments shown under a post on its page before the rest are loaded on demand (chartreuse/view/comment_utils.py)
+POST_COMMENTS_PAGE_SIZE = 20